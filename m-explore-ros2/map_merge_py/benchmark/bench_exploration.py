@@ -0,0 +1,137 @@
+"""Team exploration time with per-robot nearest-frontier goals versus joint Hungarian assignment.
+
+Robots share one map of a synthetic world and start together in one room.
+Every step each robot moves one cell down the path to its goal and
+uncovers the cells within --sensor-range of it. Goals are re-planned every
+--replan steps, or as soon as a robot arrives, from the frontier clusters
+and path costs the explorer uses. "nearest" is the old behaviour, each
+robot taking its own cheapest cluster; "hungarian" is assign_frontiers.
+Exploration ends when no reachable frontier is left. Run from the package
+root:
+    python3 -m benchmark.bench_exploration --robots 2 3 4 --seeds 0 1 2
+"""
+import argparse
+import time
+
+import numpy as np
+
+from map_merge_py.assignment import assign_frontiers, frontier_costs
+from map_merge_py.frontiers import frontier_clusters
+from map_merge_py.grid_conversion import image_to_grid
+from map_merge_py.path_cost import PathCostFields
+from map_merge_py.synthetic import make_world
+
+RESOLUTION = 0.05
+NEIGHBOURS = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx]
+
+
+def make_truth(size, rng):
+    truth = image_to_grid(make_world(size, rng)).copy()
+    # Space outside the rooms is solid rock, not something left to explore.
+    truth[truth == -1] = 100
+    return truth
+
+
+def uncover(known, truth, cell, sensor_range):
+    y, x = cell
+    y0, y1 = max(0, y - sensor_range), min(truth.shape[0], y + sensor_range + 1)
+    x0, x1 = max(0, x - sensor_range), min(truth.shape[1], x + sensor_range + 1)
+    yy, xx = np.ogrid[y0:y1, x0:x1]
+    disc = (yy - y) ** 2 + (xx - x) ** 2 <= sensor_range ** 2
+    known[y0:y1, x0:x1][disc] = truth[y0:y1, x0:x1][disc]
+
+
+def step_towards(cell, field):
+    """Neighbour of cell with the lowest cost to go, or cell itself at the goal."""
+    y, x = cell
+    best = cell, field[y, x]
+    for dy, dx in NEIGHBOURS:
+        ny, nx = y + dy, x + dx
+        if 0 <= ny < field.shape[0] and 0 <= nx < field.shape[1] and field[ny, nx] < best[1]:
+            best = (ny, nx), field[ny, nx]
+    return best[0]
+
+
+def plan(known, robots, strategy, version, args):
+    """Goal cell per robot (None if it has none); None when exploration is over."""
+    clusters = frontier_clusters(known, args.min_unknown_cells, min_size=args.min_frontier_size)
+    if not clusters:
+        return None
+    fields = PathCostFields()
+    fields.update(known, version)
+    goals = np.array([c.goal for c in clusters])
+    path_costs = np.array([fields.cost_from(*robot)[goals[:, 0], goals[:, 1]] for robot in robots]) * RESOLUTION
+    gains = np.array([c.gain for c in clusters]) * RESOLUTION ** 2
+    costs = frontier_costs(path_costs, gains, args.potential_scale, args.gain_scale)
+    if not np.isfinite(costs).any():
+        return None
+    if strategy == 'nearest':
+        picks = [int(np.argmin(row)) if np.isfinite(row).any() else None for row in costs]
+    else:
+        picks = assign_frontiers(costs, goals * RESOLUTION, args.spread_radius, args.spread_penalty)
+    return [None if pick is None else tuple(goals[pick]) for pick in picks]
+
+
+def explore(truth, n_robots, strategy, args, rng):
+    """(steps until no reachable frontier is left, planning seconds)."""
+    free = np.argwhere(truth == 0)
+    start = free[rng.integers(len(free))]
+    # Start the team on the free cells closest to one random start cell.
+    nearest = free[np.argsort(np.hypot(*(free - start).T))[:n_robots]]
+    robots = [tuple(cell) for cell in nearest.tolist()]
+    known = np.full(truth.shape, -1, dtype=np.int8)
+    for robot in robots:
+        uncover(known, truth, robot, args.sensor_range)
+
+    planning = 0.0
+    goals, goal_fields = [None] * n_robots, [None] * n_robots
+    for step in range(args.max_steps):
+        arrived = any(goal is not None and robot == goal for robot, goal in zip(robots, goals))
+        if step % args.replan == 0 or arrived or all(goal is None for goal in goals):
+            started = time.perf_counter()
+            goals = plan(known, robots, strategy, step, args)
+            if goals is None:
+                return step, planning
+            fields = PathCostFields()
+            fields.update(known, step)
+            goal_fields = [None if goal is None else fields.cost_from(*goal) for goal in goals]
+            planning += time.perf_counter() - started
+        for i, field in enumerate(goal_fields):
+            if field is not None:
+                robots[i] = step_towards(robots[i], field)
+                uncover(known, truth, robots[i], args.sensor_range)
+    return args.max_steps, planning
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--robots', type=int, nargs='+', default=[2, 3, 4])
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0, 1, 2])
+    parser.add_argument('--world-size', type=int, default=240)
+    parser.add_argument('--sensor-range', type=int, default=10)
+    parser.add_argument('--replan', type=int, default=10)
+    parser.add_argument('--max-steps', type=int, default=3000)
+    parser.add_argument('--min-unknown-cells', type=int, default=5)
+    parser.add_argument('--min-frontier-size', type=int, default=3)
+    parser.add_argument('--potential-scale', type=float, default=3.0)
+    parser.add_argument('--gain-scale', type=float, default=1.0)
+    parser.add_argument('--spread-radius', type=float, default=1.0)
+    parser.add_argument('--spread-penalty', type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{'robots':>6} {'seed':>5} {'nearest steps':>14} {'hungarian steps':>16} {'saved':>7} "
+          f"{'nearest plan ms':>16} {'hungarian plan ms':>18}")
+    for n in args.robots:
+        for seed in args.seeds:
+            truth = make_truth(args.world_size, np.random.default_rng(seed))
+            steps, planning = {}, {}
+            for strategy in ('nearest', 'hungarian'):
+                steps[strategy], planning[strategy] = explore(
+                    truth, n, strategy, args, np.random.default_rng(seed + 1000))
+            saved = 1.0 - steps['hungarian'] / steps['nearest']
+            print(f"{n:>6} {seed:>5} {steps['nearest']:>14} {steps['hungarian']:>16} {saved:>7.0%} "
+                  f"{planning['nearest'] * 1e3:>16.0f} {planning['hungarian'] * 1e3:>18.0f}")
+
+
+if __name__ == '__main__':
+    main()
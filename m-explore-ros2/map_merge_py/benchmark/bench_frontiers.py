@@ -0,0 +1,67 @@
+"""Compare vectorized frontier detection with the original per-cell loop.
+
+Maps are synthetic worlds whose right half is only sparsely observed, so
+frontier cells are plentiful. The loop is slow: 2000 takes minutes. Run from the
+package root:
+    python3 -m benchmark.bench_frontiers --sizes 250 500 1000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from map_merge_py.frontiers import find_frontiers
+from map_merge_py.grid_conversion import image_to_grid
+from map_merge_py.synthetic import make_world
+
+
+def legacy_find_frontiers(data, min_unknown_cells):
+    height, width = data.shape
+    frontiers = []
+    for y in range(2, height - 2):
+        for x in range(2, width - 2):
+            if data[y, x] != 0:
+                continue
+            neighborhood = data[y-1:y+2, x-1:x+2].flatten()
+            if -1 not in neighborhood:
+                continue
+            unknown_area = data[y-2:y+3, x-2:x+3]
+            if np.sum(unknown_area == -1) < min_unknown_cells:
+                continue
+            if np.sum(unknown_area == 100) > 2:
+                continue
+            frontiers.append((y, x))
+    return frontiers
+
+
+def make_grid(size, rng):
+    grid = image_to_grid(make_world(size, rng)).copy()
+    right = grid[:, size // 2:]
+    right[rng.random(right.shape) < 0.7] = -1
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[250, 500, 1000])
+    parser.add_argument('--min-unknown-cells', type=int, default=15)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'frontiers':>10} {'loop ms':>10} {'vectorized ms':>14} {'speedup':>8}")
+    for size in args.sizes:
+        grid = make_grid(size, np.random.default_rng(size))
+        start = time.perf_counter()
+        expected = legacy_find_frontiers(grid, args.min_unknown_cells)
+        t_loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            frontiers = find_frontiers(grid, args.min_unknown_cells)
+        t_fast = (time.perf_counter() - start) / args.repeat
+        assert frontiers == expected
+        print(f'{size:>6} {len(frontiers):>10} {t_loop * 1e3:>10.1f} {t_fast * 1e3:>14.2f} {t_loop / t_fast:>8.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Compare the LUT-based grid conversion with the original mask-based code.
+
+Run from the package root:
+    python3 -m benchmark.bench_grid_conversion --sizes 500 1000 2000 4000
+"""
+import argparse
+import array
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from map_merge_py.grid_conversion import fill_occupancy_grid, occupancy_grid_to_image
+
+
+def legacy_to_image(msg):
+    width = msg.info.width
+    height = msg.info.height
+    data = np.array(msg.data, dtype=np.int8).reshape((height, width))
+    img = np.zeros((height, width), dtype=np.uint8)
+    img[data == -1] = 127
+    img[data == 0] = 255
+    img[data > 0] = 0
+    return img
+
+
+def legacy_fill(msg, canvas):
+    msg.info.width = canvas.shape[1]
+    msg.info.height = canvas.shape[0]
+    ros_data = np.full(canvas.shape, -1, dtype=np.int8)
+    ros_data[canvas == 255] = 0
+    ros_data[canvas == 0] = 100
+    msg.data = ros_data.flatten().tolist()
+
+
+def make_msg(size, rng):
+    grid = rng.choice(np.array([-1, 0, 100], dtype=np.int8), size=(size, size), p=[0.5, 0.4, 0.1])
+    # rclpy hands int8[] fields to Python as array.array('b').
+    data = array.array('b', grid.tobytes())
+    return SimpleNamespace(info=SimpleNamespace(width=size, height=size), data=data)
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 1000, 2000, 4000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'size':>6} {'stage':>10} {'legacy ms':>10} {'lut ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        msg = make_msg(size, rng)
+        img = occupancy_grid_to_image(msg)
+        assert np.array_equal(img, legacy_to_image(msg))
+        out = SimpleNamespace(info=SimpleNamespace(width=0, height=0), data=None)
+        stages = [
+            ('to_image', lambda: legacy_to_image(msg), lambda: occupancy_grid_to_image(msg)),
+            ('to_msg', lambda: legacy_fill(out, img), lambda: fill_occupancy_grid(out, img)),
+        ]
+        for name, legacy, lut in stages:
+            t_legacy = best_of(legacy, args.repeat)
+            t_lut = best_of(lut, args.repeat)
+            print(f'{size:>6} {name:>10} {t_legacy * 1e3:>10.1f} {t_lut * 1e3:>10.1f} {t_legacy / t_lut:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
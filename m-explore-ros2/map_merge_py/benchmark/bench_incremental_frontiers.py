@@ -0,0 +1,89 @@
+"""Cost of keeping the frontier mask current: one small patch versus recomputing the whole map.
+
+Each patch uncovers a --patch x --patch window of the synthetic world, as a
+robot's sensor sweep would. The replan columns time what the explorer does
+next: the robot's component, its reachable frontier clusters and its path
+cost field, after a patch and on a fresh MapLayers. Those steps still work
+on the whole grid. Run from the package root:
+    python3 -m benchmark.bench_incremental_frontiers --sizes 500 1000 2000
+"""
+import argparse
+from types import SimpleNamespace
+import time
+
+import numpy as np
+
+from map_merge_py.frontiers import frontier_mask
+from map_merge_py.grid_conversion import image_to_grid
+from map_merge_py.map_layers import MapLayers
+from map_merge_py.synthetic import make_world
+
+
+def make_msg(grid):
+    height, width = grid.shape
+    origin = SimpleNamespace(position=SimpleNamespace(x=0.0, y=0.0))
+    info = SimpleNamespace(width=width, height=height, resolution=0.05, origin=origin)
+    return SimpleNamespace(info=info, data=grid.tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 1000, 2000])
+    parser.add_argument('--patch', type=int, default=40)
+    parser.add_argument('--updates', type=int, default=50)
+    parser.add_argument('--replans', type=int, default=5)
+    parser.add_argument('--min-unknown-cells', type=int, default=15)
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'full ms':>9} {'patch ms':>9} {'speedup':>8} {'replan ms':>10} {'fresh ms':>9}")
+    for size in args.sizes:
+        rng = np.random.default_rng(size)
+        truth = image_to_grid(make_world(size, rng))
+        known = np.full(truth.shape, -1, dtype=np.int8)
+        known[:, :size // 2] = truth[:, :size // 2]
+        layers = MapLayers()
+        layers.update(make_msg(known))
+        layers.frontier_mask(args.min_unknown_cells)
+        free = np.argwhere(layers.masks[0])
+        robot = tuple(int(v) for v in free[len(free) // 2])
+
+        def replan(layers):
+            component = layers.component(*robot)
+            layers.frontiers(args.min_unknown_cells, [component])
+            layers.path_costs(*robot)
+
+        corners = rng.integers(0, size - args.patch, size=(args.updates, 2))
+        start = time.perf_counter()
+        for y, x in corners:
+            layers.apply_update(int(x), int(y), truth[y:y + args.patch, x:x + args.patch])
+            layers.frontier_mask(args.min_unknown_cells)
+        t_patch = (time.perf_counter() - start) / args.updates
+
+        replan(layers)
+        times = []
+        while len(times) < args.replans:
+            y, x = rng.integers(size // 2, size - args.patch, size=2)
+            if layers.apply_update(int(x), int(y), truth[y:y + args.patch, x:x + args.patch]):
+                start = time.perf_counter()
+                replan(layers)
+                times.append(time.perf_counter() - start)
+        t_replan = np.mean(times)
+
+        start = time.perf_counter()
+        for _ in range(3):
+            fresh = MapLayers()
+            fresh.update(make_msg(layers.grid))
+            replan(fresh)
+        t_fresh = (time.perf_counter() - start) / 3
+
+        start = time.perf_counter()
+        for _ in range(3):
+            expected = frontier_mask(layers.grid, args.min_unknown_cells)
+        t_full = (time.perf_counter() - start) / 3
+        assert np.array_equal(layers.frontier_mask(args.min_unknown_cells), expected)
+        print(f'{size:>6} {t_full * 1e3:>9.2f} {t_patch * 1e3:>9.3f} {t_full / t_patch:>8.0f} '
+              f'{t_replan * 1e3:>10.1f} {t_fresh * 1e3:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Merge cost for N synthetic robots: cold start, steady state, one map changed, one robot added.
+
+"cold" is what every tick used to cost (features and all pairs recomputed).
+Run from the package root:
+    python3 -m benchmark.bench_n_robot_merge --robots 2 4 8
+"""
+import argparse
+import time
+
+import numpy as np
+
+from map_merge_py.grid_conversion import OCCUPIED
+from map_merge_py.merge_pipeline import MergePipeline
+from map_merge_py.synthetic import as_robot_map, make_robot_maps
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--robots', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--world-size', type=int, default=1100)
+    parser.add_argument('--map-size', type=int, default=700)
+    parser.add_argument('--threshold', type=float, default=0.0, help='0 uses the registration engine default')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'robots':>6} {'cold ms':>9} {'steady ms':>10} {'1 changed ms':>13} {'add Nth ms':>11} {'groups':>7}")
+    for n in args.robots:
+        rng = np.random.default_rng(args.seed)
+        _, maps, _ = make_robot_maps(n, rng, world_size=args.world_size, map_size=args.map_size)
+
+        pipeline = MergePipeline(confidence_threshold=args.threshold)
+        t_cold, result = timed(lambda: pipeline.merge(maps))
+        t_steady, _ = timed(lambda: pipeline.merge(maps))
+
+        changed = dict(maps)
+        img = maps['robot_1'].image.copy()
+        img[10:30, 10:30] = OCCUPIED
+        changed['robot_1'] = as_robot_map(img)
+        t_changed, _ = timed(lambda: pipeline.merge(changed))
+
+        last = f'robot_{n}'
+        existing = {robot: robot_map for robot, robot_map in maps.items() if robot != last}
+        grow = MergePipeline(confidence_threshold=args.threshold)
+        grow.merge(existing)
+        t_add, _ = timed(lambda: grow.merge(maps))
+
+        print(f'{n:>6} {t_cold * 1e3:>9.1f} {t_steady * 1e3:>10.1f} {t_changed * 1e3:>13.1f} '
+              f'{t_add * 1e3:>11.1f} {len(result.components):>7}')
+
+
+if __name__ == '__main__':
+    main()
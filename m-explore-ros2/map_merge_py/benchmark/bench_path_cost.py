@@ -0,0 +1,56 @@
+"""Path cost fields on large maps: exact per-cell graph versus planning on blocks of cells.
+
+A 2000 x 2000 map is 100 m square at 5 cm per cell. Times are for
+building the graph once per map version and for one field per robot;
+error is the mean relative difference of the block costs from the exact
+ones over the cells both reach. Run from the package root:
+    python3 -m benchmark.bench_path_cost --sizes 500 1000 2000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from map_merge_py.grid_conversion import image_to_grid
+from map_merge_py.path_cost import PathCostFields
+from map_merge_py.synthetic import make_world
+
+
+def timed_fields(fields, grid, starts):
+    start = time.perf_counter()
+    fields.update(grid, 1)
+    t_build = time.perf_counter() - start
+    start = time.perf_counter()
+    costs = [fields.cost_from(y, x) for y, x in starts]
+    return t_build, (time.perf_counter() - start) / len(starts), costs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 1000, 2000])
+    parser.add_argument('--robots', type=int, default=3)
+    parser.add_argument('--max-nodes', type=int, default=PathCostFields().max_nodes)
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'exact build':>12} {'exact field':>12} {'block':>6} {'build ms':>9} {'field ms':>9} "
+          f"{'rel err':>8} {'reach diff':>11}")
+    for size in args.sizes:
+        rng = np.random.default_rng(size)
+        grid = image_to_grid(make_world(size, rng))
+        free = np.argwhere(grid == 0)
+        starts = [tuple(cell) for cell in free[rng.choice(len(free), args.robots)]]
+        exact_build, exact_field, expected = timed_fields(PathCostFields(max_nodes=grid.size), grid, starts)
+        blocks = PathCostFields(max_nodes=args.max_nodes)
+        build, field, costs = timed_fields(blocks, grid, starts)
+
+        errors, reach = [], 0
+        for want, got in zip(expected, costs):
+            both = np.isfinite(want) & np.isfinite(got)
+            errors.append(np.mean(np.abs(got[both] - want[both]) / np.maximum(want[both], 1.0)))
+            reach += np.count_nonzero(np.isfinite(want) != np.isfinite(got))
+        print(f'{size:>6} {exact_build * 1e3:>12.0f} {exact_field * 1e3:>12.0f} {blocks.block:>6} '
+              f'{build * 1e3:>9.0f} {field * 1e3:>9.0f} {np.mean(errors):>8.4f} {reach:>11}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Full-resolution feature registration against coarse-to-fine pyramid registration.
+
+Two robots see overlapping, rotated windows of one large sparse world.
+Error is the largest displacement (pixels) of a map corner under the
+estimated transform compared to the true one. Run from the package root:
+    python3 -m benchmark.bench_pyramid_registration --map-size 1200 2400
+"""
+import argparse
+import time
+
+import numpy as np
+
+from map_merge_py.placement import to_homogeneous
+from map_merge_py.pyramid import PyramidRegistration
+from map_merge_py.registration import FeatureRegistration
+from map_merge_py.synthetic import as_robot_map, make_world, robot_view
+
+
+def corner_error(transform, truth, shape):
+    height, width = shape
+    corners = np.array([[0, 0, 1], [width, 0, 1], [0, height, 1], [width, height, 1]], dtype=np.float64)
+    return np.abs(corners @ (transform - truth).T).max()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--map-size', type=int, nargs='+', default=[1200, 2400])
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'map px':>7} {'mode':>10} {'ms':>8} {'inliers':>8} {'error px':>9}")
+    for size in args.map_size:
+        world = make_world(size * 5 // 3, np.random.default_rng(args.seed))
+        center = size * 5 // 6
+        img_a, truth_a = robot_view(world, (center - size // 8, center), size, 10)
+        img_b, truth_b = robot_view(world, (center + size // 8, center), size, -35)
+        truth = (np.linalg.inv(to_homogeneous(truth_a)) @ to_homogeneous(truth_b))[:2]
+        map_a, map_b = as_robot_map(img_a), as_robot_map(img_b)
+
+        for name, registration in [('features', FeatureRegistration()),
+                                   ('pyramid/2', PyramidRegistration(levels=1)),
+                                   ('pyramid/4', PyramidRegistration(levels=2))]:
+            start = time.perf_counter()
+            estimate = registration.estimate('a', map_a, 'b', map_b)
+            elapsed = time.perf_counter() - start
+            error = '-' if estimate.transform is None else f'{corner_error(estimate.transform, truth, img_b.shape):.2f}'
+            print(f'{size:>7} {name:>10} {elapsed * 1e3:>8.1f} {estimate.confidence:>8.0f} {error:>9}')
+
+
+if __name__ == '__main__':
+    main()
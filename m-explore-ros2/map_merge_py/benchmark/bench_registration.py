@@ -0,0 +1,131 @@
+"""Offline registration benchmark: per-stage latency and transform error as JSON.
+
+Each case generates a map pair with known rotation, overlap, noise and size
+and runs it through what MultiRobotMapMerger does for two robots, without
+ROS: converting the received grids, a cold MergePipeline merge with the
+chosen registration mode, and building the published grid. Stage times are
+medians over --repeat runs. Run from the package root:
+    python3 -m benchmark.bench_registration --output run.json
+    python3 -m benchmark.bench_registration --baseline run.json
+"""
+import argparse
+import itertools
+import json
+import math
+import sys
+import time
+from types import SimpleNamespace
+import zlib
+
+import numpy as np
+
+from map_merge_py.feature_cache import MapFingerprint
+from map_merge_py.grid_conversion import fill_occupancy_grid, grid_to_image, image_to_grid
+from map_merge_py.merge_pipeline import MergePipeline, RobotMap
+from map_merge_py.phase_correlation import PhaseCorrelationRegistration
+from map_merge_py.pyramid import PyramidRegistration
+from map_merge_py.registration import FeatureRegistration
+from map_merge_py.synthetic import make_map_pair
+from map_merge_py.timing import StageTimer
+
+STAGES = ['convert', 'rescale', 'pyramid', 'blur', 'detect', 'match', 'estimate', 'correlate', 'refine', 'placement',
+          'warp', 'publish']
+REGISTRATIONS = {
+    'features': lambda args: FeatureRegistration(),
+    'pyramid': lambda args: PyramidRegistration(levels=args.pyramid_levels),
+    'phase': lambda args: PhaseCorrelationRegistration(levels=args.pyramid_levels),
+}
+
+
+def received_map(grid, resolution, timer):
+    """What map_callback does with an incoming OccupancyGrid."""
+    with timer.stage('convert'):
+        fingerprint = MapFingerprint(grid.shape[1], grid.shape[0], resolution, 0.0, 0.0, zlib.crc32(grid))
+        image = grid_to_image(grid)
+    return RobotMap(image, resolution, 0.0, 0.0, fingerprint)
+
+
+def run_case(pair, mode, args):
+    timer = StageTimer()
+    resolution = args.resolution
+    maps = {'a': received_map(image_to_grid(pair.a), resolution, timer),
+            'b': received_map(image_to_grid(pair.b), resolution, timer)}
+    pipeline = MergePipeline(confidence_threshold=args.threshold, registration=REGISTRATIONS[mode](args))
+    start = time.perf_counter()
+    result = pipeline.merge(maps)
+    timings = dict(result.timings)
+    timings['total'] = time.perf_counter() - start
+    with timer.stage('publish'):
+        fill_occupancy_grid(SimpleNamespace(info=SimpleNamespace()), result.canvas)
+    timings.update(timer.durations)
+    timings['total'] += timings['convert'] + timings['publish']
+
+    estimate = result.estimates[('a', 'b')]
+    x, y, yaw = result.poses['b']
+    truth_yaw = math.atan2(pair.truth[1, 0], pair.truth[0, 0])
+    return timings, {
+        'aligned': len(result.components) == 1,
+        'inliers': estimate.confidence,
+        'translation_error_m': float(np.hypot(x - pair.truth[0, 2] * resolution, y - pair.truth[1, 2] * resolution)),
+        'rotation_error_deg': abs(math.degrees(math.remainder(yaw - truth_yaw, 2.0 * math.pi))),
+    }
+
+
+def case_key(case):
+    return (case['mode'], case['size'], case['rotation'], case['overlap'], case['noise'])
+
+
+def print_comparison(cases, baseline):
+    previous = {case_key(case): case for case in baseline['cases']}
+    print(f"{'mode':>9} {'size':>5} {'rot':>5} {'ovl':>5} {'noise':>6} {'ms':>8} {'base ms':>8} "
+          f"{'speedup':>8} {'err m':>7} {'base err':>8}", file=sys.stderr)
+    for case in cases:
+        base = previous.get(case_key(case))
+        if base is None:
+            continue
+        print(f"{case['mode']:>9} {case['size']:>5} {case['rotation']:>5.0f} {case['overlap']:>5.2f} "
+              f"{case['noise']:>6.3f} {case['stages_ms']['total']:>8.1f} {base['stages_ms']['total']:>8.1f} "
+              f"{base['stages_ms']['total'] / case['stages_ms']['total']:>8.2f} "
+              f"{case['translation_error_m']:>7.3f} {base['translation_error_m']:>8.3f}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', default=sorted(REGISTRATIONS), choices=sorted(REGISTRATIONS))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[400, 800])
+    parser.add_argument('--rotations', type=float, nargs='+', default=[0.0, 45.0, 120.0])
+    parser.add_argument('--overlaps', type=float, nargs='+', default=[0.5, 0.8])
+    parser.add_argument('--noise', type=float, nargs='+', default=[0.0, 0.02])
+    parser.add_argument('--pyramid-levels', type=int, default=1)
+    parser.add_argument('--resolution', type=float, default=0.05)
+    parser.add_argument('--threshold', type=float, default=0.0, help='0 uses the registration engine default')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', help='JSON report of an earlier run to compare against')
+    args = parser.parse_args()
+
+    cases = []
+    for size, rotation, overlap, noise in itertools.product(args.sizes, args.rotations, args.overlaps, args.noise):
+        pair = make_map_pair(np.random.default_rng(args.seed), size, rotation, overlap, noise)
+        for mode in args.modes:
+            runs = [run_case(pair, mode, args) for _ in range(args.repeat)]
+            stages = {stage: float(np.median([timings.get(stage, 0.0) for timings, _ in runs])) * 1e3
+                      for stage in STAGES + ['total']}
+            cases.append({'mode': mode, 'size': size, 'rotation': rotation, 'overlap': overlap, 'noise': noise,
+                          'stages_ms': stages, **runs[-1][1]})
+
+    report = {'config': vars(args), 'cases': cases}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.baseline:
+        with open(args.baseline) as f:
+            print_comparison(cases, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
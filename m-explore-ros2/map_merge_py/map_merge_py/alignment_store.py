@@ -0,0 +1,58 @@
+"""On-disk copy of accepted pairwise transforms, so a restarted merger can skip global matching.
+
+Each pair is stored with the fingerprints of the two maps it was accepted
+on. After a restart, a pair whose maps are unchanged is used as is; any
+other pair goes through the pipeline's tracking check before it is trusted.
+"""
+import json
+import os
+
+import numpy as np
+
+from map_merge_py.registration import PairEstimate
+
+FORMAT_VERSION = 1
+
+
+def _as_tuples(value):
+    """JSON lists back into the (nested) tuples fingerprints compare against."""
+    if isinstance(value, list):
+        return tuple(_as_tuples(item) for item in value)
+    return value
+
+
+def save_alignments(path, pairs):
+    """Write pairs, (a, b) -> (fingerprints, PairEstimate, tracking score), to path atomically."""
+    entries = [{
+        'a': a,
+        'b': b,
+        'fingerprints': fingerprints,
+        'transform': np.asarray(estimate.transform).tolist(),
+        'confidence': estimate.confidence,
+        'inlier_ratio': estimate.inlier_ratio,
+        'score': score,
+    } for (a, b), (fingerprints, estimate, score) in sorted(pairs.items())]
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': FORMAT_VERSION, 'pairs': entries}, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def load_alignments(path):
+    """Read pairs written by save_alignments; a missing file or another format version gives {}."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if data.get('version') != FORMAT_VERSION:
+        return {}
+    pairs = {}
+    for entry in data['pairs']:
+        estimate = PairEstimate(
+            entry['confidence'], np.array(entry['transform'], dtype=np.float64), [], entry['inlier_ratio'])
+        pairs[(entry['a'], entry['b'])] = (_as_tuples(entry['fingerprints']), estimate, entry['score'])
+    return pairs
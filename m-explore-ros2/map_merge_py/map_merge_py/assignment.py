@@ -0,0 +1,61 @@
+"""Joint assignment of frontier clusters to robots.
+
+Each robot picking its own cheapest frontier sends robots that are close
+together to the same region. Here all robots are assigned at once with the
+Hungarian algorithm, one cluster each, over a cost matrix of
+potential_scale * path cost - gain_scale * gain, the frontier cost of the
+C++ explore node. Clusters often lie side by side, or appear once in each
+robot's map, so a second round makes every cluster within spread_radius of
+another robot's goal spread_penalty more expensive and solves again.
+"""
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+
+def frontier_costs(path_costs, gains, potential_scale=3.0, gain_scale=1.0):
+    """(robots, clusters) cost matrix; inf where a robot has no path to a cluster."""
+    return potential_scale * np.asarray(path_costs, dtype=np.float64) - gain_scale * np.asarray(gains, dtype=np.float64)
+
+
+def solve(costs):
+    """Column per row of a minimum-cost assignment, None for rows left without a finite-cost column."""
+    rows = [None] * costs.shape[0]
+    finite = np.isfinite(costs)
+    if not finite.any():
+        return rows
+    # linear_sum_assignment rejects infeasible matrices; stand-in costs above any
+    # real total keep infinite pairs out whenever possible and are dropped after.
+    span = costs[finite].max() - costs[finite].min() + 1.0
+    padded = np.where(finite, costs, costs[finite].max() + span * (costs.shape[0] + 1))
+    for row, col in zip(*linear_sum_assignment(padded)):
+        if finite[row, col]:
+            rows[row] = int(col)
+    return rows
+
+
+def assign_frontiers(costs, points, spread_radius=1.0, spread_penalty=10.0, rounds=2, claimed=()):
+    """Cluster index (or None) per robot.
+
+    costs is the (robots, clusters) matrix from frontier_costs and points
+    the (clusters, 2) cluster goals in one common frame. claimed are goals
+    of robots outside this assignment that keep theirs; clusters near them
+    carry the spread penalty for every robot from the start.
+    """
+    costs = np.asarray(costs, dtype=np.float64)
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    for goal in np.asarray(claimed, dtype=np.float64).reshape(-1, 2):
+        costs = costs + np.where(np.hypot(*(points - goal).T) < spread_radius, spread_penalty, 0.0)
+    assignment = solve(costs)
+    for _ in range(rounds - 1):
+        penalty = np.zeros_like(costs)
+        for robot, col in enumerate(assignment):
+            if col is None:
+                continue
+            near = np.hypot(*(points - points[col]).T) < spread_radius
+            others = np.arange(len(assignment)) != robot
+            penalty[np.ix_(others, near)] += spread_penalty
+        spread = solve(costs + penalty)
+        if spread == assignment:
+            break
+        assignment = spread
+    return assignment
@@ -0,0 +1,132 @@
+"""Frontiers a robot failed to explore, remembered by position for a limited time.
+
+A failed goal usually means the area around it is out of reach, not just
+one cell, so a blacklisted point blocks every candidate within radius of
+it. Entries expire after ttl seconds, since a region that was blocked may
+open up later, and at most max_entries are kept; the ones closest to
+expiry go first. Points are hashed into radius-sized buckets, so a query
+only looks at the 3x3 buckets around each candidate.
+"""
+import numpy as np
+
+from map_merge_py.robot_poses import inverse_transform_points
+
+
+class FrontierBlacklist:
+    """Blacklisted (x, y) points of one robot's map frame."""
+
+    def __init__(self, radius=0.5, ttl=600.0, max_entries=500):
+        self.radius = radius
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # (bucket x, bucket y) -> list of [x, y, expiry]
+        self._buckets = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def _key(self, x, y):
+        return int(np.floor(x / self.radius)), int(np.floor(y / self.radius))
+
+    def _near(self, key):
+        kx, ky = key
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                yield from self._buckets.get((kx + dx, ky + dy), ())
+
+    def add(self, x, y, now):
+        """Blacklist (x, y) until now + ttl; an entry already within radius is refreshed instead."""
+        key = self._key(x, y)
+        for entry in self._near(key):
+            if entry[2] > now and np.hypot(entry[0] - x, entry[1] - y) <= self.radius:
+                entry[2] = now + self.ttl
+                return
+        self._buckets.setdefault(key, []).append([x, y, now + self.ttl])
+        self._count += 1
+        if self._count > self.max_entries:
+            self.expire(now)
+        while self._count > self.max_entries:
+            self._remove_first_to_expire()
+
+    def expire(self, now):
+        """Drop the entries whose ttl has run out."""
+        for key in list(self._buckets):
+            entries = [entry for entry in self._buckets[key] if entry[2] > now]
+            self._count -= len(self._buckets[key]) - len(entries)
+            if entries:
+                self._buckets[key] = entries
+            else:
+                del self._buckets[key]
+
+    def _remove_first_to_expire(self):
+        key, entry = min(((key, entry) for key, entries in self._buckets.items() for entry in entries),
+                         key=lambda item: item[1][2])
+        self._buckets[key].remove(entry)
+        if not self._buckets[key]:
+            del self._buckets[key]
+        self._count -= 1
+
+    def contains(self, points, now):
+        """Boolean per (x, y) row of points: within radius of an unexpired entry."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        blocked = np.zeros(len(points), dtype=bool)
+        if not self._count or not len(points):
+            return blocked
+        keys, inverse = np.unique(np.floor(points / self.radius).astype(np.int64), axis=0, return_inverse=True)
+        for i, key in enumerate(map(tuple, keys.tolist())):
+            entries = np.array(list(self._near(key)), dtype=np.float64).reshape(-1, 3)
+            entries = entries[entries[:, 2] > now]
+            if not len(entries):
+                continue
+            rows = np.flatnonzero(inverse.ravel() == i)
+            offset = points[rows, None, :] - entries[None, :, :2]
+            blocked[rows] = (np.einsum('ijk,ijk->ij', offset, offset) <= self.radius ** 2).any(axis=1)
+        return blocked
+
+
+def blocked_world_points(blacklists, robots, map_to_world, points, now):
+    """(robots, points) mask of the world (x, y) points each robot has blacklisted.
+
+    Pooled frontiers can come from any robot's map, so each robot's
+    blacklist, kept in its own map frame, is checked against all of them.
+    map_to_world maps robot -> Transform2D of its map in the world, None
+    if unknown, in which case nothing is blocked for it.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    blocked = np.zeros((len(robots), len(points)), dtype=bool)
+    for i, robot in enumerate(robots):
+        if map_to_world[robot] is not None:
+            blocked[i] = blacklists[robot].contains(inverse_transform_points(map_to_world[robot], points), now)
+    return blocked
+
+
+class StallDetector:
+    """Candidates that stay within reach of a robot without being explored.
+
+    A frontier the robot stands next to should disappear once its sensors
+    see it. update() follows near candidates from tick to tick, matching
+    them to the previous tick's within match_radius, and reports those that
+    have been near for longer than timeout seconds. Candidates that move
+    out of reach are forgotten, so the state is bounded by one tick's worth.
+    """
+
+    def __init__(self, match_radius=0.5, timeout=10.0):
+        self.match_radius = match_radius
+        self.timeout = timeout
+        self.points = np.empty((0, 2))
+        self.since = np.empty(0)
+
+    def update(self, points, near, now):
+        """Boolean per (x, y) row of points: near for longer than timeout."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        since = np.full(len(points), float(now))
+        if len(self.points) and len(points):
+            offset = points[:, None, :] - self.points[None, :, :]
+            d2 = np.einsum('ijk,ijk->ij', offset, offset)
+            closest = d2.argmin(axis=1)
+            matched = d2[np.arange(len(points)), closest] <= self.match_radius ** 2
+            since[matched] = self.since[closest[matched]]
+        self.points = points[near]
+        self.since = since[near]
+        return near & (now - since > self.timeout)
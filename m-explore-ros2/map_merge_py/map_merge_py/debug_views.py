@@ -0,0 +1,37 @@
+"""Debug images of the merge (robot maps, merged map, feature matches) encoded for publishing."""
+import cv2
+import numpy as np
+
+ENCODINGS = {'png': '.png', 'jpeg': '.jpg'}
+
+
+def encode_image(img, fmt='png'):
+    """Compress an image into bytes for a sensor_msgs/CompressedImage of the given format."""
+    if fmt not in ENCODINGS:
+        raise ValueError(f"Unknown debug image format '{fmt}', expected one of {sorted(ENCODINGS)}")
+    ok, buffer = cv2.imencode(ENCODINGS[fmt], img)
+    if not ok:
+        raise ValueError(f'Could not encode {img.shape} image as {fmt}')
+    return buffer.tobytes()
+
+
+def render_match_overlay(estimates, match_features, max_matches=50):
+    """Side-by-side drawing of the best matches of every registered pair, one row per pair.
+
+    estimates maps (a, b) -> PairEstimate and match_features maps (a, b) ->
+    (features_a, features_b), the cached MapFeatures the matches index into.
+    Returns None when no pair has matches to draw.
+    """
+    rows = []
+    for pair, estimate in sorted(estimates.items()):
+        features = match_features.get(pair)
+        if features is None or not estimate.matches:
+            continue
+        features_a, features_b = features
+        rows.append(cv2.drawMatches(
+            features_a.image, features_a.keypoints, features_b.image, features_b.keypoints,
+            estimate.matches[:max_matches], None, flags=cv2.DrawMatchesFlags_NOT_DRAW_SINGLE_POINTS))
+    if not rows:
+        return None
+    width = max(row.shape[1] for row in rows)
+    return np.vstack([cv2.copyMakeBorder(row, 0, 0, 0, width - row.shape[1], cv2.BORDER_CONSTANT) for row in rows])
@@ -0,0 +1,80 @@
+"""When the explorer should plan, and for which robots.
+
+Planning is driven by events instead of a fixed timer: a map that changed,
+a navigation goal that finished, or one that stopped making progress.
+Events arriving close together are debounced into one planning run, which
+happens once no event has arrived for debounce seconds, or max_delay
+seconds after the first pending one at the latest. A run is also due every
+period seconds, so that robots left without a goal are retried.
+
+A robot needs a goal when it has none, because it never had one or its
+last one finished, or when its map changed since its goal was chosen. In
+the latter case the explorer still keeps the goal while it lies on a
+frontier, so that map updates alone do not interrupt navigation.
+"""
+import math
+
+
+class ExplorationScheduler:
+    def __init__(self, robots, debounce=1.0, max_delay=5.0, period=30.0, progress_timeout=30.0,
+                 min_progress=0.1):
+        self.robots = list(robots)
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.period = period
+        self.progress_timeout = progress_timeout
+        self.min_progress = min_progress
+        self.active = {robot: False for robot in self.robots}
+        self.map_changed_robots = set()
+        self.first_pending = None
+        self.last_event = None
+        self.last_run = -math.inf
+        # robot -> (best distance remaining, time it was reached)
+        self._progress = {}
+
+    def _event(self, now):
+        if self.first_pending is None:
+            self.first_pending = now
+        self.last_event = now
+
+    def map_changed(self, robot, now):
+        """A new version of robot's map; None for the merged map, which needs no robot to replan."""
+        if robot is not None:
+            self.map_changed_robots.add(robot)
+        self._event(now)
+
+    def goal_sent(self, robot, now):
+        self.active[robot] = True
+        self._progress[robot] = (math.inf, now)
+
+    def goal_finished(self, robot, now):
+        """robot's goal succeeded, failed, was rejected or cancelled; it needs a new one."""
+        self.active[robot] = False
+        self._progress.pop(robot, None)
+        self._event(now)
+
+    def feedback(self, robot, distance_remaining, now):
+        """Record navigation feedback; True if robot got no min_progress closer for progress_timeout seconds."""
+        best, since = self._progress.get(robot, (math.inf, now))
+        if distance_remaining < best - self.min_progress:
+            self._progress[robot] = (distance_remaining, now)
+            return False
+        return now - since > self.progress_timeout
+
+    def due(self, now):
+        """Robots to plan for if a planning run is due now, else None.
+
+        The list may be empty: the merged map changed, which is still worth
+        a run to see whether exploration is complete.
+        """
+        periodic = now - self.last_run >= self.period
+        if not periodic:
+            if self.first_pending is None:
+                return None
+            if now - self.last_event < self.debounce and now - self.first_pending < self.max_delay:
+                return None
+        robots = [robot for robot in self.robots if not self.active[robot] or robot in self.map_changed_robots]
+        self.map_changed_robots.clear()
+        self.first_pending = None
+        self.last_run = now
+        return robots
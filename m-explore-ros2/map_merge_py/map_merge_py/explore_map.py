@@ -1,29 +1,94 @@
 import rclpy
+from rclpy.action import ActionClient
 from rclpy.node import Node
+from action_msgs.msg import GoalStatus
+from nav2_msgs.action import NavigateToPose
+from map_msgs.msg import OccupancyGridUpdate
 from nav_msgs.msg import OccupancyGrid
 from geometry_msgs.msg import PoseStamped, Point
 from rosgraph_msgs.msg import Clock
 from rcl_interfaces.msg import SetParametersResult
 from tf2_ros import Buffer, TransformListener
-from tf2_geometry_msgs.tf2_geometry_msgs import do_transform_pose
 from visualization_msgs.msg import Marker, MarkerArray
 from builtin_interfaces.msg import Duration
 import numpy as np
 import rclpy.time
 
+from map_merge_py.assignment import assign_frontiers, frontier_costs
+from map_merge_py.blacklist import FrontierBlacklist, StallDetector, blocked_world_points
+from map_merge_py.exploration_scheduler import ExplorationScheduler
+from map_merge_py.frontiers import near_clusters
+from map_merge_py.grid_conversion import update_view
+from map_merge_py.map_layers import MapLayers
+from map_merge_py.robot_poses import (
+    RobotPose, Transform2D, cell_centres, distances_from, inverse_transform_points, transform_points,
+    yaw_from_quaternion)
+
 
 class MultiRobotExplorer(Node):
-    unreachable_frontiers = {}  # key: (robot_name, cell), value: last_close_time
-    blacklisted_frontiers = set()  # key: (robot_name, cell)
-    unreachable_frontiers = {}  # key: (robot_name, cell), value: (last_close_time, count)
     def __init__(self):
         super().__init__('multi_robot_explorer')
 
         # Parameters
         self.declare_parameter('sim_time', True)
         self.sim_time = self.get_parameter('sim_time').get_parameter_value().bool_value
+        # Robot namespaces; each has /<robot>/map, /<robot>/goal_pose and <robot>/map, <robot>/base_link frames.
+        self.declare_parameter('robots', ['robot_1', 'robot_2'])
+        self.robots = list(self.get_parameter('robots').get_parameter_value().string_array_value)
         self.declare_parameter('min_unknown_cells', 15)
         self.min_unknown_cells = self.get_parameter('min_unknown_cells').get_parameter_value().integer_value
+        # Frontier clusters smaller than this many cells are ignored.
+        self.declare_parameter('min_frontier_size', 1)
+        self.min_frontier_size = self.get_parameter('min_frontier_size').get_parameter_value().integer_value
+        # Unknown cells within this many cells of a cluster count towards its gain.
+        self.declare_parameter('frontier_gain_radius', 10)
+        self.frontier_gain_radius = self.get_parameter('frontier_gain_radius').get_parameter_value().integer_value
+        # Path costs grow by up to path_cost_inflation_cost times within this many metres of an obstacle; 0 disables.
+        self.declare_parameter('path_cost_inflation_radius', 0.0)
+        self.path_cost_inflation_radius = self.get_parameter('path_cost_inflation_radius').get_parameter_value().double_value
+        self.declare_parameter('path_cost_inflation_cost', 2.0)
+        self.path_cost_inflation_cost = self.get_parameter('path_cost_inflation_cost').get_parameter_value().double_value
+        # Frontier cost is potential_scale * path cost (m) - gain_scale * unknown area (m^2), as in the C++ explore node.
+        self.declare_parameter('potential_scale', 3.0)
+        self.potential_scale = self.get_parameter('potential_scale').get_parameter_value().double_value
+        self.declare_parameter('gain_scale', 1.0)
+        self.gain_scale = self.get_parameter('gain_scale').get_parameter_value().double_value
+        # Clusters within spread_radius metres of another robot's goal cost spread_penalty more.
+        self.declare_parameter('spread_radius', 1.0)
+        self.spread_radius = self.get_parameter('spread_radius').get_parameter_value().double_value
+        self.declare_parameter('spread_penalty', 10.0)
+        self.spread_penalty = self.get_parameter('spread_penalty').get_parameter_value().double_value
+        # A frontier within stall_distance metres of its robot for stall_timeout seconds is blacklisted,
+        # together with everything within blacklist_radius metres of it, for blacklist_ttl seconds.
+        self.declare_parameter('stall_distance', 1.0)
+        self.stall_distance = self.get_parameter('stall_distance').get_parameter_value().double_value
+        self.declare_parameter('stall_timeout', 10.0)
+        self.stall_timeout = self.get_parameter('stall_timeout').get_parameter_value().double_value
+        self.declare_parameter('blacklist_radius', 0.5)
+        self.blacklist_radius = self.get_parameter('blacklist_radius').get_parameter_value().double_value
+        self.declare_parameter('blacklist_ttl', 600.0)
+        self.blacklist_ttl = self.get_parameter('blacklist_ttl').get_parameter_value().double_value
+        # Blacklisted points kept per robot.
+        self.declare_parameter('blacklist_max_entries', 500)
+        self.blacklist_max_entries = self.get_parameter('blacklist_max_entries').get_parameter_value().integer_value
+        # Frontier markers published per namespace; more are thinned out evenly.
+        self.declare_parameter('max_marker_points', 200)
+        self.max_marker_points = self.get_parameter('max_marker_points').get_parameter_value().integer_value
+        # Planning runs once no map or goal event arrived for replan_debounce seconds, at most
+        # replan_max_delay seconds after the first one, and at least every replan_period seconds.
+        self.declare_parameter('replan_debounce', 1.0)
+        self.replan_debounce = self.get_parameter('replan_debounce').get_parameter_value().double_value
+        self.declare_parameter('replan_max_delay', 5.0)
+        self.replan_max_delay = self.get_parameter('replan_max_delay').get_parameter_value().double_value
+        self.declare_parameter('replan_period', 30.0)
+        self.replan_period = self.get_parameter('replan_period').get_parameter_value().double_value
+        # A robot driving to a goal keeps it while the goal is within goal_frontier_margin metres of the
+        # bounding box of a frontier cluster, even if its map changed; frontiers recede as they are uncovered.
+        self.declare_parameter('goal_frontier_margin', 1.0)
+        self.goal_frontier_margin = self.get_parameter('goal_frontier_margin').get_parameter_value().double_value
+        # A navigation goal that gets no closer for this many seconds is cancelled and blacklisted.
+        self.declare_parameter('goal_progress_timeout', 30.0)
+        self.goal_progress_timeout = self.get_parameter('goal_progress_timeout').get_parameter_value().double_value
 
         self.add_on_set_parameters_callback(self.update_parameter_callback)
 
@@ -36,24 +101,44 @@ class MultiRobotExplorer(Node):
         self.tf_listener = TransformListener(self.tf_buffer, self)
 
         # Map subscriptions
+        # Patches on the *_updates topics are applied to the last full map of their topic.
         self.create_subscription(OccupancyGrid, '/map', self.global_map_callback, 10)
-        self.create_subscription(OccupancyGrid, '/robot_1/map', self.robot1_map_callback, 10)
-        self.create_subscription(OccupancyGrid, '/robot_2/map', self.robot2_map_callback, 10)
-
-        # Goal publishers
-        self.pub_1 = self.create_publisher(PoseStamped, '/robot_1/goal_pose', 10)
-        self.pub_2 = self.create_publisher(PoseStamped, '/robot_2/goal_pose', 10)
+        self.create_subscription(OccupancyGridUpdate, '/map_updates', self.global_map_update_callback, 10)
+        for robot in self.robots:
+            self.create_subscription(
+                OccupancyGrid, f'/{robot}/map', lambda msg, robot=robot: self.local_map_callback(robot, msg), 10)
+            self.create_subscription(
+                OccupancyGridUpdate, f'/{robot}/map_updates',
+                lambda msg, robot=robot: self.local_map_update_callback(robot, msg), 10)
+
+        # Navigation goals; the goal_pose topics are used when a robot has no NavigateToPose server.
+        self.nav_clients = {robot: ActionClient(self, NavigateToPose, f'/{robot}/navigate_to_pose') for robot in self.robots}
+        self.goal_pubs = {robot: self.create_publisher(PoseStamped, f'/{robot}/goal_pose', 10) for robot in self.robots}
 
         # Marker publisher
         self.marker_pub = self.create_publisher(MarkerArray, '/frontier_markers', 10)
 
-        # Exploration timer
-        self.timer = self.create_timer(2.0, self.explore)
+        # Exploration scheduling; the timer only checks whether a planning run is due.
+        self.scheduler = ExplorationScheduler(
+            self.robots, self.replan_debounce, self.replan_max_delay, self.replan_period, self.goal_progress_timeout)
+        self.timer = self.create_timer(0.25, self.scheduler_tick)
 
         # Maps
-        self.global_map = None
-        self.local_map_1 = None
-        self.local_map_2 = None
+        # Derived layers of every map, computed once per map version.
+        self.global_layers = MapLayers()
+        self.local_layers = {
+            robot: MapLayers(self.path_cost_inflation_radius, self.path_cost_inflation_cost) for robot in self.robots}
+
+        # Goals: world (x, y), the same point in the robot's map frame, and the action goal handle.
+        # goal_seq tells callbacks of a goal apart from those of the goal it was replaced by.
+        self.goals = {robot: None for robot in self.robots}
+        self.goal_local_points = {robot: None for robot in self.robots}
+        self.goal_handles = {robot: None for robot in self.robots}
+        self.goal_seq = {robot: 0 for robot in self.robots}
+        self.blacklists = {
+            robot: FrontierBlacklist(self.blacklist_radius, self.blacklist_ttl, self.blacklist_max_entries)
+            for robot in self.robots}
+        self.stalls = {robot: StallDetector(self.blacklist_radius, self.stall_timeout) for robot in self.robots}
 
     def update_parameter_callback(self, params):
         result = SetParametersResult(successful=True)
@@ -62,181 +147,288 @@ class MultiRobotExplorer(Node):
                 self.min_unknown_cells = param.value
                 self.get_logger().info(f'Updating minimum unknown cells threshold to {self.min_unknown_cells}')
                 return result
+            if param.name == 'min_frontier_size' and param.type_ == rclpy.Parameter.Type.INTEGER:
+                self.min_frontier_size = param.value
+                self.get_logger().info(f'Updating minimum frontier cluster size to {self.min_frontier_size}')
+                return result
         return result
 
     def clock_callback(self, msg):
         self.latest_clock = msg.clock
 
-    def global_map_callback(self, msg):
-        self.global_map = msg
-
-    def robot1_map_callback(self, msg):
-        self.local_map_1 = msg
-
-    def robot2_map_callback(self, msg):
-        self.local_map_2 = msg
+    def now_seconds(self):
+        return self.get_clock().now().nanoseconds / 1e9
 
-    def is_frontier_unreachable(self, robot_name, cell, map_msg):
-        key = (robot_name, cell)
-        if key in self.blacklisted_frontiers:
-            return True
+    def global_map_callback(self, msg):
+        if self.global_layers.update(msg):
+            self.scheduler.map_changed(None, self.now_seconds())
 
-        now = self.get_clock().now().nanoseconds / 1e9
-        dist = self.distance_to_cell(cell, map_msg, f'{robot_name}/base_link', f'{robot_name}/map')
-        if dist > 1.0:
-            self.unreachable_frontiers.pop(key, None)
-            return False
+    def local_map_callback(self, robot_name, msg):
+        if self.local_layers[robot_name].update(msg):
+            self.scheduler.map_changed(robot_name, self.now_seconds())
 
-        if key not in self.unreachable_frontiers:
-            self.unreachable_frontiers[key] = now
-            return False
+    def global_map_update_callback(self, msg):
+        if self.global_layers.apply_update(msg.x, msg.y, update_view(msg)):
+            self.scheduler.map_changed(None, self.now_seconds())
 
-        if now - self.unreachable_frontiers[key] > 10.0:
-            self.get_logger().warn(f"Permanently blacklisting unreachable frontier {cell} for {robot_name}")
-            self.blacklisted_frontiers.add(key)
-            return True
+    def local_map_update_callback(self, robot_name, msg):
+        if self.local_layers[robot_name].apply_update(msg.x, msg.y, update_view(msg)):
+            self.scheduler.map_changed(robot_name, self.now_seconds())
 
-        return False
+    def scheduler_tick(self):
+        robots = self.scheduler.due(self.now_seconds())
+        if robots is not None:
+            self.explore(robots)
 
-    def explore(self):
-        if not self.global_map or not self.local_map_1 or not self.local_map_2:
+    def explore(self, robots):
+        """Plan new goals for robots; the others keep theirs but still claim their region."""
+        if self.global_layers.msg is None or any(layers.msg is None for layers in self.local_layers.values()):
             self.get_logger().warn("Waiting for all maps...")
             return
 
-        mask_1 = self.compute_reachability_mask(self.global_map, 'robot_1/map')
-        mask_2 = self.compute_reachability_mask(self.global_map, 'robot_2/map')
-        reachable_mask = np.logical_or(mask_1, mask_2)
-        global_frontiers = self.find_frontiers(self.global_map, reachable_mask)
-        self.publish_frontier_markers(global_frontiers, self.global_map, "global_frontiers", source_frame="world")
+        components = [self.robot_component(self.global_layers, f'{robot}/map') for robot in self.robots]
+        # A robot we cannot place could be anywhere, so nothing is ruled out.
+        global_frontiers = self.find_frontiers(self.global_layers, None if None in components else components)
+        self.publish_frontier_markers(global_frontiers, self.global_layers.msg, "global_frontiers", source_frame="world")
 
-        self.get_logger().info(f"Global frontiers remaining: {len(global_frontiers)}")
+        self.get_logger().info(f"Global frontier clusters remaining: {len(global_frontiers)}")
         if not global_frontiers:
             self.get_logger().info("No frontiers left in global map. Exploration complete.")
             self.timer.cancel()
             return
 
-        local_frontiers_1 = [f for f in self.find_frontiers(self.local_map_1) if not self.is_frontier_unreachable('robot_1', f, self.local_map_1)]
-        local_frontiers_2 = [f for f in self.find_frontiers(self.local_map_2) if not self.is_frontier_unreachable('robot_2', f, self.local_map_2)]
-        self.publish_frontier_markers(local_frontiers_1, self.local_map_1, "robot_1_frontiers", source_frame="robot_1/map")
-        self.publish_frontier_markers(local_frontiers_2, self.local_map_2, "robot_2_frontiers", source_frame="robot_2/map")
-
-        if local_frontiers_1:
-            local_frontiers_1.sort(key=lambda cell: self.distance_to_cell(cell, self.local_map_1, 'robot_1/base_link', 'robot_1/map'))
-            self.send_goal(local_frontiers_1[0], self.local_map_1, 'robot_1/map', self.pub_1)
-        if local_frontiers_2:
-            local_frontiers_2.sort(key=lambda cell: self.distance_to_cell(cell, self.local_map_2, 'robot_2/base_link', 'robot_2/map'))
-            self.send_goal(local_frontiers_2[0], self.local_map_2, 'robot_2/map', self.pub_2)
-
-    def distance_to_cell(self, cell, map_msg, robot_frame, source_frame):
-        y, x = cell
-        resolution = map_msg.info.resolution
-        origin = map_msg.info.origin.position
-        cx = origin.x + (x + 0.5) * resolution
-        cy = origin.y + (y + 0.5) * resolution
+        # One TF lookup per robot per run; every distance below is measured from these.
+        poses = {robot: self.lookup_robot_pose(robot) for robot in self.robots}
+        map_to_world = {robot: self.lookup_planar_transform('world', f'{robot}/map') for robot in self.robots}
+
+        # Pool every robot's local clusters in the world frame.
+        points, gains = [], []
+        pooled = {}
+        for robot in self.robots:
+            layers = self.local_layers[robot]
+            candidates = pooled[robot] = self.local_candidates(robot, layers, poses[robot])
+            self.publish_frontier_markers(
+                candidates, layers.msg, f"{robot}_frontiers", source_frame=f"{robot}/map", transform=map_to_world[robot])
+            if map_to_world[robot] is None or not candidates:
+                continue
+            info = layers.info
+            local = cell_centres([f.goal for f in candidates], info.resolution, info.origin.position.x, info.origin.position.y)
+            points.append(transform_points(map_to_world[robot], local))
+            gains.append(np.array([f.gain for f in candidates]) * info.resolution ** 2)
+        if not points:
+            return
+        points = np.concatenate(points)
+        gains = np.concatenate(gains)
+
+        # Robots on their way to a goal that is still a frontier keep it, and claim its region.
+        now = self.now_seconds()
+        robots = [robot for robot in robots
+                  if not (self.scheduler.active[robot] and self.goal_open(robot, pooled, map_to_world, now))]
+        if not robots:
+            return
+        claimed = [self.goals[robot] for robot in self.robots if robot not in robots and self.goals[robot] is not None]
+        path_costs = np.array([self.path_costs_to(robot, points, poses[robot], map_to_world[robot]) for robot in robots])
+        # A goal a robot failed may have come from another robot's map.
+        path_costs[blocked_world_points(self.blacklists, robots, map_to_world, points, now)] = np.inf
+        costs = frontier_costs(path_costs, gains, self.potential_scale, self.gain_scale)
+        assignment = assign_frontiers(costs, points, self.spread_radius, self.spread_penalty, claimed=claimed)
+        for robot, col in zip(robots, assignment):
+            if col is None:
+                continue
+            current = self.goals[robot]
+            if current is not None and np.hypot(*(points[col] - current)) < self.spread_radius:
+                # Still the region the robot is driving to; a new goal would only interrupt its planner.
+                continue
+            self.send_goal(robot, points[col], map_to_world[robot])
+
+    def goal_open(self, robot_name, pooled, map_to_world, now):
+        """Whether robot_name's goal is not blacklisted and near a cluster of pooled, robot -> local candidates."""
+        goal = self.goals[robot_name]
+        if goal is None or self.blacklists[robot_name].contains(self.goal_local_points[robot_name], now)[0]:
+            return False
+        for robot, clusters in pooled.items():
+            if map_to_world[robot] is None or not clusters:
+                continue
+            info = self.local_layers[robot].info
+            x, y = inverse_transform_points(map_to_world[robot], np.asarray(goal)[None])[0]
+            cell = ((y - info.origin.position.y) / info.resolution, (x - info.origin.position.x) / info.resolution)
+            if near_clusters(clusters, cell, self.goal_frontier_margin / info.resolution)[0]:
+                return True
+        return False
+
+    def lookup_robot_pose(self, robot_name):
+        """Position of robot_name's base in its own map frame, or None if TF does not have it."""
         try:
             transform = self.tf_buffer.lookup_transform(
-                source_frame, robot_frame, rclpy.time.Time(), timeout=rclpy.duration.Duration(seconds=0.5))
-            rx = transform.transform.translation.x
-            ry = transform.transform.translation.y
-            return np.hypot(cx - rx, cy - ry)
+                f'{robot_name}/map', f'{robot_name}/base_link', rclpy.time.Time(),
+                timeout=rclpy.duration.Duration(seconds=0.5))
         except Exception as e:
-            self.get_logger().warn(f"TF transform failed for distance calculation: {e}")
-            return float('inf')
-
-    def send_goal(self, cell, map_msg, source_frame, pub):
-        y, x = cell
-        resolution = map_msg.info.resolution
-        origin = map_msg.info.origin.position
-
-        local_goal = PoseStamped()
-        local_goal.header.frame_id = source_frame
-        local_goal.header.stamp = self.latest_clock if self.sim_time and self.latest_clock else self.get_clock().now().to_msg()
-        local_goal.pose.position.x = origin.x + (x + 0.5) * resolution
-        local_goal.pose.position.y = origin.y + (y + 0.5) * resolution
-        local_goal.pose.position.z = 0.0
-        local_goal.pose.orientation.w = 1.0
+            self.get_logger().warn(f"TF transform failed for {robot_name} pose: {e}")
+            return None
+        return RobotPose(transform.transform.translation.x, transform.transform.translation.y)
 
+    def lookup_planar_transform(self, target_frame, source_frame):
+        """Transform2D taking source_frame points into target_frame, or None if TF does not have it."""
         try:
             transform = self.tf_buffer.lookup_transform(
-                'world', source_frame, rclpy.time.Time(), timeout=rclpy.duration.Duration(seconds=0.5)
-            )
-            world_goal = PoseStamped()
-            world_goal.pose = do_transform_pose(local_goal.pose, transform)
-            world_goal.header.stamp = local_goal.header.stamp
-            world_goal.header.frame_id = 'world'
-            pub.publish(world_goal)
-
-            self.get_logger().info(f"Sent goal to {pub.topic} at ({world_goal.pose.position.x:.2f}, {world_goal.pose.position.y:.2f})")
+                target_frame, source_frame, rclpy.time.Time(), timeout=rclpy.duration.Duration(seconds=0.5))
         except Exception as e:
-            self.get_logger().warn(f"TF transform failed from {source_frame} to world: {e}")
+            self.get_logger().warn(f"TF transform failed from {source_frame} to {target_frame}: {e}")
+            return None
+        t = transform.transform
+        return Transform2D(t.translation.x, t.translation.y, yaw_from_quaternion(t.rotation))
+
+    def path_cost_field(self, layers, pose):
+        """Path cost in metres from pose to every cell of the map, inf where there is no path."""
+        info = layers.info
+        x = int((pose.x - info.origin.position.x) / info.resolution)
+        y = int((pose.y - info.origin.position.y) / info.resolution)
+        return layers.path_costs(y, x) * info.resolution
+
+    def path_costs_to(self, robot_name, points, pose, map_to_world):
+        """Path cost in metres from robot_name to each world (x, y) point; inf off its map or without TF."""
+        if pose is None or map_to_world is None:
+            return np.full(len(points), np.inf)
+        layers = self.local_layers[robot_name]
+        info = layers.info
+        field = self.path_cost_field(layers, pose)
+        local = inverse_transform_points(map_to_world, points)
+        x = np.floor((local[:, 0] - info.origin.position.x) / info.resolution).astype(np.int64)
+        y = np.floor((local[:, 1] - info.origin.position.y) / info.resolution).astype(np.int64)
+        inside = (x >= 0) & (x < info.width) & (y >= 0) & (y < info.height)
+        costs = np.full(len(points), np.inf)
+        costs[inside] = field[y[inside], x[inside]]
+        return costs
+
+    def local_candidates(self, robot_name, layers, pose):
+        """robot_name's reachable local frontier clusters that are not blacklisted, cheapest path first.
+
+        Without a pose there is no path cost; the clusters then keep their
+        order and only blacklisted ones are dropped.
+        """
+        frontiers = self.find_frontiers(layers)
+        info = layers.info
+        points = cell_centres([f.goal for f in frontiers], info.resolution, info.origin.position.x, info.origin.position.y)
+        now = self.get_clock().now().nanoseconds / 1e9
+        blacklist = self.blacklists[robot_name]
+        blacklist.expire(now)
+        blocked = blacklist.contains(points, now)
+        stalled = self.stalls[robot_name].update(points, distances_from(pose, points) <= self.stall_distance, now)
+        for x, y in points[stalled & ~blocked]:
+            self.get_logger().warn(f"Blacklisting unreachable frontier at ({x:.2f}, {y:.2f}) for {robot_name}")
+            blacklist.add(x, y, now)
+        keep = ~(blocked | stalled)
+        if pose is None:
+            costs = np.zeros(len(frontiers))
+        else:
+            field = self.path_cost_field(layers, pose)
+            costs = np.array([field[f.goal] for f in frontiers])
+            keep &= np.isfinite(costs)
+        order = np.flatnonzero(keep)
+        order = order[np.argsort(costs[order], kind='stable')]
+        return [frontiers[i] for i in order]
+
+    def send_goal(self, robot_name, point, map_to_world):
+        """Send robot_name to the world (x, y) point, through Nav2 if its action server is up."""
+        goal = PoseStamped()
+        goal.header.frame_id = 'world'
+        goal.header.stamp = self.latest_clock if self.sim_time and self.latest_clock else self.get_clock().now().to_msg()
+        goal.pose.position.x = float(point[0])
+        goal.pose.position.y = float(point[1])
+        goal.pose.position.z = 0.0
+        goal.pose.orientation.w = 1.0
+
+        self.goals[robot_name] = point
+        self.goal_local_points[robot_name] = inverse_transform_points(map_to_world, np.asarray(point)[None])[0]
+        self.goal_handles[robot_name] = None
+        self.goal_seq[robot_name] += 1
+        seq = self.goal_seq[robot_name]
+
+        client = self.nav_clients[robot_name]
+        if not client.server_is_ready():
+            # Nothing to track; the robot is planned for again on the next event.
+            self.goal_pubs[robot_name].publish(goal)
+            self.get_logger().info(f"Sent goal to {self.goal_pubs[robot_name].topic} at ({point[0]:.2f}, {point[1]:.2f})")
+            return
+
+        nav_goal = NavigateToPose.Goal()
+        nav_goal.pose = goal
+        self.scheduler.goal_sent(robot_name, self.now_seconds())
+        future = client.send_goal_async(
+            nav_goal, feedback_callback=lambda msg: self.navigation_feedback(robot_name, seq, msg))
+        future.add_done_callback(lambda f: self.goal_response(robot_name, seq, f))
+        self.get_logger().info(f"Sent NavigateToPose goal to {robot_name} at ({point[0]:.2f}, {point[1]:.2f})")
+
+    def goal_response(self, robot_name, seq, future):
+        if seq != self.goal_seq[robot_name]:
+            return
+        handle = future.result()
+        if not handle.accepted:
+            self.get_logger().warn(f"NavigateToPose goal rejected for {robot_name}")
+            self.goal_failed(robot_name)
+            return
+        self.goal_handles[robot_name] = handle
+        handle.get_result_async().add_done_callback(lambda f: self.goal_result(robot_name, seq, f))
 
-    def compute_reachability_mask(self, map_msg, source_frame):
+    def goal_result(self, robot_name, seq, future):
+        if seq != self.goal_seq[robot_name]:
+            # Result of a goal that a newer one replaced.
+            return
+        if future.result().status == GoalStatus.STATUS_SUCCEEDED:
+            self.goals[robot_name] = None
+            self.goal_handles[robot_name] = None
+            self.scheduler.goal_finished(robot_name, self.now_seconds())
+        else:
+            self.get_logger().warn(f"NavigateToPose goal of {robot_name} ended with status {future.result().status}")
+            self.goal_failed(robot_name)
+
+    def navigation_feedback(self, robot_name, seq, msg):
+        if seq != self.goal_seq[robot_name]:
+            return
+        if self.scheduler.feedback(robot_name, msg.feedback.distance_remaining, self.now_seconds()):
+            handle = self.goal_handles[robot_name]
+            if handle is not None:
+                self.get_logger().warn(f"{robot_name} makes no progress towards its goal, cancelling it")
+                self.goal_handles[robot_name] = None
+                # The cancelled result comes back through goal_result, which blacklists the goal.
+                handle.cancel_goal_async()
+
+    def goal_failed(self, robot_name):
+        """Blacklist robot_name's goal and let it be planned for again."""
+        now = self.now_seconds()
+        x, y = self.goal_local_points[robot_name]
+        self.blacklists[robot_name].add(float(x), float(y), now)
+        self.goals[robot_name] = None
+        self.goal_handles[robot_name] = None
+        self.scheduler.goal_finished(robot_name, now)
+
+    def robot_component(self, layers, source_frame):
+        """Label of the free-space component of layers' map that source_frame's origin is in; None without TF."""
+        info = layers.info
         try:
             transform = self.tf_buffer.lookup_transform(
-                map_msg.header.frame_id, source_frame, rclpy.time.Time(), timeout=rclpy.duration.Duration(seconds=0.5)
+                layers.msg.header.frame_id, source_frame, rclpy.time.Time(), timeout=rclpy.duration.Duration(seconds=0.5)
             )
             tx = transform.transform.translation.x
             ty = transform.transform.translation.y
         except Exception as e:
             self.get_logger().warn(f"Could not get TF for reachability mask: {e}")
-            return np.ones((map_msg.info.height, map_msg.info.width), dtype=bool)
-
-        resolution = map_msg.info.resolution
-        ox = map_msg.info.origin.position.x
-        oy = map_msg.info.origin.position.y
-        sx = int((tx - ox) / resolution)
-        sy = int((ty - oy) / resolution)
-
-        height = map_msg.info.height
-        width = map_msg.info.width
-        data = np.array(map_msg.data, dtype=np.int8).reshape((height, width))
-        reachable = np.zeros((height, width), dtype=bool)
-        visited = np.zeros((height, width), dtype=bool)
+            return None
 
-        if not (0 <= sx < width and 0 <= sy < height):
+        sx = int((tx - info.origin.position.x) / info.resolution)
+        sy = int((ty - info.origin.position.y) / info.resolution)
+        if not (0 <= sx < info.width and 0 <= sy < info.height):
             self.get_logger().warn("Robot start pose out of map bounds for reachability")
-            return reachable
+        return layers.component(sy, sx)
 
-        queue = [(sy, sx)]
-        while queue:
-            y, x = queue.pop()
-            if visited[y, x]:
-                continue
-            visited[y, x] = True
-            if data[y, x] != 0:
-                continue
-            reachable[y, x] = True
-            for dy in [-1, 0, 1]:
-                for dx in [-1, 0, 1]:
-                    ny, nx = y + dy, x + dx
-                    if 0 <= ny < height and 0 <= nx < width and not visited[ny, nx]:
-                        queue.append((ny, nx))
-        return reachable
-
-    def find_frontiers(self, map_msg, reachable_mask=None):
-        height = map_msg.info.height
-        width = map_msg.info.width
-        data = np.array(map_msg.data, dtype=np.int8).reshape((height, width))
-        frontiers = []
-
-        for y in range(2, height - 2):
-            for x in range(2, width - 2):
-                if data[y, x] != 0:
-                    continue
-                if reachable_mask is not None and not reachable_mask[y, x]:
-                    continue
-                neighborhood = data[y-1:y+2, x-1:x+2].flatten()
-                if -1 not in neighborhood:
-                    continue
-                unknown_area = data[y-2:y+3, x-2:x+3]
-                if np.sum(unknown_area == -1) < self.min_unknown_cells:
-                    continue
-                if np.sum(unknown_area == 100) > 2:
-                    continue
-                frontiers.append((y, x))
-        return frontiers
-
-    def publish_frontier_markers(self, frontiers, map_msg, ns="frontiers", source_frame="world"):
+    def find_frontiers(self, layers, components=None):
+        return layers.frontiers(self.min_unknown_cells, components, self.min_frontier_size, self.frontier_gain_radius)
+
+    def publish_frontier_markers(self, frontiers, map_msg, ns="frontiers", source_frame="world", transform=None):
+        """One SPHERE_LIST of cluster goals in the world frame; transform is source_frame to world if known."""
+        # Nobody is looking: skip building the message altogether.
+        if self.marker_pub.get_subscription_count() == 0:
+            return
         marker_array = MarkerArray()
         marker = Marker()
         marker.header.frame_id = "world"
@@ -267,36 +459,19 @@ class MultiRobotExplorer(Node):
             marker.color.g = 0.0
             marker.color.b = 0.0
 
-        marker.lifetime = Duration(sec=2)
-        resolution = map_msg.info.resolution
-        origin = map_msg.info.origin.position
-
-        try:
-            transform = self.tf_buffer.lookup_transform(
-                'world', source_frame, rclpy.time.Time(), timeout=rclpy.duration.Duration(seconds=0.5)
-            )
-        except Exception as e:
-            self.get_logger().warn(f"TF transform failed from {source_frame} to world: {e}")
-            return
-
-        for y, x in frontiers:
-            local_x = origin.x + (x + 0.5) * resolution
-            local_y = origin.y + (y + 0.5) * resolution
-            pose = PoseStamped()
-            pose.header.frame_id = source_frame
-            pose.pose.position.x = local_x
-            pose.pose.position.y = local_y
-            pose.pose.position.z = 0.1
-            pose.pose.orientation.w = 1.0
-            try:
-                transformed = do_transform_pose(pose.pose, transform)
-                marker.points.append(Point(
-                    x=transformed.position.x,
-                    y=transformed.position.y,
-                    z=transformed.position.z
-                ))
-            except Exception as e:
-                self.get_logger().warn(f"Transforming marker point failed: {e}")
+        # Planning runs are event driven, so a marker stays up until the next one replaces it.
+        marker.lifetime = Duration()
+        info = map_msg.info
+        points = cell_centres([f.goal for f in frontiers], info.resolution, info.origin.position.x, info.origin.position.y)
+        if len(points) > self.max_marker_points:
+            points = points[np.linspace(0, len(points) - 1, self.max_marker_points).astype(np.int64)]
+        if source_frame != 'world':
+            if transform is None:
+                transform = self.lookup_planar_transform('world', source_frame)
+            if transform is None:
+                return
+            points = transform_points(transform, points)
+        marker.points = [Point(x=x, y=y, z=0.1) for x, y in points.tolist()]
 
         marker_array.markers.append(marker)
         self.marker_pub.publish(marker_array)
@@ -0,0 +1,47 @@
+"""Per-robot cache of ORB keypoints and descriptors, keyed on map content."""
+from collections import namedtuple
+import zlib
+
+import cv2
+
+from map_merge_py.grid_conversion import grid_view
+from map_merge_py.timing import NULL_TIMER
+
+MapFingerprint = namedtuple('MapFingerprint', ['width', 'height', 'resolution', 'origin_x', 'origin_y', 'crc'])
+MapFeatures = namedtuple('MapFeatures', ['fingerprint', 'image', 'keypoints', 'descriptors'])
+
+
+def map_fingerprint(msg):
+    """Cheap identity of an OccupancyGrid: geometry plus a CRC32 of the raw cells."""
+    info = msg.info
+    return MapFingerprint(
+        info.width, info.height, info.resolution,
+        info.origin.position.x, info.origin.position.y,
+        zlib.crc32(grid_view(msg)))
+
+
+def preprocess_image(img):
+    return cv2.medianBlur(img, 3)
+
+
+class FeatureCache:
+    def __init__(self, n_features=1000):
+        self.orb = cv2.ORB_create(n_features)
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, robot, fingerprint, img, timer=NULL_TIMER):
+        """Return MapFeatures for robot, running detection only if fingerprint changed."""
+        entry = self.entries.get(robot)
+        if entry is not None and entry.fingerprint == fingerprint:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        with timer.stage('blur'):
+            blurred = preprocess_image(img)
+        with timer.stage('detect'):
+            keypoints, descriptors = self.orb.detectAndCompute(blurred, None)
+        entry = MapFeatures(fingerprint, blurred, keypoints, descriptors)
+        self.entries[robot] = entry
+        return entry
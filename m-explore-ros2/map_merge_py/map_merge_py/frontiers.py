@@ -0,0 +1,111 @@
+"""Frontier detection on int8 occupancy grids as whole-array operations."""
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# Cells this close to the grid edge never count as frontiers, so every
+# 5x5 window used below lies inside the grid.
+BORDER = 2
+# A frontier's 5x5 window may hold at most this many occupied (100) cells.
+MAX_OCCUPIED_CELLS = 2
+
+NEIGHBOURHOOD = np.ones((3, 3), dtype=np.uint8)
+
+# One 8-connected group of frontier cells, in grid cells. centroid is the
+# (y, x) mean of its cells, goal the cell closest to it (the centroid itself
+# may fall outside free space), bbox (x, y, width, height) and gain the
+# number of unknown cells closer to this cluster than to any other and
+# within the gain radius.
+FrontierCluster = namedtuple('FrontierCluster', 'size centroid goal bbox gain')
+
+
+def cell_masks(grid):
+    """(free, unknown, occupied) boolean masks of an int8 grid."""
+    return grid == 0, grid == -1, grid == 100
+
+
+def frontier_mask(grid, min_unknown_cells, reachable_mask=None, masks=None):
+    """Boolean mask of frontier cells.
+
+    A frontier cell is free (0), has an unknown (-1) cell among its 8
+    neighbours, at least min_unknown_cells unknown and at most
+    MAX_OCCUPIED_CELLS occupied (100) cells in its 5x5 window, and lies in
+    reachable_mask when one is given. masks are the cell_masks of grid, if
+    the caller has them already.
+    """
+    free, unknown, occupied = masks if masks is not None else cell_masks(grid)
+    unknown = unknown.view(np.uint8)
+    occupied = occupied.view(np.uint8)
+    # Window sums are at most 25, so uint8 box filters cannot saturate.
+    unknown_count = cv2.boxFilter(unknown, -1, (5, 5), normalize=False, borderType=cv2.BORDER_CONSTANT)
+    occupied_count = cv2.boxFilter(occupied, -1, (5, 5), normalize=False, borderType=cv2.BORDER_CONSTANT)
+    near_unknown = cv2.dilate(unknown, NEIGHBOURHOOD)
+
+    mask = free & (near_unknown > 0)
+    mask &= unknown_count >= min_unknown_cells
+    mask &= occupied_count <= MAX_OCCUPIED_CELLS
+    if reachable_mask is not None:
+        mask &= reachable_mask
+    mask[:BORDER] = False
+    mask[-BORDER:] = False
+    mask[:, :BORDER] = False
+    mask[:, -BORDER:] = False
+    return mask
+
+
+def find_frontiers(grid, min_unknown_cells, reachable_mask=None):
+    """Frontier cells as (y, x) tuples in row-major order."""
+    return [tuple(cell) for cell in np.argwhere(frontier_mask(grid, min_unknown_cells, reachable_mask)).tolist()]
+
+
+def frontier_clusters(grid, min_unknown_cells, reachable_mask=None, min_size=1, gain_radius=10, masks=None):
+    """8-connected clusters of frontier cells with at least min_size cells, largest first."""
+    masks = masks if masks is not None else cell_masks(grid)
+    return cluster_frontiers(frontier_mask(grid, min_unknown_cells, reachable_mask, masks), masks[1], min_size, gain_radius)
+
+
+def cluster_frontiers(frontier, unknown, min_size=1, gain_radius=10):
+    """frontier_clusters from a frontier mask and the unknown mask of its grid."""
+    mask = frontier.view(np.uint8)
+    count, labels, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8, ltype=cv2.CV_32S)
+    if count <= 1:
+        return []
+
+    # Give every unknown cell to its nearest frontier cell's cluster.
+    distance, nearest = cv2.distanceTransformWithLabels(
+        1 - mask, cv2.DIST_L2, cv2.DIST_MASK_5, labelType=cv2.DIST_LABEL_PIXEL)
+    cells = np.argwhere(mask)
+    # Pixel labels number the zero pixels of the input in row-major order,
+    # which is the order argwhere returns them in.
+    cell_labels = labels[cells[:, 0], cells[:, 1]]
+    near = unknown & (distance <= gain_radius)
+    gain = np.bincount(cell_labels[nearest[near] - 1], minlength=count)
+
+    # Goal: the cluster cell closest to the cluster centroid.
+    offset = cells - centroids[cell_labels][:, ::-1]
+    order = np.lexsort((np.einsum('ij,ij->i', offset, offset), cell_labels))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = cell_labels[order][1:] != cell_labels[order][:-1]
+    goals = np.zeros((count, 2), dtype=np.int64)
+    goals[cell_labels[order][first]] = cells[order][first]
+
+    keep = np.flatnonzero(stats[:, cv2.CC_STAT_AREA] >= min_size)
+    keep = keep[keep > 0]
+    clusters = [
+        FrontierCluster(size, (cy, cx), tuple(goal), tuple(bbox), g)
+        for size, (cx, cy), goal, bbox, g in zip(
+            stats[keep, cv2.CC_STAT_AREA].tolist(), centroids[keep].tolist(), goals[keep].tolist(),
+            stats[keep, :cv2.CC_STAT_AREA].tolist(), gain[keep].tolist())]
+    clusters.sort(key=lambda cluster: cluster.size, reverse=True)
+    return clusters
+
+
+def near_clusters(clusters, cells, margin=0):
+    """Boolean per (y, x) row of cells: within margin cells of the bounding box of one of clusters."""
+    cells = np.asarray(cells, dtype=np.float64).reshape(-1, 2)
+    if not clusters:
+        return np.zeros(len(cells), dtype=bool)
+    x, y, width, height = np.array([cluster.bbox for cluster in clusters], dtype=np.float64).T
+    cy, cx = cells[:, :1], cells[:, 1:]
+    return ((cx >= x - margin) & (cx < x + width + margin) & (cy >= y - margin) & (cy < y + height + margin)).any(axis=1)
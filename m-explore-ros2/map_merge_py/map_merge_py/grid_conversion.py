@@ -0,0 +1,109 @@
+"""Conversions between nav_msgs/OccupancyGrid data and NumPy images.
+
+Occupancy values are int8 (-1 unknown, 0 free, 1..100 occupied). Viewed as
+uint8 they index straight into a 256-entry lookup table, so every conversion
+is a single pass over the grid.
+"""
+import array
+
+import cv2
+import numpy as np
+
+UNKNOWN = 127
+FREE = 255
+OCCUPIED = 0
+
+
+def _build_grid_to_image_lut():
+    # Index is the uint8 view of the int8 occupancy value. Anything that is
+    # not free or unknown (including negative values other than -1) is
+    # treated as an obstacle, same as the original mask-based conversion.
+    lut = np.full(256, OCCUPIED, dtype=np.uint8)
+    lut[0] = FREE
+    lut[np.uint8(np.int8(-1))] = UNKNOWN
+    return lut
+
+
+def _build_image_to_grid_lut():
+    lut = np.full(256, -1, dtype=np.int8)
+    lut[FREE] = 0
+    lut[OCCUPIED] = 100
+    return lut.view(np.uint8)
+
+
+GRID_TO_IMAGE_LUT = _build_grid_to_image_lut()
+IMAGE_TO_GRID_LUT = _build_image_to_grid_lut()
+
+
+def grid_view(msg):
+    """Return msg.data as a (height, width) int8 array, without copying when possible."""
+    height = msg.info.height
+    width = msg.info.width
+    try:
+        data = np.frombuffer(msg.data, dtype=np.int8)
+    except TypeError:
+        # Plain Python sequences (hand-built messages) have no buffer.
+        data = np.asarray(msg.data, dtype=np.int8)
+    return data.reshape((height, width))
+
+
+def update_view(msg):
+    """Return the data of a map_msgs/OccupancyGridUpdate as a (height, width) int8 array, like grid_view."""
+    try:
+        data = np.frombuffer(msg.data, dtype=np.int8)
+    except TypeError:
+        data = np.asarray(msg.data, dtype=np.int8)
+    return data.reshape((msg.height, msg.width))
+
+
+def grid_to_image(grid):
+    """Map an int8 occupancy array to a uint8 image (0 occupied, 127 unknown, 255 free)."""
+    return cv2.LUT(np.ascontiguousarray(grid).view(np.uint8), GRID_TO_IMAGE_LUT)
+
+
+def occupancy_grid_to_image(msg):
+    return grid_to_image(grid_view(msg))
+
+
+def image_to_grid(img):
+    """Inverse of grid_to_image: returns a contiguous int8 occupancy array."""
+    return cv2.LUT(np.ascontiguousarray(img), IMAGE_TO_GRID_LUT).view(np.int8)
+
+
+def grid_to_msg_data(grid):
+    """Pack a contiguous int8 array into the array.array('b') rclpy uses for int8[] fields."""
+    return array.array('b', np.ascontiguousarray(grid, dtype=np.int8).tobytes())
+
+
+def fill_occupancy_grid(msg, img):
+    """Set msg.data (and width/height) from a uint8 map image."""
+    msg.info.width = img.shape[1]
+    msg.info.height = img.shape[0]
+    msg.data = grid_to_msg_data(image_to_grid(img))
+    return msg
+
+
+def fill_occupancy_grid_update(msg, img, x, y, width, height):
+    """Set a map_msgs/OccupancyGridUpdate to the (x, y, width, height) window of a uint8 map image."""
+    msg.x = x
+    msg.y = y
+    msg.width = width
+    msg.height = height
+    msg.data = grid_to_msg_data(image_to_grid(img[y:y + height, x:x + width]))
+    return msg
+
+
+def rescale_image(img, factor):
+    """Resample a map image by factor without inventing new cell values.
+
+    Downsampling keeps a cell occupied if any source cell was, free if at
+    least half were free, and unknown otherwise, so thin walls survive.
+    """
+    if factor == 1.0:
+        return img
+    size = (max(1, int(round(img.shape[1] * factor))), max(1, int(round(img.shape[0] * factor))))
+    if factor > 1.0:
+        return cv2.resize(img, size, interpolation=cv2.INTER_NEAREST)
+    occupied = cv2.resize((img == OCCUPIED).astype(np.float32), size, interpolation=cv2.INTER_AREA)
+    free = cv2.resize((img == FREE).astype(np.float32), size, interpolation=cv2.INTER_AREA)
+    return np.where(occupied > 0, OCCUPIED, np.where(free >= 0.5, FREE, UNKNOWN)).astype(np.uint8)
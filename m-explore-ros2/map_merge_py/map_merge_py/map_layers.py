@@ -0,0 +1,193 @@
+"""Arrays the explorer derives from one OccupancyGrid topic, kept up to date patch by patch.
+
+A MapLayers object follows one topic and owns a copy of its grid. Full
+maps (update) and OccupancyGridUpdate patches (apply_update) both end up
+as a patch of the cells that changed. Layers are built on first use and
+memoized: the free, unknown and occupied masks, the frontier masks, the
+connected components of free space, reachable masks, frontier clusters
+and path cost fields. A patch fixes the masks and frontier masks in place
+within the patch plus a margin. Path cost graphs of large maps are
+patched in the blocks that changed, see PathCostFields. Components,
+clusters and path cost fields are still recomputed over the whole grid on
+the next request, components and graphs only if the patch changed which
+cells are free or occupied. Cached arrays are read-only.
+"""
+import numpy as np
+
+from map_merge_py.frontiers import BORDER, cell_masks, cluster_frontiers, frontier_mask
+from map_merge_py.grid_conversion import grid_view
+from map_merge_py.map_updates import MapGeometry
+from map_merge_py.path_cost import PathCostFields
+from map_merge_py.reachability import ReachabilityLabels
+
+# Frontier cells depend on the 5x5 window around them.
+FRONTIER_REACH = 2
+
+
+def map_geometry(info):
+    return MapGeometry(info.width, info.height, info.resolution, info.origin.position.x, info.origin.position.y)
+
+
+class MapLayers:
+    def __init__(self, inflation_radius=0.0, inflation_cost=0.0):
+        # Inflation radius in metres; the path cost fields want cells.
+        self.inflation_radius = inflation_radius
+        self.inflation_cost = inflation_cost
+        self.msg = None
+        self.geometry = None
+        self.grid = None
+        # Bumped whenever the free cells change, and whenever the free or occupied cells change.
+        self.free_version = 0
+        self.cost_version = 0
+        self._layers = {}
+        self._reachability = ReachabilityLabels()
+        self._path_costs = PathCostFields()
+
+    @property
+    def info(self):
+        return self.msg.info
+
+    def update(self, msg):
+        """Follow a full map message; True if its geometry or any cell differs from the current map."""
+        if msg is self.msg:
+            return False
+        geometry = map_geometry(msg.info)
+        grid = grid_view(msg)
+        self.msg = msg
+        if geometry != self.geometry:
+            self.geometry = geometry
+            self.grid = grid.copy()
+            self.free_version += 1
+            self.cost_version += 1
+            self._layers = {}
+            return True
+        changed = grid != self.grid
+        rows = np.flatnonzero(changed.any(axis=1))
+        if not len(rows):
+            return False
+        cols = np.flatnonzero(changed.any(axis=0))
+        y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+        return self.apply_update(int(x0), int(y0), grid[y0:y1, x0:x1])
+
+    def apply_update(self, x, y, patch):
+        """Write the int8 patch with top-left cell (x, y); True if any cell changed.
+
+        Cells of the patch outside the current map are ignored, as is
+        everything before the first full map.
+        """
+        if self.grid is None:
+            return False
+        height, width = self.grid.shape
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + patch.shape[1], width), min(y + patch.shape[0], height)
+        if x0 >= x1 or y0 >= y1:
+            return False
+        window = (slice(y0, y1), slice(x0, x1))
+        patch = patch[y0 - y:y1 - y, x0 - x:x1 - x]
+        if np.array_equal(self.grid[window], patch):
+            return False
+
+        old_free, _, old_occupied = cell_masks(self.grid[window])
+        self.grid[window] = patch
+        free, unknown, occupied = cell_masks(patch)
+        free_changed = not np.array_equal(free, old_free)
+        if free_changed:
+            self.free_version += 1
+        if free_changed or not np.array_equal(occupied, old_occupied):
+            self.cost_version += 1
+
+        layers = {}
+        if 'masks' in self._layers:
+            for mask, new in zip(self._layers['masks'], (free, unknown, occupied)):
+                mask.flags.writeable = True
+                mask[window] = new
+                mask.flags.writeable = False
+            layers['masks'] = self._layers['masks']
+        for key, mask in self._layers.items():
+            if key[0] == 'frontier_mask':
+                self._patch_frontier_mask(mask, key[1], y0, y1, x0, x1)
+                layers[key] = mask
+        # Reachable masks and clusters are regrouped from these on the next request.
+        self._layers = layers
+        return True
+
+    def _patch_frontier_mask(self, mask, min_unknown_cells, y0, y1, x0, x1):
+        height, width = self.grid.shape
+        # Cells within FRONTIER_REACH of the patch may change; deciding them
+        # needs FRONTIER_REACH more cells of context around them.
+        oy0, oy1 = max(0, y0 - FRONTIER_REACH), min(height, y1 + FRONTIER_REACH)
+        ox0, ox1 = max(0, x0 - FRONTIER_REACH), min(width, x1 + FRONTIER_REACH)
+        cy0, cy1 = max(0, oy0 - FRONTIER_REACH), min(height, oy1 + FRONTIER_REACH)
+        cx0, cx1 = max(0, ox0 - FRONTIER_REACH), min(width, ox1 + FRONTIER_REACH)
+        context = (slice(cy0, cy1), slice(cx0, cx1))
+        masks = tuple(m[context] for m in self.masks)
+        sub = frontier_mask(self.grid[context], min_unknown_cells, masks=masks)
+        mask.flags.writeable = True
+        mask[oy0:oy1, ox0:ox1] = sub[oy0 - cy0:oy1 - cy0, ox0 - cx0:ox1 - cx0]
+        # The context clears its own border; only the map's border stays cleared.
+        mask[:BORDER] = False
+        mask[-BORDER:] = False
+        mask[:, :BORDER] = False
+        mask[:, -BORDER:] = False
+        mask.flags.writeable = False
+
+    def _layer(self, key, compute):
+        value = self._layers.get(key)
+        if value is None:
+            value = self._layers[key] = compute()
+            for array in value if isinstance(value, tuple) else (value,):
+                if isinstance(array, np.ndarray):
+                    array.flags.writeable = False
+        return value
+
+    @property
+    def masks(self):
+        """(free, unknown, occupied) boolean masks."""
+        return self._layer('masks', lambda: cell_masks(self.grid))
+
+    def frontier_mask(self, min_unknown_cells):
+        return self._layer(('frontier_mask', min_unknown_cells),
+                           lambda: frontier_mask(self.grid, min_unknown_cells, masks=self.masks))
+
+    def _labels(self):
+        self._reachability.update(self.grid, self.free_version, self.masks[0])
+        return self._reachability
+
+    def component(self, y, x):
+        """Label of the free-space component under cell (y, x); 0 outside the grid or on a non-free cell."""
+        return self._labels().label_at(y, x)
+
+    def reachable_mask(self, components):
+        """Union of the free-space components with the given labels."""
+        components = tuple(sorted(set(components)))
+
+        def compute():
+            labels = self._labels()
+            masks = [labels.mask(label) for label in components]
+            if len(masks) == 1:
+                return masks[0]
+            mask = masks[0].copy()
+            for other in masks[1:]:
+                mask |= other
+            return mask
+        return self._layer(('reachable', components), compute)
+
+    def frontiers(self, min_unknown_cells, components=None, min_size=1, gain_radius=10):
+        """frontier_clusters of the map, restricted to the given free-space components unless None."""
+        components = None if components is None else tuple(sorted(set(components)))
+
+        def compute():
+            mask = self.frontier_mask(min_unknown_cells)
+            if components is not None:
+                mask = mask & self.reachable_mask(components)
+            return cluster_frontiers(mask, self.masks[1], min_size, gain_radius)
+        return self._layer(('frontiers', min_unknown_cells, components, min_size, gain_radius), compute)
+
+    def path_costs(self, y, x):
+        """Path cost in cells from cell (y, x) to every cell; see PathCostFields."""
+        fields = self._path_costs
+        fields.inflation_radius = self.inflation_radius / self.info.resolution
+        fields.inflation_cost = self.inflation_cost
+        free, _, occupied = self.masks
+        fields.update(self.grid, self.cost_version, free, occupied)
+        return fields.cost_from(y, x)
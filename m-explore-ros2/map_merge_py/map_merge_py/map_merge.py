@@ -1,17 +1,36 @@
 import rclpy
+from rclpy.callback_groups import MutuallyExclusiveCallbackGroup
+from rclpy.executors import MultiThreadedExecutor
 from rclpy.node import Node
+from rclpy.qos import DurabilityPolicy, QoSProfile, ReliabilityPolicy
+from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
 from geometry_msgs.msg import TransformStamped
+from map_msgs.msg import OccupancyGridUpdate
 from nav_msgs.msg import OccupancyGrid
-from rosgraph_msgs.msg import Clock
 from rcl_interfaces.msg import SetParametersResult
+from sensor_msgs.msg import CompressedImage
 from std_msgs.msg import Header
 import tf2_ros
 import numpy as np
-import cv2
-import math
 import threading
 import tf_transformations
+import os
 import time
+from collections import deque
+
+from map_merge_py.alignment_store import load_alignments, save_alignments
+from map_merge_py.debug_views import encode_image, render_match_overlay
+from map_merge_py.feature_cache import map_fingerprint
+from map_merge_py.grid_conversion import fill_occupancy_grid, fill_occupancy_grid_update, occupancy_grid_to_image
+from map_merge_py.merge_pipeline import MergePipeline, RobotMap
+from map_merge_py.map_updates import MapDeltaTracker, MapGeometry
+from map_merge_py.merge_worker import MergeWorker
+from map_merge_py.phase_correlation import PhaseCorrelationRegistration
+from map_merge_py.pyramid import PyramidRegistration
+from map_merge_py.registration import FeatureRegistration, MatchingEngine
+from map_merge_py.timing import StageTimer
+from map_merge_py.tracking import TransformTracker
+from map_merge_py.transform_schedule import TransformSchedule
 
 class MultiRobotMapMerger(Node):
     def __init__(self):
@@ -21,225 +40,419 @@ class MultiRobotMapMerger(Node):
         self.declare_parameter('map_publish_frequency', 1.0)
         self.declare_parameter('sim_time', True)
         self.declare_parameter('visualize', True)
-        self.declare_parameter('match_confidence_threshold', 65.0)
+        self.declare_parameter('match_confidence_threshold', 0.0)
+        self.declare_parameter('merge_tile_size', 64)
+        self.declare_parameter('discovery_rate', 0.2)
+        self.declare_parameter('robot_map_topic', 'map')
+        self.declare_parameter('robot_namespace', '')
+        self.declare_parameter('tracking_enabled', True)
+        self.declare_parameter('tracking_scale', 0.25)
+        self.declare_parameter('tracking_keep_ratio', 0.9)
+        self.declare_parameter('orb_features', 1000)
+        self.declare_parameter('matcher_backend', 'bf')
+        self.declare_parameter('matcher_ratio', 0.9)
+        self.declare_parameter('max_match_candidates', 500)
+        self.declare_parameter('min_inlier_ratio', 0.0)
+        self.declare_parameter('match_time_budget', 0.5)
+        self.declare_parameter('registration_mode', 'features')
+        self.declare_parameter('pyramid_levels', 2)
+        self.declare_parameter('pyramid_refine_level', 0)
+        self.declare_parameter('merge_resolution', 0.0)
+        self.declare_parameter('world_frame_robot', '')
+        self.declare_parameter('debug_image_rate', 1.0)
+        self.declare_parameter('debug_image_format', 'png')
+        self.declare_parameter('debug_max_matches', 50)
+        self.declare_parameter('publish_map_updates', True)
+        self.declare_parameter('full_map_period', 10.0)
+        self.declare_parameter('tf_mode', 'dynamic')
+        self.declare_parameter('tf_heartbeat_period', 0.0)
+        self.declare_parameter('alignment_cache_path', '~/.ros/map_merge_py/alignments.json')
+        self.declare_parameter('alignment_save_period', 10.0)
 
         self.publish_frequency = self.get_parameter('tf_publish_frequency').get_parameter_value().double_value
         self.map_publish_frequency = self.get_parameter('map_publish_frequency').get_parameter_value().double_value
         self.use_sim_time = self.get_parameter('sim_time').get_parameter_value().bool_value
         self.visualize = self.get_parameter('visualize').get_parameter_value().bool_value
         self.confidence_threshold = self.get_parameter('match_confidence_threshold').get_parameter_value().double_value
+        self.merge_tile_size = self.get_parameter('merge_tile_size').get_parameter_value().integer_value
+        self.discovery_rate = self.get_parameter('discovery_rate').get_parameter_value().double_value
+        self.robot_map_topic = self.get_parameter('robot_map_topic').get_parameter_value().string_value
+        self.robot_namespace = self.get_parameter('robot_namespace').get_parameter_value().string_value
+        self.tracking_enabled = self.get_parameter('tracking_enabled').get_parameter_value().bool_value
+        self.tracking_scale = self.get_parameter('tracking_scale').get_parameter_value().double_value
+        self.tracking_keep_ratio = self.get_parameter('tracking_keep_ratio').get_parameter_value().double_value
+        self.orb_features = self.get_parameter('orb_features').get_parameter_value().integer_value
+        self.matcher_backend = self.get_parameter('matcher_backend').get_parameter_value().string_value
+        self.matcher_ratio = self.get_parameter('matcher_ratio').get_parameter_value().double_value
+        self.max_match_candidates = self.get_parameter('max_match_candidates').get_parameter_value().integer_value
+        self.min_inlier_ratio = self.get_parameter('min_inlier_ratio').get_parameter_value().double_value
+        self.match_time_budget = self.get_parameter('match_time_budget').get_parameter_value().double_value
+        self.registration_mode = self.get_parameter('registration_mode').get_parameter_value().string_value
+        self.pyramid_levels = self.get_parameter('pyramid_levels').get_parameter_value().integer_value
+        self.pyramid_refine_level = self.get_parameter('pyramid_refine_level').get_parameter_value().integer_value
+        self.merge_resolution = self.get_parameter('merge_resolution').get_parameter_value().double_value
+        self.world_frame_robot = self.get_parameter('world_frame_robot').get_parameter_value().string_value
+        self.debug_image_rate = self.get_parameter('debug_image_rate').get_parameter_value().double_value
+        self.debug_image_format = self.get_parameter('debug_image_format').get_parameter_value().string_value
+        self.debug_max_matches = self.get_parameter('debug_max_matches').get_parameter_value().integer_value
+        self.publish_map_updates = self.get_parameter('publish_map_updates').get_parameter_value().bool_value
+        self.full_map_period = self.get_parameter('full_map_period').get_parameter_value().double_value
+        self.tf_mode = self.get_parameter('tf_mode').get_parameter_value().string_value
+        self.tf_heartbeat_period = self.get_parameter('tf_heartbeat_period').get_parameter_value().double_value
+        self.alignment_cache_path = os.path.expanduser(
+            self.get_parameter('alignment_cache_path').get_parameter_value().string_value)
+        self.alignment_save_period = self.get_parameter('alignment_save_period').get_parameter_value().double_value
 
         self.add_on_set_parameters_callback(self.update_parameter_callback)
 
-        self.robot1_pos = (0.0, 0.0)
-        self.robot2_pos = (0.0, 0.0)
+        # robot name -> (x, y, yaw) of '<robot>/map' in the world frame. The
+        # TF timer only reads it; writers replace the whole dict under
+        # pose_lock so the timer always sees a consistent snapshot.
+        self.robot_poses = {}
+        self.pose_lock = threading.Lock()
 
+        # TF broadcasting gets its own callback group so a multi-threaded
+        # executor never queues it behind map callbacks or discovery.
+        self.tf_callback_group = MutuallyExclusiveCallbackGroup()
+
+        # With use_sim_time the node clock follows /clock, so every stamp
+        # (TF, maps, diagnostics) comes from the same time source.
         if self.use_sim_time:
             self.set_parameters([rclpy.parameter.Parameter('use_sim_time', rclpy.Parameter.Type.BOOL, True)])
-            self.sim_time = None
-            self.create_subscription(Clock, '/clock', self.clock_callback, 10)
-
-        self.broadcaster = tf2_ros.TransformBroadcaster(self)
-        self.map_publisher = self.create_publisher(OccupancyGrid, '/map', 10)
 
-        self.timer = self.create_timer(1.0 / self.publish_frequency, self.timer_callback)
+        # 'dynamic' re-broadcasts the alignment on /tf every TF tick. 'static'
+        # latches it on /tf_static whenever it changes, plus an optional
+        # heartbeat every tf_heartbeat_period seconds; see TransformSchedule.
+        if self.tf_mode == 'static':
+            self.broadcaster = tf2_ros.StaticTransformBroadcaster(self)
+        else:
+            self.broadcaster = tf2_ros.TransformBroadcaster(self)
+        self.tf_schedule = TransformSchedule(self.tf_mode == 'static', self.tf_heartbeat_period)
+        # The full map is latched and only re-sent when its geometry changes,
+        # a new subscriber appears, or patches have gone out for
+        # full_map_period seconds (for nodes that only follow /map); everything
+        # else goes out as patches on /map_updates.
+        map_qos = QoSProfile(
+            depth=1, durability=DurabilityPolicy.TRANSIENT_LOCAL, reliability=ReliabilityPolicy.RELIABLE)
+        self.map_publisher = self.create_publisher(OccupancyGrid, '/map', map_qos)
+        self.map_updates_publisher = self.create_publisher(OccupancyGridUpdate, '/map_updates', 10)
+        self.map_deltas = MapDeltaTracker(self.merge_tile_size)
+        self.map_subscriber_count = 0
+        self.map_publish_bytes = 0
+        self.last_full_map = None
+        self.patched_since_full_map = False
+        self.diagnostics_publisher = self.create_publisher(DiagnosticArray, '/diagnostics', 10)
+
+        self.tf_periods = deque(maxlen=200)
+        self.last_tf_time = None
+        self.timer = self.create_timer(
+            1.0 / self.publish_frequency, self.timer_callback, callback_group=self.tf_callback_group)
         self.map_timer = self.create_timer(1.0 / self.map_publish_frequency, self.map_publish_callback)
 
-        self.map1_img = None
-        self.map2_img = None
-        self.map1_info = None
-        self.map2_info = None
-        self.merged_map_img = None
-
-        self.create_subscription(OccupancyGrid, '/robot_1/map', self.map1_callback, 10)
-        self.create_subscription(OccupancyGrid, '/robot_2/map', self.map2_callback, 10)
-
+        self.robot_maps = {}
+        self.map_subscriptions = {}
+        self.merge_count = 0
+        # (merge count, merged image, estimates, match features) of the last
+        # merge, replaced as a whole so the debug timer never mixes two merges.
+        self.debug_merge = (0, None, {}, {})
+        tracker = None
+        if self.tracking_enabled:
+            tracker = TransformTracker(scale=self.tracking_scale, keep_ratio=self.tracking_keep_ratio)
+        matcher = MatchingEngine(
+            backend=self.matcher_backend, ratio=self.matcher_ratio, max_candidates=self.max_match_candidates)
+        if self.registration_mode == 'pyramid':
+            registration = PyramidRegistration(
+                levels=self.pyramid_levels, refine_to_level=self.pyramid_refine_level,
+                n_features=self.orb_features, matcher=matcher)
+        elif self.registration_mode == 'phase':
+            registration = PhaseCorrelationRegistration(
+                levels=self.pyramid_levels, refine_to_level=self.pyramid_refine_level)
+        else:
+            registration = FeatureRegistration(n_features=self.orb_features, matcher=matcher)
+        self.pipeline = MergePipeline(
+            tile_size=self.merge_tile_size, confidence_threshold=self.confidence_threshold, tracker=tracker,
+            registration=registration, min_inlier_ratio=self.min_inlier_ratio,
+            match_time_budget=self.match_time_budget, resolution=self.merge_resolution or None,
+            world_frame_robot=self.world_frame_robot or None)
+        self.merge_worker = MergeWorker(self.pipeline, self.merge_done_callback, self.merge_error_callback)
+        self.saved_alignments = {}
+        self.last_alignment_save = None
+        if self.alignment_cache_path:
+            self.load_alignment_cache()
+
+        # Debug views are compressed image topics rendered at debug_image_rate,
+        # and only for topics somebody subscribes to.
+        self.debug_publishers = {}
+        self.debug_images = {}
         if self.visualize:
-            self.vis_thread = threading.Thread(target=self.visualization_loop, daemon=True)
-            self.vis_thread.start()
+            self.debug_callback_group = MutuallyExclusiveCallbackGroup()
+            self.add_debug_publisher('merged_map', '~/debug/merged_map/compressed')
+            self.add_debug_publisher('matches', '~/debug/matches/compressed')
+            self.debug_timer = self.create_timer(
+                1.0 / self.debug_image_rate, self.publish_debug_images, callback_group=self.debug_callback_group)
+
+        self.discovery_timer = self.create_timer(1.0 / self.discovery_rate, self.discover_robots)
+        self.discover_robots()
 
     def update_parameter_callback(self, params):
         result = SetParametersResult(successful=True)
         for param in params:
             if param.name == 'match_confidence_threshold' and param.type_ == rclpy.Parameter.Type.DOUBLE:
                 self.confidence_threshold = param.value
-                self.get_logger().info(f'Updating minimum confidence threshold to {self.confidence_threshold}')
+                self.pipeline.confidence_threshold = param.value or self.pipeline.registration.confidence_threshold
+                self.get_logger().info(
+                    f'Updating minimum confidence threshold to {self.pipeline.confidence_threshold}')
                 return result
         # Return success, so updates are seen via get_parameter()
         return result
 
-    def clock_callback(self, msg):
-        self.sim_time = msg.clock
-
-    def occupancy_grid_to_image(self, msg):
-        width = msg.info.width
-        height = msg.info.height
-        data = np.array(msg.data, dtype=np.int8).reshape((height, width))
-        img = np.zeros((height, width), dtype=np.uint8)
-        img[data == -1] = 127
-        img[data == 0] = 255
-        img[data > 0] = 0
-        return img
-
-    def preprocess_image(self, img):
-        return cv2.medianBlur(img, 3)
-
-    def check_map_overlap_orb(self, img1, img2):
-        orb = cv2.ORB_create(1000)
-        kp1, des1 = orb.detectAndCompute(img1, None)
-        kp2, des2 = orb.detectAndCompute(img2, None)
-
-        if des1 is None or des2 is None:
-            return 0.0, None, None, None
-
-        bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
-        matches = bf.match(des1, des2)
-        if not matches:
-            return 0.0, None, None, None
-
-        matches = sorted(matches, key=lambda x: x.distance)
-        good_matches = [m for m in matches if m.distance < 60]
-        confidence = len(good_matches)
-        return confidence, kp1, kp2, good_matches
-
-    def map1_callback(self, msg):
-        self.map1_img = self.occupancy_grid_to_image(msg)
-        self.map1_info = msg.info
-
-    def map2_callback(self, msg):
-        self.map2_img = self.occupancy_grid_to_image(msg)
-        self.map2_info = msg.info
+    def is_robot_map_topic(self, topic, types):
+        namespace, _, name = topic.rpartition('/')
+        return ('nav_msgs/msg/OccupancyGrid' in types
+                and name == self.robot_map_topic
+                and namespace != ''
+                and topic != self.map_publisher.topic_name
+                and self.robot_namespace in topic)
+
+    def discover_robots(self):
+        for topic, types in self.get_topic_names_and_types():
+            if not self.is_robot_map_topic(topic, types):
+                continue
+            robot = topic.rpartition('/')[0].lstrip('/')
+            if robot in self.map_subscriptions:
+                continue
+            self.get_logger().info(f'Adding robot [{robot}], subscribing to {topic}')
+            with self.pose_lock:
+                self.robot_poses = {**self.robot_poses, robot: (0.0, 0.0, 0.0)}
+            self.map_subscriptions[robot] = self.create_subscription(
+                OccupancyGrid, topic, lambda msg, robot=robot: self.map_callback(msg, robot), 10)
+            if self.visualize:
+                self.add_debug_publisher(robot, f'~/debug/{robot}/map/compressed')
+
+    def map_callback(self, msg, robot):
+        fingerprint = map_fingerprint(msg)
+        previous = self.robot_maps.get(robot)
+        if previous is not None and previous.fingerprint == fingerprint:
+            return
+        self.robot_maps[robot] = RobotMap(
+            occupancy_grid_to_image(msg), msg.info.resolution,
+            msg.info.origin.position.x, msg.info.origin.position.y, fingerprint)
 
     def timer_callback(self):
-        if self.use_sim_time:
-            if self.sim_time is None:
-                return
-            now = self.sim_time
-        else:
-            now = self.get_clock().now().to_msg()
-
-        # Robot 1 TF
-        tf1 = TransformStamped()
-        tf1.header.stamp = now
-        tf1.header.frame_id = 'world'
-        tf1.child_frame_id = 'robot_1/map'
-        tf1.transform.translation.x = self.robot1_pos[0]
-        tf1.transform.translation.y = self.robot1_pos[1]
-        tf1.transform.translation.z = 0.0
-        tf1.transform.rotation.x = 0.0
-        tf1.transform.rotation.y = 0.0
-        tf1.transform.rotation.z = 0.0
-        tf1.transform.rotation.w = 1.0
-        self.broadcaster.sendTransform(tf1)
-
-        # Robot 2 TF with rotation
-        tf2 = TransformStamped()
-        tf2.header.stamp = now
-        tf2.header.frame_id = 'world'
-        tf2.child_frame_id = 'robot_2/map'
-        tf2.transform.translation.x = self.robot2_pos[0]
-        tf2.transform.translation.y = self.robot2_pos[1]
-        tf2.transform.translation.z = 0.0
-        q = tf_transformations.quaternion_from_euler(0, 0, getattr(self, 'robot2_yaw', 0.0))
-        tf2.transform.rotation.x = q[0]
-        tf2.transform.rotation.y = q[1]
-        tf2.transform.rotation.z = q[2]
-        tf2.transform.rotation.w = q[3]
-        self.broadcaster.sendTransform(tf2)
-
-    def map_publish_callback(self):
-        if self.map1_img is None or self.map2_img is None:
+        tick = time.monotonic()
+        if self.last_tf_time is not None:
+            self.tf_periods.append(tick - self.last_tf_time)
+        self.last_tf_time = tick
+
+        now = self.get_clock().now()
+        if now.nanoseconds == 0:
+            # Simulated time has not started yet.
+            return
+        poses = self.tf_schedule.due(self.robot_poses, now.nanoseconds * 1e-9)
+        if poses is None:
             return
 
-        img1 = self.preprocess_image(self.map1_img)
-        img2 = self.preprocess_image(self.map2_img)
-        confidence, kp1, kp2, good_matches = self.check_map_overlap_orb(img1, img2)
+        stamp = now.to_msg()
+        transforms = []
+        for robot, (x, y, yaw) in poses.items():
+            tf = TransformStamped()
+            tf.header.stamp = stamp
+            tf.header.frame_id = 'world'
+            tf.child_frame_id = f'{robot}/map'
+            tf.transform.translation.x = x
+            tf.transform.translation.y = y
+            tf.transform.translation.z = 0.0
+            q = tf_transformations.quaternion_from_euler(0, 0, yaw)
+            tf.transform.rotation.x = q[0]
+            tf.transform.rotation.y = q[1]
+            tf.transform.rotation.z = q[2]
+            tf.transform.rotation.w = q[3]
+            transforms.append(tf)
+        self.broadcaster.sendTransform(transforms)
 
-        self.get_logger().info(f"ORB good matches count: {confidence:.0f}")
-        if confidence < self.confidence_threshold:
-            self.get_logger().info("Using fallback layout (maps not aligned)")
+    def map_publish_callback(self):
+        if not self.robot_maps:
+            return
+        # The worker extracts features only for maps whose content, size or
+        # origin changed and re-matches only pairs involving such a map. If it
+        # is still busy, this snapshot replaces any older one still waiting.
+        self.merge_worker.submit(dict(self.robot_maps))
+
+    def merge_error_callback(self, error):
+        self.get_logger().error(f'Map merge failed: {error!r}')
+
+    def merge_done_callback(self, result):
+        timer = StageTimer()
+        for (a, b), estimate in result.estimates.items():
+            partial = '' if estimate.complete else ' (partial, time budget exhausted)'
+            self.get_logger().info(
+                f"ORB inliers {a} <-> {b}: {estimate.confidence:.0f} "
+                f"of {len(estimate.matches)} matches ({estimate.inlier_ratio:.2f}){partial}")
+        if len(result.components) > 1:
+            self.get_logger().info(f"Using fallback layout for unaligned map groups: {result.components}")
         else:
             self.get_logger().info("Merging maps based on feature alignment")
 
-        res = self.map1_info.resolution
-
-        if confidence < self.confidence_threshold:
-            gap_pixels = int(1.0 / res)
-            width = max(self.map1_img.shape[1], self.map2_img.shape[1])
-            height = self.map1_img.shape[0] + gap_pixels + self.map2_img.shape[0]
-            canvas = np.full((height, width), 127, dtype=np.uint8)
-            canvas[0:self.map1_img.shape[0], 0:self.map1_img.shape[1]] = self.map1_img
-            map2_offset_y = self.map1_img.shape[0] + gap_pixels
-            canvas_region = canvas[map2_offset_y:map2_offset_y + self.map2_img.shape[0], 0:self.map2_img.shape[1]]
-            mask = self.map2_img != 127
-            canvas_region[mask] = self.map2_img[mask]
-            self.robot1_pos = (-self.map1_info.origin.position.x, -self.map1_info.origin.position.y)
-            self.robot2_pos = (-self.map2_info.origin.position.x, map2_offset_y * res - self.map2_info.origin.position.y)
-            self.robot2_yaw = 0.0
-        else:
-            src_pts = np.float32([kp2[m.trainIdx].pt for m in good_matches]).reshape(-1, 1, 2)
-            dst_pts = np.float32([kp1[m.queryIdx].pt for m in good_matches]).reshape(-1, 1, 2)
-            M, _ = cv2.estimateAffinePartial2D(src_pts, dst_pts)
-            if M is None:
+        with self.pose_lock:
+            self.robot_poses = {**self.robot_poses, **result.poses}
+        self.merge_count += 1
+        if self.debug_publishers:
+            # The canvas is updated in place by the next merge; the debug timer
+            # encodes on its own thread, so it gets a copy.
+            self.debug_merge = (self.merge_count, result.canvas.copy(), result.estimates,
+                                dict(self.pipeline.match_features))
+
+        header = Header()
+        header.stamp = self.get_clock().now().to_msg()
+        header.frame_id = 'world'
+        geometry = MapGeometry(
+            result.canvas.shape[1], result.canvas.shape[0], result.resolution, result.origin_x, result.origin_y)
+        with timer.stage('diff'):
+            boxes = self.map_deltas.diff(result.canvas, geometry, self.pipeline.canvas.dirty)
+        # Late joiners only get the latched full map, so they need a fresh one.
+        subscriber_count = self.map_publisher.get_subscription_count()
+        if subscriber_count > self.map_subscriber_count or not self.publish_map_updates:
+            boxes = None
+        self.map_subscriber_count = subscriber_count
+        now = time.monotonic()
+        self.patched_since_full_map = self.patched_since_full_map or bool(boxes)
+        if (self.patched_since_full_map and self.full_map_period > 0
+                and now - self.last_full_map >= self.full_map_period):
+            boxes = None
+
+        with timer.stage('publish'):
+            if boxes is None:
+                self.publish_full_map(header, result)
+                self.last_full_map = now
+                self.patched_since_full_map = False
+            else:
+                self.publish_map_patches(header, result.canvas, boxes)
+
+        self.publish_diagnostics({**result.timings, **timer.durations})
+        if self.alignment_cache_path:
+            self.save_alignment_cache()
+
+    def load_alignment_cache(self):
+        try:
+            pairs = load_alignments(self.alignment_cache_path)
+        except (OSError, ValueError, KeyError) as e:
+            self.get_logger().warn(f'Ignoring alignment cache {self.alignment_cache_path}: {e!r}')
+            return
+        if pairs:
+            self.get_logger().info(
+                f'Loaded {len(pairs)} alignments from {self.alignment_cache_path}, validating on first merge')
+        self.pipeline.seed(pairs)
+        self.saved_alignments = {pair: cached[1].transform for pair, cached in pairs.items()}
+
+    def save_alignment_cache(self):
+        """Write accepted transforms when a pair was added or lost, or moved since the last periodic save."""
+        # Seeds of robots that have not reappeared yet are kept for later.
+        accepted = {**self.pipeline.seeds, **self.pipeline.accepted_pairs()}
+        if accepted.keys() == self.saved_alignments.keys():
+            if all(np.array_equal(cached[1].transform, self.saved_alignments[pair])
+                   for pair, cached in accepted.items()):
                 return
-            warped = cv2.warpAffine(self.map2_img, M, (self.map1_img.shape[1], self.map1_img.shape[0]), borderValue=127)
-            canvas = np.full_like(self.map1_img, 127)
-            canvas[(self.map1_img == 0) | (warped == 0)] = 0
-            canvas[(self.map1_img == 255) & (warped != 0) & (canvas != 0)] = 255
-            canvas[(warped == 255) & (self.map1_img != 0) & (canvas != 0)] = 255
-            self.robot1_pos = (-self.map1_info.origin.position.x, -self.map1_info.origin.position.y)
-            # Compute correct transformed origin
-            origin_px = np.array([[ -self.map2_info.origin.position.x / res,
-                                     -self.map2_info.origin.position.y / res ]], dtype=np.float32)
-            transformed_px = cv2.transform(origin_px[None, :, :], M)[0][0]
-            self.robot2_pos = (transformed_px[0] * res, transformed_px[1] * res)
-
-            # Store rotation for TF (in timer_callback)
-            theta = math.atan2(M[1, 0], M[0, 0])
-            self.robot2_yaw = theta
-
-        self.merged_map_img = canvas
+            now = time.monotonic()
+            if self.last_alignment_save is not None and now - self.last_alignment_save < self.alignment_save_period:
+                return
+        try:
+            save_alignments(self.alignment_cache_path, accepted)
+        except OSError as e:
+            self.get_logger().warn(f'Could not save alignment cache {self.alignment_cache_path}: {e!r}')
+            return
+        self.saved_alignments = {pair: cached[1].transform for pair, cached in accepted.items()}
+        self.last_alignment_save = time.monotonic()
 
+    def publish_full_map(self, header, result):
         merged_msg = OccupancyGrid()
-        merged_msg.header = Header()
-        merged_msg.header.stamp = self.get_clock().now().to_msg()
-        merged_msg.header.frame_id = 'world'
-        merged_msg.info.resolution = res
-        merged_msg.info.width = canvas.shape[1]
-        merged_msg.info.height = canvas.shape[0]
-        merged_msg.info.origin.position.x = 0.0
-        merged_msg.info.origin.position.y = 0.0
+        merged_msg.header = header
+        merged_msg.info.resolution = result.resolution
+        merged_msg.info.origin.position.x = result.origin_x
+        merged_msg.info.origin.position.y = result.origin_y
         merged_msg.info.origin.position.z = 0.0
         merged_msg.info.origin.orientation.w = 1.0
-
-        ros_data = np.full(canvas.shape, -1, dtype=np.int8)
-        ros_data[canvas == 255] = 0
-        ros_data[canvas == 0] = 100
-        merged_msg.data = ros_data.flatten().tolist()
-
+        fill_occupancy_grid(merged_msg, result.canvas)
         self.map_publisher.publish(merged_msg)
-
-    def visualization_loop(self):
-        while rclpy.ok():
-            if self.map1_img is not None:
-                cv2.imshow('Robot 1 Map', self.map1_img)
-            if self.map2_img is not None:
-                cv2.imshow('Robot 2 Map', self.map2_img)
-            if self.merged_map_img is not None:
-                cv2.imshow('Merged Map', self.merged_map_img)
-            if cv2.waitKey(30) & 0xFF == ord('q'):
-                rclpy.shutdown()
-                break
-            time.sleep(0.03)
+        self.map_publish_bytes = len(merged_msg.data)
+
+    def publish_map_patches(self, header, canvas, boxes):
+        self.map_publish_bytes = 0
+        for x, y, width, height in boxes:
+            update = OccupancyGridUpdate()
+            update.header = header
+            fill_occupancy_grid_update(update, canvas, x, y, width, height)
+            self.map_updates_publisher.publish(update)
+            self.map_publish_bytes += len(update.data)
+
+    def publish_diagnostics(self, timings):
+        status = DiagnosticStatus()
+        status.level = DiagnosticStatus.OK
+        status.name = f'{self.get_name()}: merge timing'
+        status.message = f'merge {sum(timings.values()) * 1e3:.1f} ms'
+        status.values = [KeyValue(key=f'{stage}_ms', value=f'{seconds * 1e3:.2f}') for stage, seconds in timings.items()]
+        status.values.append(KeyValue(key='dropped_merge_requests', value=str(self.merge_worker.dropped)))
+        status.values.append(KeyValue(key='global_matches', value=str(self.pipeline.global_matches)))
+        status.values.append(KeyValue(key='deferred_matches', value=str(self.pipeline.deferred_matches)))
+        status.values.append(KeyValue(key='map_publish_bytes', value=str(self.map_publish_bytes)))
+        periods = list(self.tf_periods)
+        if periods:
+            nominal = 1.0 / self.publish_frequency
+            status.values += [
+                KeyValue(key='tf_period_mean_ms', value=f'{sum(periods) / len(periods) * 1e3:.2f}'),
+                KeyValue(key='tf_period_max_ms', value=f'{max(periods) * 1e3:.2f}'),
+                KeyValue(key='tf_jitter_max_ms', value=f'{max(abs(p - nominal) for p in periods) * 1e3:.2f}'),
+            ]
+        msg = DiagnosticArray()
+        msg.header.stamp = self.get_clock().now().to_msg()
+        msg.status = [status]
+        self.diagnostics_publisher.publish(msg)
+
+    def add_debug_publisher(self, name, topic):
+        self.debug_publishers[name] = self.create_publisher(CompressedImage, topic, 1)
+
+    def publish_debug_images(self):
+        merge_count, merged_map_img, estimates, features = self.debug_merge
+        for name, publisher in list(self.debug_publishers.items()):
+            if publisher.get_subscription_count() == 0:
+                continue
+            if name == 'merged_map':
+                version, render = merge_count, lambda: merged_map_img
+            elif name == 'matches':
+                version = merge_count
+                render = lambda: render_match_overlay(estimates, features, self.debug_max_matches)
+            else:
+                robot_map = self.robot_maps.get(name)
+                if robot_map is None:
+                    continue
+                version, render = robot_map.fingerprint, lambda: robot_map.image
+            self.publish_debug_image(name, publisher, version, render)
+
+    def publish_debug_image(self, name, publisher, version, render):
+        """Publish render() on publisher, re-encoding only when version changed since the last call."""
+        cached = self.debug_images.get(name)
+        if cached is None or cached[0] != version:
+            img = render()
+            if img is None:
+                return
+            cached = (version, encode_image(img, self.debug_image_format))
+            self.debug_images[name] = cached
+        msg = CompressedImage()
+        msg.header.stamp = self.get_clock().now().to_msg()
+        msg.header.frame_id = 'world'
+        msg.format = self.debug_image_format
+        msg.data = cached[1]
+        publisher.publish(msg)
 
 
 def main(args=None):
     rclpy.init(args=args)
     node = MultiRobotMapMerger()
-    rclpy.spin(node)
+    executor = MultiThreadedExecutor()
+    executor.add_node(node)
+    executor.spin()
+    node.merge_worker.stop(timeout=1.0)
     node.destroy_node()
     rclpy.shutdown()
-    cv2.destroyAllWindows()
 
 if __name__ == '__main__':
     main()
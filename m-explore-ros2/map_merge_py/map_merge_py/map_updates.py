@@ -0,0 +1,56 @@
+"""Splitting merged-map changes into full publishes and OccupancyGridUpdate patches."""
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from map_merge_py.tiled_canvas import changed_tiles
+
+MapGeometry = namedtuple('MapGeometry', ['width', 'height', 'resolution', 'origin_x', 'origin_y'])
+
+
+def changed_boxes(changed, tile_size, shape):
+    """Pixel (x, y, width, height) boxes covering the True cells of a tile grid, one per connected group."""
+    _, _, stats, _ = cv2.connectedComponentsWithStats(changed.astype(np.uint8), connectivity=8)
+    boxes = []
+    for x, y, w, h, _ in stats[1:]:
+        x0, y0 = int(x) * tile_size, int(y) * tile_size
+        x1 = min(int(x + w) * tile_size, shape[1])
+        y1 = min(int(y + h) * tile_size, shape[0])
+        boxes.append((x0, y0, x1 - x0, y1 - y0))
+    return boxes
+
+
+class MapDeltaTracker:
+    """Remembers the last published merged map and reports what a new one changes.
+
+    diff() returns None when the map has to go out in full: the first map,
+    a new geometry, or more than full_publish_ratio of the tiles changed.
+    Otherwise it returns the boxes that changed, possibly none.
+    """
+
+    def __init__(self, tile_size=64, full_publish_ratio=0.5):
+        self.tile_size = tile_size
+        self.full_publish_ratio = full_publish_ratio
+        self.reset()
+
+    def reset(self):
+        self.published = None
+        self.geometry = None
+
+    def diff(self, canvas, geometry, dirty=None):
+        """Compare canvas with the last published map; dirty, if given, marks the only tiles that may differ."""
+        if self.published is None or geometry != self.geometry or canvas.shape != self.published.shape:
+            self.published = canvas.copy()
+            self.geometry = geometry
+            return None
+        if dirty is not None and not dirty.any():
+            return []
+        changed = changed_tiles(canvas, self.published, self.tile_size)
+        if changed.mean() > self.full_publish_ratio:
+            self.published[...] = canvas
+            return None
+        boxes = changed_boxes(changed, self.tile_size, canvas.shape)
+        for x, y, w, h in boxes:
+            self.published[y:y + h, x:x + w] = canvas[y:y + h, x:x + w]
+        return boxes
@@ -0,0 +1,222 @@
+"""ROS-independent merging of N robot maps into one world-aligned canvas."""
+from collections import namedtuple
+import math
+import time
+
+import numpy as np
+
+from map_merge_py.grid_conversion import rescale_image
+from map_merge_py.placement import footprint, layout_components, spanning_tree_placement, to_homogeneous
+from map_merge_py.registration import FeatureRegistration
+from map_merge_py.tiled_canvas import TiledMergeCanvas
+from map_merge_py.timing import NULL_TIMER, StageTimer
+
+RobotMap = namedtuple('RobotMap', ['image', 'resolution', 'origin_x', 'origin_y', 'fingerprint'])
+# poses maps robot -> (x, y, yaw) of its map frame in the world frame; the
+# world frame is the map frame of the pipeline's world_frame_robot. estimates maps
+# (a, b) -> PairEstimate and timings maps stage name -> seconds spent in it
+# during this merge.
+MergeResult = namedtuple('MergeResult', [
+    'canvas', 'resolution', 'origin_x', 'origin_y', 'poses', 'components', 'estimates', 'timings'])
+
+
+def fingerprint_origin(fingerprint):
+    """(origin_x, origin_y) recorded in a map fingerprint, also one of a resampled map or loaded from disk."""
+    # Resampled maps wrap the original fingerprint as (fingerprint, resolution).
+    while len(fingerprint) == 2:
+        fingerprint = fingerprint[0]
+    return fingerprint[3], fingerprint[4]
+
+
+def follow_origins(transform, fingerprints, map_a, map_b):
+    """transform, taking b's pixels into a's, moved to the current origins of map_a and map_b.
+
+    SLAM maps grow by moving their origin; the map frame stays put, so
+    pixel p of the old grid is pixel p + (old - new origin) / resolution of
+    the new one. fingerprints are the pair's, from when transform was found.
+    """
+    (old_ax, old_ay), (old_bx, old_by) = fingerprint_origin(fingerprints[0]), fingerprint_origin(fingerprints[1])
+    shift_a, shift_b = np.eye(3), np.eye(3)
+    shift_a[:2, 2] = ((old_ax - map_a.origin_x) / map_a.resolution, (old_ay - map_a.origin_y) / map_a.resolution)
+    shift_b[:2, 2] = ((map_b.origin_x - old_bx) / map_b.resolution, (map_b.origin_y - old_by) / map_b.resolution)
+    return (shift_a @ to_homogeneous(transform) @ shift_b)[:2]
+
+
+class MergePipeline:
+    def __init__(self, tile_size=64, confidence_threshold=None, fallback_gap=1.0, tracker=None,
+                 registration=None, min_inlier_ratio=0.0, match_time_budget=0.0, resolution=None,
+                 world_frame_robot=None):
+        self.canvas = TiledMergeCanvas(tile_size)
+        # Robot whose map frame is the world frame; None picks the first robot
+        # of the first merge and keeps it, so robots joining later never move
+        # the world. Until it has a map, the first robot by name stands in.
+        self.world_frame_robot = world_frame_robot
+        self.min_inlier_ratio = min_inlier_ratio
+        self.fallback_gap = fallback_gap
+        # TransformTracker for warm-start tracking, or None to always match globally.
+        self.tracker = tracker
+        # Global registration engine: FeatureRegistration or PyramidRegistration.
+        self.registration = registration or FeatureRegistration()
+        # Minimum PairEstimate.confidence; its scale depends on the engine, so
+        # None uses the engine's own default.
+        self.confidence_threshold = confidence_threshold or self.registration.confidence_threshold
+        # Merged map resolution; None uses the world frame robot's. Other maps are
+        # resampled to it before registration.
+        self.resolution = resolution
+        self._rescaled = {}
+        # Seconds per merge that global matching may use; 0 means unbounded.
+        # Pairs that do not fit are deferred to the next merge.
+        self.match_time_budget = match_time_budget
+        # (a, b) -> ((fingerprint_a, fingerprint_b), PairEstimate, tracking reference score)
+        self.pairs = {}
+        # Pairs loaded from a previous run, same layout as pairs, waiting
+        # for both robots' maps to arrive.
+        self.seeds = {}
+        # (a, b) -> (features_a, features_b) the pair's matches index into.
+        self.match_features = {}
+        self.global_matches = 0
+        self.deferred_matches = 0
+
+    def is_accepted(self, estimate):
+        return (estimate.transform is not None and estimate.confidence >= self.confidence_threshold
+                and estimate.inlier_ratio >= self.min_inlier_ratio)
+
+    def pair_estimates(self, maps, timer=NULL_TIMER):
+        """Pairwise estimates for all robot pairs, re-registering only pairs where a map changed."""
+        names = sorted(maps)
+        deadline = time.perf_counter() + self.match_time_budget if self.match_time_budget > 0 else None
+        estimates = {}
+        for i, a in enumerate(names):
+            for b in names[i + 1:]:
+                key = (maps[a].fingerprint, maps[b].fingerprint)
+                cached = self.pairs.get((a, b))
+                seeded = cached is None and (a, b) in self.seeds
+                if seeded:
+                    cached = self.seeds[(a, b)]
+                if cached is None or cached[0] != key:
+                    registered = self.register_pair(a, b, maps, cached, timer, deadline)
+                    if registered is None:
+                        # Out of time: keep the last estimate and retry next merge.
+                        self.deferred_matches += 1
+                        if cached is None or seeded:
+                            continue
+                    else:
+                        estimate, score = registered
+                        # Partial matches are used now but re-run next merge.
+                        cached = (key if estimate.complete else None, estimate, score)
+                if seeded:
+                    del self.seeds[(a, b)]
+                self.pairs[(a, b)] = cached
+                estimates[(a, b)] = cached[1]
+        for pair in set(self.pairs) - set(estimates):
+            del self.pairs[pair]
+            self.match_features.pop(pair, None)
+        return estimates
+
+    def accepted_pairs(self):
+        """Pairs whose current estimate is accepted and final, in the layout of pairs."""
+        return {pair: cached for pair, cached in self.pairs.items()
+                if cached[0] is not None and self.is_accepted(cached[1])}
+
+    def seed(self, pairs):
+        """Start from pairs saved by an earlier run.
+
+        A seeded pair whose map fingerprints still match is used without
+        registration; otherwise the tracker validates it like any previous
+        estimate, and without a tracker it is matched from scratch.
+        """
+        self.seeds.update({pair: cached for pair, cached in pairs.items() if pair not in self.pairs})
+
+    def register_pair(self, a, b, maps, previous, timer, deadline=None):
+        """Track the previously accepted transform if possible, otherwise match features globally.
+
+        Returns (PairEstimate, tracking reference score), or None when the
+        deadline passed before global matching found an acceptable transform.
+        A partial estimate is not tracked, so that global matching completes it.
+        """
+        if (self.tracker is not None and previous is not None and previous[1].complete
+                and self.is_accepted(previous[1])):
+            transform = previous[1].transform
+            if previous[0] is not None:
+                transform = follow_origins(transform, previous[0], maps[a], maps[b])
+            with timer.stage('track'):
+                tracked = self.tracker.track(
+                    self.tracker.downsample(a, maps[a]), self.tracker.downsample(b, maps[b]),
+                    transform, previous[2])
+            if tracked is not None:
+                transform, score, _ = tracked
+                return previous[1]._replace(transform=transform), score
+
+        if deadline is not None and time.perf_counter() > deadline:
+            return None
+        estimate = self.registration.estimate(a, maps[a], b, maps[b], deadline, timer)
+        self.global_matches += 1
+        if not estimate.complete and not self.is_accepted(estimate):
+            return None
+        # Cache hits: keeps the features behind estimate.matches for debug views.
+        self.match_features[(a, b)] = (self.registration.features(a, maps[a]), self.registration.features(b, maps[b]))
+        score = 0.0
+        if self.tracker is not None and self.is_accepted(estimate):
+            with timer.stage('track'):
+                score = self.tracker.score(
+                    self.tracker.downsample(a, maps[a]), self.tracker.downsample(b, maps[b]), estimate.transform)
+        return estimate, score
+
+    def rescale(self, robot, robot_map, resolution):
+        """robot_map resampled to resolution, cached per map version."""
+        if robot_map.resolution == resolution:
+            return robot_map
+        fingerprint = (robot_map.fingerprint, resolution)
+        cached = self._rescaled.get(robot)
+        if cached is None or cached.fingerprint != fingerprint:
+            image = rescale_image(robot_map.image, robot_map.resolution / resolution)
+            cached = robot_map._replace(image=image, resolution=resolution, fingerprint=fingerprint)
+            self._rescaled[robot] = cached
+        return cached
+
+    def merge(self, maps):
+        """Merge maps, a dict of robot -> RobotMap, into a MergeResult."""
+        timer = StageTimer()
+        robots = sorted(maps)
+        if self.world_frame_robot is None:
+            self.world_frame_robot = robots[0]
+        anchor = self.world_frame_robot if self.world_frame_robot in maps else robots[0]
+        # Placement roots the first component on the first robot.
+        robots.remove(anchor)
+        robots.insert(0, anchor)
+        resolution = self.resolution or maps[anchor].resolution
+        with timer.stage('rescale'):
+            maps = {robot: self.rescale(robot, maps[robot], resolution) for robot in robots}
+        estimates = self.pair_estimates(maps, timer)
+
+        shapes = {robot: maps[robot].image.shape for robot in robots}
+        with timer.stage('placement'):
+            accepted = {pair: estimate for pair, estimate in estimates.items() if self.is_accepted(estimate)}
+            components = spanning_tree_placement(robots, accepted, self.confidence_threshold)
+            placement = layout_components(components, shapes, int(self.fallback_gap / resolution))
+
+        boxes = np.array([footprint(shapes[robot], placement[robot]) for robot in robots])
+        min_x, min_y = np.floor(boxes[:, :2].min(axis=0)).astype(int)
+        max_x, max_y = np.ceil(boxes[:, 2:].max(axis=0)).astype(int)
+        shift = np.eye(3)
+        shift[:2, 2] = (-min_x, -min_y)
+        layers = {robot: (maps[robot].image, (shift @ placement[robot])[:2]) for robot in robots}
+        with timer.stage('warp'):
+            canvas = self.canvas.update((max_y - min_y, max_x - min_x), layers)
+
+        # Pixels of the anchor's map are offset by its origin in its map frame.
+        anchor_x, anchor_y = maps[anchor].origin_x, maps[anchor].origin_y
+        poses = {}
+        for robot in robots:
+            robot_map = maps[robot]
+            transform = placement[robot]
+            origin_px = transform @ (-robot_map.origin_x / robot_map.resolution,
+                                     -robot_map.origin_y / robot_map.resolution, 1.0)
+            poses[robot] = (origin_px[0] * resolution + anchor_x, origin_px[1] * resolution + anchor_y,
+                            math.atan2(transform[1, 0], transform[0, 0]))
+
+        return MergeResult(
+            canvas, resolution, min_x * resolution + anchor_x, min_y * resolution + anchor_y, poses,
+            [sorted(component) for component in components],
+            estimates,
+            timer.durations)
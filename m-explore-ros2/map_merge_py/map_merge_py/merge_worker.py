@@ -0,0 +1,62 @@
+"""Background thread running the merge pipeline off the ROS executor."""
+import threading
+import traceback
+
+
+class MergeWorker:
+    """Runs pipeline.merge() on its own thread with a latest-wins input slot.
+
+    submit() never blocks. If a request is still waiting when a newer one
+    arrives, the older one is dropped. Results are handed to on_result on
+    the worker thread. An exception from the merge or from on_result goes to
+    on_error, or is printed if there is none, and the thread carries on with
+    the next request. OpenCV and NumPy release the GIL in
+    the heavy stages, so a thread keeps the executor responsive without
+    copying map images into another process.
+    """
+
+    def __init__(self, pipeline, on_result, on_error=None):
+        self.pipeline = pipeline
+        self.on_result = on_result
+        self.on_error = on_error
+        self.dropped = 0
+        self._pending = None
+        self._running = True
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='map_merge_worker', daemon=True)
+        self._thread.start()
+
+    def submit(self, maps):
+        with self._condition:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = maps
+            self._condition.notify()
+
+    def stop(self, timeout=None):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and self._pending is None:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                maps, self._pending = self._pending, None
+            try:
+                self.on_result(self.pipeline.merge(maps))
+            except Exception as e:
+                self._report(e)
+
+    def _report(self, error):
+        if self.on_error is not None:
+            try:
+                self.on_error(error)
+                return
+            except Exception:
+                traceback.print_exc()
+        traceback.print_exception(type(error), error, error.__traceback__)
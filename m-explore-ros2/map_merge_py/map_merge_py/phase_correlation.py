@@ -0,0 +1,182 @@
+"""Registration by Fourier phase correlation, independent of how many corner features a map has.
+
+Rotation comes from phase-correlating the log-polar resampled magnitude
+spectra of the two maps, which do not depend on translation. The spectrum
+is symmetric, so every rotation peak is tried together with its 180 degree
+twin. Translation is then a plain phase correlation of the first map with
+the rotated second one. Cost depends only on the image size.
+"""
+import cv2
+import numpy as np
+
+from map_merge_py.grid_conversion import UNKNOWN
+from map_merge_py.placement import footprint, to_homogeneous
+from map_merge_py.pyramid import PyramidRegistration
+from map_merge_py.registration import PairEstimate
+from map_merge_py.timing import NULL_TIMER
+
+
+def map_signal(img):
+    """Zero for unknown, positive for occupied, negative for free, so padding reads as unknown."""
+    return (UNKNOWN - img.astype(np.float32)) / 128.0
+
+
+def edge_taper(shape, fraction=0.15):
+    """Separable raised-cosine window that fades the last fraction of each side to zero.
+
+    Without it the borders of two map windows correlate with each other.
+    """
+    def taper(n):
+        k = max(1, int(n * fraction))
+        ramp = 0.5 * (1.0 - np.cos(np.pi * np.arange(k) / k))
+        window = np.ones(n, dtype=np.float32)
+        window[:k] = ramp
+        window[n - k:] = ramp[::-1]
+        return window
+    return np.outer(taper(shape[0]), taper(shape[1]))
+
+
+def radial_taper(shape):
+    """Raised-cosine disc, so that image axes leave no preferred direction in the spectrum."""
+    h, w = shape
+    y, x = np.mgrid[:h, :w]
+    r = np.minimum(np.hypot((y - h / 2.0) / (h / 2.0), (x - w / 2.0) / (w / 2.0)), 1.0)
+    return (0.5 * (1.0 + np.cos(np.pi * r))).astype(np.float32)
+
+
+def highpass(size):
+    """Emphasis filter for a centred size x size magnitude spectrum (Reddy and Chatterji)."""
+    freq = np.fft.fftshift(np.fft.fftfreq(size)).astype(np.float32)
+    x = np.outer(np.cos(np.pi * freq), np.cos(np.pi * freq))
+    return (1.0 - x) * (2.0 - x)
+
+
+def padded(f, shape):
+    out = np.zeros(shape, dtype=np.float32)
+    out[:f.shape[0], :f.shape[1]] = f
+    return out
+
+
+def spectrum(f, shape):
+    return cv2.dft(padded(f, shape), flags=cv2.DFT_COMPLEX_OUTPUT)
+
+
+def correlation_surface(spectrum_a, spectrum_b):
+    """Phase correlation; its peak sits at the shift d for which a(x) matches b(x - d)."""
+    cross = cv2.mulSpectrums(spectrum_a, spectrum_b, 0, conjB=True)
+    cross /= cv2.magnitude(cross[..., 0], cross[..., 1])[..., None] + 1e-9
+    return cv2.idft(cross, flags=cv2.DFT_REAL_OUTPUT | cv2.DFT_SCALE)
+
+
+def peak_sharpness(surface, peak, exclude=5):
+    """Peak-to-sidelobe ratio: how many standard deviations the peak stands above the rest."""
+    y, x = peak
+    rows = np.arange(y - exclude, y + exclude + 1) % surface.shape[0]
+    cols = np.arange(x - exclude, x + exclude + 1) % surface.shape[1]
+    mask = np.ones(surface.shape, dtype=bool)
+    mask[np.ix_(rows, cols)] = False
+    sidelobe = surface[mask]
+    return float((surface[y, x] - sidelobe.mean()) / (sidelobe.std() + 1e-12))
+
+
+def subpixel_peak(surface, peak):
+    """Centroid of the 3x3 neighbourhood of an integer peak, wrapping around the edges."""
+    y, x = peak
+    rows = np.arange(y - 1, y + 2) % surface.shape[0]
+    cols = np.arange(x - 1, x + 2) % surface.shape[1]
+    patch = np.maximum(surface[np.ix_(rows, cols)], 0.0)
+    total = patch.sum()
+    if total <= 0:
+        return float(x), float(y)
+    offsets = np.array([-1.0, 0.0, 1.0])
+    return x + float(patch.sum(axis=0) @ offsets) / total, y + float(patch.sum(axis=1) @ offsets) / total
+
+
+def rotation_candidates(signal_a, signal_b, angle_bins, count):
+    """The count strongest rotations (degrees) of b relative to a, at least 5 degrees apart."""
+    size = cv2.getOptimalDFTSize(max(signal_a.shape + signal_b.shape))
+    emphasis = highpass(size)
+    center = (size / 2.0, size / 2.0)
+    polar = []
+    for f in (signal_a, signal_b):
+        magnitude = np.fft.fftshift(cv2.magnitude(*cv2.split(spectrum(f * radial_taper(f.shape), (size, size)))))
+        polar.append(cv2.warpPolar(np.log1p(magnitude * emphasis), (size // 2, angle_bins), center, size / 2.0,
+                                   cv2.WARP_POLAR_LOG | cv2.INTER_LINEAR))
+    # Maps share a resolution, so only the zero-scale column matters.
+    profile = correlation_surface(
+        cv2.dft(polar[0], flags=cv2.DFT_COMPLEX_OUTPUT), cv2.dft(polar[1], flags=cv2.DFT_COMPLEX_OUTPUT))[:, 0]
+    separation = angle_bins // 72
+    picks = []
+    for index in np.argsort(profile)[::-1]:
+        if all(min(abs(index - p), angle_bins - abs(index - p)) > separation for p in picks):
+            picks.append(int(index))
+            if len(picks) == count:
+                break
+    return [p * 360.0 / angle_bins for p in picks]
+
+
+def phase_correlate(img_a, img_b, angle_bins=720, candidates=6):
+    """(confidence, 2x3 transform taking img_b pixels into img_a) by log-polar phase correlation."""
+    signal_a, signal_b = map_signal(img_a), map_signal(img_b)
+    angles = rotation_candidates(signal_a, signal_b, angle_bins, candidates)
+
+    hb, wb = img_b.shape
+    diag = int(np.ceil(np.hypot(hb, wb)))
+    size = cv2.getOptimalDFTSize(max(img_a.shape) + diag)
+    spectrum_a = spectrum(signal_a * edge_taper(signal_a.shape), (size, size))
+    tapered_b = signal_b * edge_taper(signal_b.shape)
+    best = (0.0, None)
+    for angle in angles:
+        for candidate in (angle, angle + 180.0):
+            # Rotate b about its centre into a diag x diag window.
+            rotation = cv2.getRotationMatrix2D((wb / 2.0, hb / 2.0), -candidate, 1.0)
+            rotation[:, 2] += (diag / 2.0 - wb / 2.0, diag / 2.0 - hb / 2.0)
+            rotated = cv2.warpAffine(tapered_b, rotation, (diag, diag))
+            surface = correlation_surface(spectrum_a, spectrum(rotated, (size, size)))
+            peak = np.unravel_index(int(np.argmax(surface)), surface.shape)
+            confidence = peak_sharpness(surface, peak)
+            if confidence <= best[0]:
+                continue
+            dx, dy = subpixel_peak(surface, peak)
+            # Shifts past the first map wrap around to negative ones.
+            dx = dx - size if dx > size - diag else dx
+            dy = dy - size if dy > size - diag else dy
+            transform = rotation.copy()
+            transform[:, 2] += (dx, dy)
+            best = (confidence, transform)
+    return best
+
+
+class PhaseCorrelationRegistration(PyramidRegistration):
+    """Phase correlation on the coarsest pyramid level, refined with ECC like PyramidRegistration.
+
+    confidence is the peak-to-sidelobe ratio of the translation correlation.
+    It is not an inlier count, so the engine has its own default threshold.
+    """
+
+    # In bench_registration-style runs unrelated maps peak below 20 and
+    # correct alignments mostly score 27-230.
+    confidence_threshold = 25.0
+
+    def __init__(self, levels=2, refine_to_level=0, angle_bins=720, candidates=6, roi_size=256, iterations=20):
+        super().__init__(levels=levels, refine_to_level=refine_to_level, roi_size=roi_size, iterations=iterations)
+        self.angle_bins = angle_bins
+        self.candidates = candidates
+
+    def features(self, robot, robot_map, timer=NULL_TIMER):
+        # Nothing to draw in the match overlay.
+        return None
+
+    def coarse_estimate(self, a, map_a, b, map_b, deadline=None, timer=NULL_TIMER):
+        coarse_a = self.pyramid(a, map_a, timer)[self.levels]
+        coarse_b = self.pyramid(b, map_b, timer)[self.levels]
+        with timer.stage('correlate'):
+            confidence, transform = phase_correlate(coarse_a, coarse_b, self.angle_bins, self.candidates)
+        if transform is None:
+            return PairEstimate(0.0, None, [], 0.0), None
+        # Refine around the middle of the overlap.
+        min_x, min_y, max_x, max_y = footprint(coarse_b.shape, to_homogeneous(transform))
+        center = np.array([(max(0.0, min_x) + min(coarse_a.shape[1], max_x)) / 2.0,
+                           (max(0.0, min_y) + min(coarse_a.shape[0], max_y)) / 2.0])
+        # There are no candidate matches to take a share of.
+        return PairEstimate(confidence, transform, [], 1.0), center * 2 ** self.levels
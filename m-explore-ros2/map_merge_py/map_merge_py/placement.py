@@ -0,0 +1,98 @@
+"""Global placement of N robot maps from pairwise transforms."""
+import numpy as np
+
+
+def to_homogeneous(transform):
+    h = np.eye(3)
+    h[:2] = transform
+    return h
+
+
+class _DisjointSet:
+    def __init__(self, items):
+        self.parent = {item: item for item in items}
+
+    def find(self, item):
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return False
+        self.parent[root_b] = root_a
+        return True
+
+
+def spanning_tree_placement(robots, estimates, threshold):
+    """Chain the most confident pairwise transforms along a maximum spanning tree.
+
+    robots is an ordered list of names and estimates maps (a, b) to a
+    PairEstimate whose transform takes b's pixels into a's. Only pairs at or
+    above threshold are used. Returns a list of components, each a dict of
+    robot -> 3x3 transform into the pixel frame of the component's first
+    robot. The first component always contains robots[0].
+    """
+    edges = sorted(
+        ((estimate.confidence, a, b) for (a, b), estimate in estimates.items()
+         if estimate.transform is not None and estimate.confidence >= threshold and a in robots and b in robots),
+        key=lambda edge: -edge[0])
+    forest = _DisjointSet(robots)
+    adjacency = {robot: [] for robot in robots}
+    for _, a, b in edges:
+        if forest.union(a, b):
+            forward = to_homogeneous(estimates[(a, b)].transform)
+            adjacency[a].append((b, forward))
+            adjacency[b].append((a, np.linalg.inv(forward)))
+
+    components = []
+    placed = set()
+    for root in robots:
+        if root in placed:
+            continue
+        component = {root: np.eye(3)}
+        stack = [root]
+        while stack:
+            parent = stack.pop()
+            for child, parent_from_child in adjacency[parent]:
+                if child not in component:
+                    component[child] = component[parent] @ parent_from_child
+                    stack.append(child)
+        placed.update(component)
+        components.append(component)
+    return components
+
+
+def footprint(shape, transform):
+    """Axis-aligned (min_x, min_y, max_x, max_y) of an image of shape after a 3x3 transform."""
+    height, width = shape
+    corners = np.array([[0, 0, 1], [width, 0, 1], [0, height, 1], [width, height, 1]], dtype=np.float64)
+    projected = corners @ transform.T
+    return (projected[:, 0].min(), projected[:, 1].min(), projected[:, 0].max(), projected[:, 1].max())
+
+
+def layout_components(components, shapes, gap_pixels):
+    """Place disconnected components below each other, gap_pixels apart.
+
+    The first component stays in its root's frame; the others are shifted so
+    their left edge lines up with it. Returns robot -> 3x3 transform into
+    that common frame.
+    """
+    placement = {}
+    left = bottom = None
+    for component in components:
+        boxes = np.array([footprint(shapes[robot], transform) for robot, transform in component.items()])
+        min_x, min_y = boxes[:, 0].min(), boxes[:, 1].min()
+        max_y = boxes[:, 3].max()
+        shift = np.eye(3)
+        if left is None:
+            left = min_x
+        else:
+            shift[0, 2] = left - min_x
+            shift[1, 2] = bottom + gap_pixels - min_y
+        bottom = max_y + shift[1, 2]
+        for robot, transform in component.items():
+            placement[robot] = shift @ transform
+    return placement
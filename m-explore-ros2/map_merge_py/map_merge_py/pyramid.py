@@ -0,0 +1,116 @@
+"""Coarse-to-fine registration over an image pyramid."""
+import cv2
+import numpy as np
+
+from map_merge_py.feature_cache import FeatureCache
+from map_merge_py.grid_conversion import UNKNOWN
+from map_merge_py.registration import MatchingEngine
+from map_merge_py.timing import NULL_TIMER
+from map_merge_py.tracking import refine_transform
+
+
+def scale_transform(transform, factor):
+    """Express a pixel transform at a pyramid level factor times finer (factor > 1) or coarser."""
+    scaled = np.array(transform, dtype=np.float64)
+    scaled[:, 2] *= factor
+    return scaled
+
+
+class PyramidRegistration:
+    """Matches ORB features on a 1 / 2**levels pyramid level, then refines level by level.
+
+    Each finer level runs ECC only on a roi_size square of the first map,
+    centred on the matched features, so refinement cost does not grow with
+    the map. Refinement stops at refine_to_level (0 is full resolution).
+    The coarsest level needs a few hundred pixels of overlap to match, so
+    levels should shrink as maps get smaller.
+    """
+
+    # Inliers of the coarse match; see FeatureRegistration.confidence_threshold.
+    confidence_threshold = 20.0
+
+    def __init__(self, levels=2, refine_to_level=0, n_features=1000, matcher=None, roi_size=256, roi_margin=16,
+                 iterations=20):
+        self.levels = levels
+        self.refine_to_level = refine_to_level
+        self.roi_size = roi_size
+        self.roi_margin = roi_margin
+        self.iterations = iterations
+        self.feature_cache = FeatureCache(n_features)
+        self.matcher = matcher or MatchingEngine()
+        self._pyramids = {}
+
+    def pyramid(self, robot, robot_map, timer=NULL_TIMER):
+        cached = self._pyramids.get(robot)
+        if cached is None or cached[0] != robot_map.fingerprint:
+            levels = [robot_map.image]
+            with timer.stage('pyramid'):
+                for _ in range(self.levels):
+                    # pyrDown's smoothing gives ORB gradients to work with on coarse levels.
+                    levels.append(cv2.pyrDown(levels[-1], borderType=cv2.BORDER_REPLICATE))
+            cached = (robot_map.fingerprint, levels)
+            self._pyramids[robot] = cached
+        return cached[1]
+
+    def features(self, robot, robot_map, timer=NULL_TIMER):
+        """Features of the coarsest level; keypoints are in coarse-level pixels."""
+        coarse = self.pyramid(robot, robot_map, timer)[self.levels]
+        return self.feature_cache.get(robot, robot_map.fingerprint, coarse, timer)
+
+    def coarse_estimate(self, a, map_a, b, map_b, deadline=None, timer=NULL_TIMER):
+        """PairEstimate on the coarsest level, and the full-resolution point of a to refine around."""
+        features_a = self.features(a, map_a, timer)
+        features_b = self.features(b, map_b, timer)
+        coarse = self.matcher.estimate(b, features_a, features_b, deadline, timer)
+        if coarse.transform is None:
+            return coarse, None
+        center = np.median([features_a.keypoints[m.queryIdx].pt for m in coarse.matches], axis=0) * 2 ** self.levels
+        return coarse, center
+
+    def estimate(self, a, map_a, b, map_b, deadline=None, timer=NULL_TIMER):
+        coarse, center = self.coarse_estimate(a, map_a, b, map_b, deadline, timer)
+        if coarse.transform is None:
+            return coarse
+
+        pyramid_a = self.pyramid(a, map_a)
+        pyramid_b = self.pyramid(b, map_b)
+        transform = scale_transform(coarse.transform, 2 ** self.levels)
+        with timer.stage('refine'):
+            for level in range(self.levels - 1, self.refine_to_level - 1, -1):
+                transform = self.refine(pyramid_a[level], pyramid_b[level], transform, 2 ** level, center)
+        return coarse._replace(transform=transform)
+
+    def refine(self, img_a, img_b, transform, factor, center):
+        """ECC-refine a full-resolution transform on the pyramid level that is factor times coarser."""
+        level_transform = scale_transform(transform, 1.0 / factor)
+        half = self.roi_size // 2
+        cx, cy = (np.asarray(center) / factor).astype(int)
+        x0, y0 = max(0, cx - half), max(0, cy - half)
+        x1, y1 = min(img_a.shape[1], cx + half), min(img_a.shape[0], cy + half)
+        if x1 - x0 < 16 or y1 - y0 < 16:
+            return transform
+
+        template = img_a[y0:y1, x0:x1]
+        if np.all(template == UNKNOWN):
+            return transform
+        # Only the part of the second map that lands on the template (plus
+        # slack for the correction) is handed to ECC, which blurs its input.
+        corners = np.array([[x0, y0], [x1, y0], [x0, y1], [x1, y1]], dtype=np.float64)
+        in_b = cv2.transform(corners[None], cv2.invertAffineTransform(level_transform))[0]
+        bx0, by0 = np.maximum(0, np.floor(in_b.min(axis=0)).astype(int) - self.roi_margin)
+        bx1, by1 = np.ceil(in_b.max(axis=0)).astype(int) + self.roi_margin
+        window = img_b[by0:by1, bx0:bx1]
+        if window.shape[0] < 16 or window.shape[1] < 16:
+            return transform
+        level_transform[:, 2] += level_transform[:, :2] @ (bx0, by0) - (x0, y0)
+        refined = refine_transform(
+            template.astype(np.float32), window.astype(np.float32), level_transform, iterations=self.iterations)
+        if refined is None:
+            return transform
+        # A correction larger than the slack given to ECC means it diverged.
+        window_corners = np.array([[0, 0, 1], [window.shape[1], 0, 1], [0, window.shape[0], 1],
+                                   [window.shape[1], window.shape[0], 1]], dtype=np.float64)
+        if np.abs(window_corners @ (refined - level_transform).T).max() > self.roi_margin:
+            return transform
+        refined[:, 2] -= refined[:, :2] @ (bx0, by0) - (x0, y0)
+        return scale_transform(refined, factor)
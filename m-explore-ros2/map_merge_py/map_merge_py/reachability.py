@@ -0,0 +1,46 @@
+"""Reachable free space from connected-component labels of an occupancy grid."""
+import cv2
+import numpy as np
+
+
+class ReachabilityLabels:
+    """Labels the 8-connected free (0) regions of a grid once per map version.
+
+    A robot's reachable region is then the component under its cell, and
+    the mask of each component is built once and reused until the map
+    version changes. Labels and masks are read-only.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.labels = None
+        self._masks = {}
+
+    def update(self, grid, version, free=None):
+        """Relabel grid if version differs from the one labelled last; free is grid == 0 if known."""
+        if version == self.version and self.labels is not None:
+            return
+        free = (free if free is not None else grid == 0).view(np.uint8)
+        _, self.labels = cv2.connectedComponents(free, connectivity=8, ltype=cv2.CV_32S)
+        self.labels.flags.writeable = False
+        self.version = version
+        self._masks = {}
+
+    def label_at(self, y, x):
+        """Component label of cell (y, x); 0 when it is outside the grid or not free."""
+        height, width = self.labels.shape
+        if not (0 <= y < height and 0 <= x < width):
+            return 0
+        return int(self.labels[y, x])
+
+    def mask(self, label):
+        cached = self._masks.get(label)
+        if cached is None:
+            cached = self.labels == label if label else np.zeros(self.labels.shape, dtype=bool)
+            cached.flags.writeable = False
+            self._masks[label] = cached
+        return cached
+
+    def reachable_from(self, y, x):
+        """Free cells 8-connected to (y, x); empty if that cell is not free."""
+        return self.mask(self.label_at(y, x))
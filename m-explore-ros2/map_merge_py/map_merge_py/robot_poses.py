@@ -0,0 +1,42 @@
+"""Robot positions resolved once per exploration tick, and distances from them to many cells at once."""
+from collections import namedtuple
+
+import numpy as np
+
+# Position of a robot's base in the frame of the map its distances are measured in.
+RobotPose = namedtuple('RobotPose', ['x', 'y'])
+
+
+def cell_centres(cells, resolution, origin_x, origin_y):
+    """(N, 2) array of x, y map coordinates of the centres of (y, x) grid cells."""
+    cells = np.asarray(cells, dtype=np.float64).reshape(-1, 2)
+    return np.column_stack((origin_x + (cells[:, 1] + 0.5) * resolution,
+                            origin_y + (cells[:, 0] + 0.5) * resolution))
+
+
+def distances_from(pose, points):
+    """Straight-line distances from pose to each (x, y) row of points; inf for an unknown pose."""
+    if pose is None:
+        return np.full(len(points), np.inf)
+    return np.hypot(points[:, 0] - pose.x, points[:, 1] - pose.y)
+
+
+# Planar rigid transform: a point p of the child frame lies at R(yaw) p + (x, y) in the parent frame.
+Transform2D = namedtuple('Transform2D', ['x', 'y', 'yaw'])
+
+
+def yaw_from_quaternion(q):
+    """Rotation about z of a quaternion with x, y, z, w attributes."""
+    return float(np.arctan2(2.0 * (q.w * q.z + q.x * q.y), 1.0 - 2.0 * (q.y * q.y + q.z * q.z)))
+
+
+def transform_points(transform, points):
+    """(N, 2) child frame points into the parent frame."""
+    c, s = np.cos(transform.yaw), np.sin(transform.yaw)
+    return points @ np.array([[c, s], [-s, c]]) + (transform.x, transform.y)
+
+
+def inverse_transform_points(transform, points):
+    """(N, 2) parent frame points into the child frame."""
+    c, s = np.cos(transform.yaw), np.sin(transform.yaw)
+    return (points - (transform.x, transform.y)) @ np.array([[c, -s], [s, c]])
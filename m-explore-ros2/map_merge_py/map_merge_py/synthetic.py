@@ -0,0 +1,108 @@
+"""Synthetic occupancy maps with known ground-truth placement, for tests and benchmarks."""
+from collections import namedtuple
+import zlib
+
+import cv2
+import numpy as np
+
+from map_merge_py.feature_cache import MapFingerprint
+from map_merge_py.grid_conversion import FREE, OCCUPIED, UNKNOWN
+from map_merge_py.merge_pipeline import RobotMap
+
+# truth is the 2x3 transform taking pixels of b into pixels of a.
+MapPair = namedtuple('MapPair', ['a', 'b', 'truth'])
+
+
+def make_world(size, rng, rooms=None):
+    """Square map image of rectangular rooms joined by corridors, walled in, with small obstacles."""
+    rooms = rooms or max(4, size * size // 6000)
+    free = np.zeros((size, size), dtype=np.uint8)
+    centers = []
+    for _ in range(rooms):
+        w, h = rng.integers(size // 20 + 8, size // 6 + 12, size=2)
+        x, y = rng.integers(2, size - max(w, h) - 2, size=2)
+        free[y:y + h, x:x + w] = 1
+        centers.append((x + w // 2, y + h // 2))
+    for (x0, y0), (x1, y1) in zip(centers, centers[1:]):
+        free[min(y0, y1):max(y0, y1) + 3, x0:x0 + 3] = 1
+        free[y1:y1 + 3, min(x0, x1):max(x0, x1) + 3] = 1
+    for _ in range(rooms * 2):
+        x, y = rng.integers(2, size - 8, size=2)
+        if free[y, x]:
+            free[y:y + rng.integers(2, 6), x:x + rng.integers(2, 6)] = 0
+
+    walls = cv2.dilate(free, np.ones((3, 3), dtype=np.uint8)) & ~free.astype(bool)
+    world = np.full((size, size), UNKNOWN, dtype=np.uint8)
+    world[free.astype(bool)] = FREE
+    world[walls.astype(bool)] = OCCUPIED
+    return world
+
+
+def robot_view(world, center, size, angle):
+    """Crop a size x size window of world around center, rotated by angle degrees.
+
+    Returns the robot map image and the 2x3 transform taking robot map
+    pixels into world pixels.
+    """
+    robot_to_world = cv2.getRotationMatrix2D((size / 2.0, size / 2.0), angle, 1.0)
+    robot_to_world[:, 2] += (center[0] - size / 2.0, center[1] - size / 2.0)
+    world_to_robot = cv2.invertAffineTransform(robot_to_world)
+    img = cv2.warpAffine(world, world_to_robot, (size, size), flags=cv2.INTER_NEAREST, borderValue=UNKNOWN)
+    return img, robot_to_world
+
+
+def as_robot_map(img, resolution=0.05, origin=(0.0, 0.0)):
+    fingerprint = MapFingerprint(img.shape[1], img.shape[0], resolution, origin[0], origin[1], zlib.crc32(img))
+    return RobotMap(img, resolution, origin[0], origin[1], fingerprint)
+
+
+def make_robot_maps(n_robots, rng, world_size=800, map_size=400, max_angle=180.0):
+    """n_robots overlapping views of one synthetic world.
+
+    Returns (world, {robot: RobotMap}, {robot: 2x3 robot-to-world transform}).
+    Robot centres lie on a circle around the world centre so that
+    neighbouring robots overlap.
+    """
+    world = make_world(world_size, rng)
+    maps = {}
+    truth = {}
+    radius = (world_size - map_size) / 2.0 * 0.6
+    for i in range(n_robots):
+        phase = 2.0 * np.pi * i / n_robots
+        center = (world_size / 2.0 + radius * np.cos(phase), world_size / 2.0 + radius * np.sin(phase))
+        angle = float(rng.uniform(-max_angle, max_angle))
+        img, robot_to_world = robot_view(world, center, map_size, angle)
+        robot = f'robot_{i + 1}'
+        maps[robot] = as_robot_map(img)
+        truth[robot] = robot_to_world
+    return world, maps, truth
+
+
+def add_noise(img, fraction, rng):
+    """Flip a fraction of the known cells between free and occupied, like sensor speckle."""
+    if fraction <= 0.0:
+        return img
+    noisy = img.copy()
+    flip = (rng.random(img.shape) < fraction) & (img != UNKNOWN)
+    noisy[flip] = np.where(img[flip] == FREE, OCCUPIED, FREE)
+    return noisy
+
+
+def make_map_pair(rng, size=400, rotation=30.0, overlap=0.6, noise=0.0):
+    """Two size x size maps of one world; b is rotated by rotation degrees relative to a.
+
+    overlap is the fraction of a's width that b's window covers before
+    rotation; the offset between the windows points in a random direction.
+    """
+    shift = (1.0 - overlap) * size
+    world_size = int(size + 2 * shift + size // 2)
+    world = make_world(world_size, rng)
+    heading = rng.uniform(0.0, 2.0 * np.pi)
+    center = np.array([world_size / 2.0, world_size / 2.0])
+    offset = shift / 2.0 * np.array([np.cos(heading), np.sin(heading)])
+    angle_a = float(rng.uniform(-180.0, 180.0))
+    img_a, a_to_world = robot_view(world, center - offset, size, angle_a)
+    img_b, b_to_world = robot_view(world, center + offset, size, angle_a + rotation)
+    world_to_a = np.vstack([cv2.invertAffineTransform(a_to_world), [0.0, 0.0, 1.0]])
+    truth = (world_to_a @ np.vstack([b_to_world, [0.0, 0.0, 1.0]]))[:2]
+    return MapPair(add_noise(img_a, noise, rng), add_noise(img_b, noise, rng), truth)
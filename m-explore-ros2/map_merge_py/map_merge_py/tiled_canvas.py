@@ -0,0 +1,144 @@
+"""Merged-map canvas that only re-warps and recombines the tiles that changed."""
+import cv2
+import numpy as np
+
+from map_merge_py.grid_conversion import FREE, OCCUPIED, UNKNOWN
+
+IDENTITY = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+
+
+def combine(images, out=None):
+    """Merge aligned map images: occupied wins, then free, otherwise unknown."""
+    occupied = np.zeros(images[0].shape, dtype=bool)
+    free = np.zeros(images[0].shape, dtype=bool)
+    for img in images:
+        occupied |= img == OCCUPIED
+        free |= img == FREE
+    merged = np.where(occupied, OCCUPIED, np.where(free, FREE, UNKNOWN)).astype(np.uint8)
+    if out is None:
+        return merged
+    out[...] = merged
+    return out
+
+
+def warp_into(img, transform, x0, y0, width, height):
+    """Warp img by the 2x3 transform and return the (x0, y0, width, height) window of the result."""
+    tx, ty = transform[:, 2]
+    if np.array_equal(transform[:, :2], IDENTITY[:, :2]) and tx.is_integer() and ty.is_integer():
+        # Whole-pixel shifts are plain copies.
+        window = np.full((height, width), UNKNOWN, dtype=np.uint8)
+        sx0, sy0 = x0 - int(tx), y0 - int(ty)
+        dx0, dy0 = max(0, -sx0), max(0, -sy0)
+        src = img[max(0, sy0):max(0, sy0 + height), max(0, sx0):max(0, sx0 + width)]
+        window[dy0:dy0 + src.shape[0], dx0:dx0 + src.shape[1]] = src
+        return window
+    shifted = transform.copy()
+    shifted[:, 2] -= (x0, y0)
+    return cv2.warpAffine(img, shifted, (width, height), borderValue=UNKNOWN)
+
+
+def changed_tiles(current, previous, tile_size):
+    """Boolean (tiles_y, tiles_x) grid marking tiles whose pixels differ."""
+    rows = np.arange(0, current.shape[0], tile_size)
+    cols = np.arange(0, current.shape[1], tile_size)
+    if current is previous:
+        return np.zeros((len(rows), len(cols)), dtype=bool)
+    diff = current != previous
+    return np.logical_or.reduceat(np.logical_or.reduceat(diff, rows, axis=0), cols, axis=1)
+
+
+class TiledMergeCanvas:
+    """Keeps the merge of several map images, each placed by a 2x3 affine transform.
+
+    update() compares every layer with its previous image tile by tile,
+    projects the changed tiles into the canvas and only re-warps and
+    recombines the canvas tiles they touch. A new canvas shape, a different
+    set of layers or a changed transform forces a full rebuild.
+    """
+
+    def __init__(self, tile_size=64, full_rebuild_ratio=0.5):
+        self.tile_size = tile_size
+        self.full_rebuild_ratio = full_rebuild_ratio
+        self.reset()
+
+    def reset(self):
+        self.canvas = None
+        self.layers = {}
+        # Tiles rewritten by the last update(), in canvas tile coordinates.
+        self.dirty = None
+
+    @property
+    def tile_grid_shape(self):
+        if self.canvas is None:
+            return (0, 0)
+        return (-(-self.canvas.shape[0] // self.tile_size), -(-self.canvas.shape[1] // self.tile_size))
+
+    def update(self, shape, layers):
+        """Merge layers, a dict of name -> (image, 2x3 transform into the canvas), into a canvas of shape."""
+        layers = {name: (img, np.asarray(transform, dtype=np.float64)) for name, (img, transform) in layers.items()}
+        if self._needs_rebuild(shape, layers):
+            self._rebuild(shape, layers)
+            return self.canvas
+
+        dirty = np.zeros(self.tile_grid_shape, dtype=bool)
+        for name, (img, transform) in layers.items():
+            layer_dirty = changed_tiles(img, self.layers[name][0], self.tile_size)
+            if layer_dirty.any():
+                dirty |= self._project_tiles(layer_dirty, transform)
+        self.layers = layers
+
+        if dirty.mean() > self.full_rebuild_ratio:
+            self._rebuild(shape, layers)
+            return self.canvas
+
+        for ty, tx in np.argwhere(dirty):
+            self._merge_tile(ty, tx)
+        self.dirty = dirty
+        return self.canvas
+
+    def _needs_rebuild(self, shape, layers):
+        if self.canvas is None or self.canvas.shape != tuple(shape) or layers.keys() != self.layers.keys():
+            return True
+        for name, (img, transform) in layers.items():
+            old_img, old_transform = self.layers[name]
+            if img.shape != old_img.shape or not np.array_equal(transform, old_transform):
+                return True
+        return False
+
+    def _rebuild(self, shape, layers):
+        height, width = shape
+        self.canvas = combine([warp_into(img, transform, 0, 0, width, height) for img, transform in layers.values()])
+        self.layers = layers
+        self.dirty = np.ones(self.tile_grid_shape, dtype=bool)
+
+    def _project_tiles(self, layer_dirty, transform):
+        """Canvas tiles covered by the given layer tiles after warping."""
+        t = self.tile_size
+        grid_shape = self.tile_grid_shape
+        tiles = np.argwhere(layer_dirty)
+        # Pad by one pixel for the bilinear interpolation footprint.
+        y0 = tiles[:, 0] * t - 1
+        x0 = tiles[:, 1] * t - 1
+        y1 = y0 + t + 2
+        x1 = x0 + t + 2
+        corners = np.stack([
+            np.stack([x0, y0], axis=1), np.stack([x1, y0], axis=1),
+            np.stack([x0, y1], axis=1), np.stack([x1, y1], axis=1)], axis=1).astype(np.float64)
+        projected = corners @ transform[:, :2].T + transform[:, 2]
+        lo = np.floor(projected.min(axis=1) / t).astype(int)
+        hi = np.floor(projected.max(axis=1) / t).astype(int) + 1
+
+        dirty = np.zeros(grid_shape, dtype=bool)
+        lo_x, hi_x = np.clip(lo[:, 0], 0, grid_shape[1]), np.clip(hi[:, 0], 0, grid_shape[1])
+        lo_y, hi_y = np.clip(lo[:, 1], 0, grid_shape[0]), np.clip(hi[:, 1], 0, grid_shape[0])
+        for ly, hy, lx, hx in zip(lo_y, hi_y, lo_x, hi_x):
+            dirty[ly:hy, lx:hx] = True
+        return dirty
+
+    def _merge_tile(self, ty, tx):
+        t = self.tile_size
+        y0, x0 = ty * t, tx * t
+        y1 = min(y0 + t, self.canvas.shape[0])
+        x1 = min(x0 + t, self.canvas.shape[1])
+        windows = [warp_into(img, transform, x0, y0, x1 - x0, y1 - y0) for img, transform in self.layers.values()]
+        combine(windows, out=self.canvas[y0:y1, x0:x1])
@@ -0,0 +1,27 @@
+"""Per-stage wall-clock timing."""
+from contextlib import contextmanager
+import time
+
+
+class StageTimer:
+    def __init__(self):
+        self.durations = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - start
+
+
+class NullTimer:
+    """Stand-in for StageTimer when nobody reads the timings."""
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+
+NULL_TIMER = NullTimer()
@@ -0,0 +1,117 @@
+"""Warm-start tracking of accepted pairwise transforms.
+
+Once a pair of maps has been registered, later ticks first score the
+previous transform on downsampled images, then try an ECC refinement around
+it, and only fall back to global feature matching when both fail.
+"""
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from map_merge_py.grid_conversion import OCCUPIED, UNKNOWN
+
+# Downsampled pixels closer than this to UNKNOWN are treated as unknown.
+KNOWN_MARGIN = 40
+
+# A downsampled map: the grey image that is scored, its walls as an image
+# ECC can align, and the mask of known pixels ECC is restricted to.
+SmallMap = namedtuple('SmallMap', ['image', 'walls', 'known'])
+
+
+def rigid_part(transform):
+    """Drop the scale of a 2x3 similarity transform, keeping rotation and translation."""
+    rigid = np.array(transform, dtype=np.float64)
+    scale = np.hypot(rigid[0, 0], rigid[1, 0])
+    if scale > 0:
+        rigid[:, :2] /= scale
+    return rigid
+
+
+def scaled_transform(transform, scale):
+    scaled = np.array(transform, dtype=np.float64)
+    scaled[:, 2] *= scale
+    return scaled
+
+
+def alignment_score(small_a, small_b, transform):
+    """Correlation of two downsampled maps over the cells both know, with b warped by transform."""
+    warped = cv2.warpAffine(small_b, transform, (small_a.shape[1], small_a.shape[0]), borderValue=UNKNOWN)
+    known = (np.abs(small_a - UNKNOWN) > KNOWN_MARGIN) & (np.abs(warped - UNKNOWN) > KNOWN_MARGIN)
+    if np.count_nonzero(known) < 16:
+        return 0.0
+    a = small_a[known] - small_a[known].mean()
+    b = warped[known] - warped[known].mean()
+    denominator = np.sqrt((a * a).sum() * (b * b).sum())
+    return float((a * b).sum() / denominator) if denominator > 0 else 0.0
+
+
+def refine_transform(small_a, small_b, transform, iterations=30, eps=1e-4, mask=None):
+    """ECC-refine a rigid transform taking small_b pixels into small_a; None if ECC diverges.
+
+    mask, if given, limits the pixels of small_a that ECC compares.
+    """
+    # ECC estimates the warp taking template (a) coordinates into input (b) coordinates.
+    warp = cv2.invertAffineTransform(rigid_part(transform)).astype(np.float32)
+    criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, iterations, eps)
+    try:
+        _, warp = cv2.findTransformECC(small_a, small_b, warp, cv2.MOTION_EUCLIDEAN, criteria, mask, 5)
+    except cv2.error:
+        return None
+    return cv2.invertAffineTransform(warp).astype(np.float64)
+
+
+class TransformTracker:
+    """Checks and refines a previous pairwise transform on downsampled maps.
+
+    A transform is kept when its alignment score stays above both min_score
+    and keep_ratio times the score it had when last accepted. Otherwise ECC
+    refines it on the walls of both maps, within the cells the first map
+    knows; free space ending where a map stops being explored is not
+    structure both maps share. A refinement is accepted if it scores above
+    the threshold, or if it scores at least min_score and no worse than the
+    previous transform: a growing map can lower the score of a correct
+    transform, which ECC then confirms rather than improves.
+    """
+
+    def __init__(self, scale=0.25, keep_ratio=0.9, min_score=0.2):
+        self.scale = scale
+        self.keep_ratio = keep_ratio
+        self.min_score = min_score
+        self._small = {}
+
+    def downsample(self, robot, robot_map):
+        """SmallMap of robot_map, cached per map version."""
+        cached = self._small.get(robot)
+        if cached is None or cached[0] != robot_map.fingerprint:
+            image = cv2.resize(robot_map.image, None, fx=self.scale, fy=self.scale,
+                               interpolation=cv2.INTER_AREA).astype(np.float32)
+            walls = cv2.resize((robot_map.image == OCCUPIED).astype(np.float32) * 255.0, None,
+                               fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+            known = (np.abs(image - UNKNOWN) > KNOWN_MARGIN).view(np.uint8)
+            cached = (robot_map.fingerprint, SmallMap(image, walls, known))
+            self._small[robot] = cached
+        return cached[1]
+
+    def score(self, small_a, small_b, transform):
+        return alignment_score(small_a.image, small_b.image, scaled_transform(transform, self.scale))
+
+    def track(self, small_a, small_b, transform, reference_score):
+        """Return (transform, score, refined) if tracking holds, else None.
+
+        The previous transform is returned unchanged while it still scores
+        well, so the published TF does not jitter between equivalent fits.
+        """
+        threshold = max(self.min_score, self.keep_ratio * reference_score)
+        score = self.score(small_a, small_b, transform)
+        if score >= threshold:
+            return transform, score, False
+        refined = refine_transform(small_a.walls, small_b.walls, scaled_transform(transform, self.scale),
+                                   mask=small_a.known)
+        if refined is None:
+            return None
+        refined[:, 2] /= self.scale
+        refined_score = self.score(small_a, small_b, refined)
+        if refined_score >= threshold or refined_score >= max(self.min_score, score):
+            return refined, refined_score, True
+        return None
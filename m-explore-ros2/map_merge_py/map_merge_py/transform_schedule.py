@@ -0,0 +1,29 @@
+"""When the merger sends the world -> <robot>/map transforms, and which.
+
+In dynamic mode they go out on /tf on every TF tick. In static mode they
+are latched on /tf_static, which keeps only the last message of each
+publisher, so every message carries every robot. They are then sent when
+any pose changed, and again every heartbeat_period seconds if that is
+positive, for listeners that missed the latched message.
+"""
+
+
+class TransformSchedule:
+    def __init__(self, static=False, heartbeat_period=0.0):
+        self.static = static
+        self.heartbeat_period = heartbeat_period
+        self.sent_poses = None
+        self.last_sent = None
+
+    def due(self, poses, now):
+        """Poses to send at time now, robot -> (x, y, yaw) for every robot; None if nothing is due."""
+        if not poses:
+            return None
+        if self.static:
+            heartbeat_due = (self.heartbeat_period > 0.0 and self.last_sent is not None
+                             and now - self.last_sent >= self.heartbeat_period)
+            if poses == self.sent_poses and not heartbeat_due:
+                return None
+        self.sent_poses = poses
+        self.last_sent = now
+        return poses
@@ -0,0 +1,52 @@
+import numpy as np
+
+from map_merge_py.alignment_store import load_alignments, save_alignments
+from map_merge_py.merge_pipeline import MergePipeline
+from map_merge_py.synthetic import as_robot_map, make_robot_maps
+from map_merge_py.tracking import TransformTracker
+
+
+def test_restarted_pipeline_reuses_saved_transforms(tmp_path):
+    _, maps, _ = make_robot_maps(3, np.random.default_rng(3))
+    first = MergePipeline(tracker=TransformTracker())
+    expected = first.merge(maps)
+    path = str(tmp_path / 'alignments.json')
+    save_alignments(path, first.accepted_pairs())
+
+    restarted = MergePipeline(tracker=TransformTracker())
+    restarted.seed(load_alignments(path))
+    result = restarted.merge(maps)
+    assert restarted.global_matches == 0 and restarted.seeds == {}
+    assert result.components == expected.components
+    for robot, pose in expected.poses.items():
+        assert np.allclose(result.poses[robot], pose)
+
+
+def test_changed_maps_are_validated_by_tracking(tmp_path):
+    _, maps, _ = make_robot_maps(2, np.random.default_rng(4))
+    first = MergePipeline(tracker=TransformTracker())
+    first.merge(maps)
+    path = str(tmp_path / 'alignments.json')
+    save_alignments(path, first.accepted_pairs())
+
+    grown = dict(maps)
+    img = maps['robot_2'].image.copy()
+    img[:8, :8] = 0
+    grown['robot_2'] = as_robot_map(img)
+    restarted = MergePipeline(tracker=TransformTracker())
+    restarted.seed(load_alignments(path))
+    assert len(restarted.merge(grown).components) == 1
+    assert restarted.global_matches == 0
+
+    # A wrong saved transform fails tracking and is matched from scratch.
+    restarted = MergePipeline(tracker=TransformTracker())
+    seeds = load_alignments(path)
+    fingerprints, estimate, score = seeds[('robot_1', 'robot_2')]
+    shifted = estimate.transform + [[0, 0, 150], [0, 0, -120]]
+    restarted.seed({('robot_1', 'robot_2'): (fingerprints, estimate._replace(transform=shifted), score)})
+    assert len(restarted.merge(grown).components) == 1
+    assert restarted.global_matches == 1
+
+
+def test_missing_cache_file_loads_nothing(tmp_path):
+    assert load_alignments(str(tmp_path / 'missing.json')) == {}
@@ -0,0 +1,49 @@
+import numpy as np
+
+from map_merge_py.assignment import assign_frontiers, frontier_costs, solve
+
+
+def test_robots_split_instead_of_sharing_the_nearest_cluster():
+    # Both robots are closest to cluster 0; the team is better off if robot 1 takes cluster 1.
+    costs = np.array([[1.0, 10.0],
+                      [2.0, 3.0]])
+    assert costs.argmin(axis=1).tolist() == [0, 0]
+    assert assign_frontiers(costs, [(0.0, 0.0), (50.0, 0.0)]) == [0, 1]
+
+
+def test_unreachable_pairs_are_never_assigned():
+    costs = np.array([[np.inf, np.inf],
+                      [1.0, np.inf],
+                      [2.0, 5.0]])
+    assert solve(costs) == [None, 0, 1]
+    assert solve(np.full((2, 3), np.inf)) == [None, None]
+    assert solve(np.zeros((2, 0))) == [None, None]
+
+
+def test_more_robots_than_clusters():
+    assignment = solve(np.array([[4.0], [1.0], [3.0]]))
+    assert assignment == [None, 0, None]
+
+
+def test_spread_penalty_separates_goals_in_the_same_region():
+    # Clusters 0 and 1 are the same frontier seen in two robot maps.
+    points = [(0.0, 0.0), (0.2, 0.0), (20.0, 0.0)]
+    costs = np.array([[1.0, 1.5, 12.0],
+                      [1.5, 1.0, 13.0]])
+    assert solve(costs) == [0, 1]
+    # Sending robot 0 far is 1 cheaper than sending robot 1 far.
+    assert assign_frontiers(costs, points, spread_radius=1.0, spread_penalty=20.0) == [2, 1]
+    assert assign_frontiers(costs, points, rounds=1) == [0, 1]
+
+
+def test_gain_lowers_cost():
+    costs = frontier_costs([[2.0, 2.0]], [0.0, 3.0], potential_scale=3.0, gain_scale=1.0)
+    np.testing.assert_allclose(costs, [[6.0, 3.0]])
+    assert np.isinf(frontier_costs([[np.inf]], [1.0])).all()
+
+
+def test_claimed_goals_push_robots_elsewhere():
+    points = [(0.0, 0.0), (20.0, 0.0)]
+    costs = np.array([[1.0, 5.0]])
+    assert assign_frontiers(costs, points) == [0]
+    assert assign_frontiers(costs, points, spread_penalty=10.0, claimed=[(0.3, 0.0)]) == [1]
@@ -0,0 +1,69 @@
+import numpy as np
+
+from map_merge_py.assignment import assign_frontiers, frontier_costs
+from map_merge_py.blacklist import FrontierBlacklist, StallDetector, blocked_world_points
+from map_merge_py.robot_poses import Transform2D
+
+
+def test_entries_block_their_neighbourhood():
+    blacklist = FrontierBlacklist(radius=0.5, ttl=10.0)
+    blacklist.add(1.0, 1.0, now=0.0)
+    # Points across bucket boundaries and on negative coordinates.
+    points = [(1.0, 1.0), (1.3, 1.3), (1.49, 1.0), (1.6, 1.0), (0.51, 1.0), (-1.0, -1.0)]
+    assert blacklist.contains(points, now=1.0).tolist() == [True, True, True, False, True, False]
+    blacklist.add(-1.2, -0.9, now=0.0)
+    assert blacklist.contains(points, now=1.0).tolist()[-1]
+    assert blacklist.contains(np.empty((0, 2)), now=1.0).shape == (0,)
+
+
+def test_entries_expire_and_nearby_additions_refresh():
+    blacklist = FrontierBlacklist(radius=0.5, ttl=10.0)
+    blacklist.add(0.0, 0.0, now=0.0)
+    blacklist.add(0.2, 0.0, now=8.0)
+    assert len(blacklist) == 1
+    assert blacklist.contains([(0.0, 0.0)], now=15.0).all()
+    assert not blacklist.contains([(0.0, 0.0)], now=19.0).any()
+    blacklist.expire(now=19.0)
+    assert len(blacklist) == 0
+
+
+def test_memory_cap_drops_first_to_expire():
+    blacklist = FrontierBlacklist(radius=0.5, ttl=100.0, max_entries=3)
+    for i in range(5):
+        blacklist.add(float(i * 2), 0.0, now=float(i))
+    assert len(blacklist) == 3
+    assert blacklist.contains([(0.0, 0.0), (2.0, 0.0), (4.0, 0.0), (6.0, 0.0), (8.0, 0.0)], now=5.0).tolist() == \
+        [False, False, True, True, True]
+
+
+def test_stall_detector_reports_frontiers_near_for_too_long():
+    stalls = StallDetector(match_radius=0.5, timeout=10.0)
+    points = np.array([[0.0, 0.0], [5.0, 0.0]])
+    near = np.array([True, False])
+    assert not stalls.update(points, near, now=0.0).any()
+    # The cluster goal shifts a little between ticks but is still the same frontier.
+    assert not stalls.update(points + 0.1, near, now=6.0).any()
+    assert stalls.update(points + 0.2, near, now=11.0).tolist() == [True, False]
+    # Moving out of reach resets the timer.
+    stalls.update(points, np.array([False, False]), now=12.0)
+    assert not stalls.update(points, near, now=30.0).any()
+
+
+def test_failed_goals_block_pooled_frontiers_from_other_maps():
+    # robot_1's map is turned a quarter and shifted in the world; robot_2's is the world.
+    map_to_world = {'robot_1': Transform2D(5.0, 0.0, np.pi / 2), 'robot_2': Transform2D(0.0, 0.0, 0.0)}
+    blacklists = {robot: FrontierBlacklist(radius=0.5, ttl=10.0) for robot in map_to_world}
+    # robot_1 failed a goal at world (3, 2), which is (2, 2) of its map; the
+    # frontier itself is only in robot_2's map, so it is pooled from there.
+    blacklists['robot_1'].add(2.0, 2.0, now=0.0)
+    points = np.array([[3.0, 2.0], [8.0, 8.0]])
+
+    robots = ['robot_1', 'robot_2']
+    blocked = blocked_world_points(blacklists, robots, map_to_world, points, now=1.0)
+    assert blocked.tolist() == [[True, False], [False, False]]
+    assert not blocked_world_points(blacklists, robots, {**map_to_world, 'robot_1': None}, points, now=1.0).any()
+
+    # The nearer frontier is no longer assigned back to robot_1.
+    path_costs = np.array([[1.0, 9.0], [2.0, 9.0]])
+    path_costs[blocked] = np.inf
+    assert assign_frontiers(frontier_costs(path_costs, [0.0, 0.0]), points) == [1, 0]
@@ -0,0 +1,27 @@
+import cv2
+import numpy as np
+
+from map_merge_py.debug_views import encode_image, render_match_overlay
+from map_merge_py.merge_pipeline import MergePipeline
+from map_merge_py.synthetic import make_robot_maps
+
+
+def test_match_overlay_reuses_cached_features():
+    _, maps, _ = make_robot_maps(3, np.random.default_rng(3))
+    pipeline = MergePipeline()
+    result = pipeline.merge(maps)
+    misses = pipeline.registration.feature_cache.misses
+
+    overlay = render_match_overlay(result.estimates, pipeline.match_features, max_matches=20)
+    assert pipeline.registration.feature_cache.misses == misses
+    assert overlay.ndim == 3 and overlay.shape[0] == 3 * maps['robot_1'].image.shape[0]
+
+
+def test_overlay_without_matches_is_skipped():
+    assert render_match_overlay({}, {}) is None
+
+
+def test_png_encoding_round_trips():
+    img = np.random.default_rng(0).integers(0, 256, size=(40, 30), dtype=np.uint8)
+    decoded = cv2.imdecode(np.frombuffer(encode_image(img), dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    assert np.array_equal(decoded, img)
@@ -0,0 +1,53 @@
+from map_merge_py.exploration_scheduler import ExplorationScheduler
+
+
+def make_scheduler():
+    scheduler = ExplorationScheduler(['robot_1', 'robot_2'], debounce=1.0, max_delay=5.0, period=30.0)
+    # The first run is due straight away and finds nobody with a goal.
+    assert scheduler.due(0.0) == ['robot_1', 'robot_2']
+    scheduler.goal_sent('robot_1', 0.0)
+    scheduler.goal_sent('robot_2', 0.0)
+    return scheduler
+
+
+def test_nothing_is_due_without_events():
+    scheduler = make_scheduler()
+    assert scheduler.due(10.0) is None
+    # Until the period runs out; robots that are busy are left alone.
+    assert scheduler.due(30.0) == []
+
+
+def test_events_are_debounced():
+    scheduler = make_scheduler()
+    scheduler.map_changed('robot_1', 1.0)
+    assert scheduler.due(1.5) is None
+    scheduler.map_changed(None, 1.8)
+    assert scheduler.due(2.5) is None
+    assert scheduler.due(2.9) == ['robot_1']
+    assert scheduler.due(3.5) is None
+
+
+def test_a_stream_of_events_is_planned_for_after_max_delay():
+    scheduler = make_scheduler()
+    for t in range(1, 6):
+        scheduler.map_changed('robot_2', float(t) * 0.9)
+        assert scheduler.due(float(t) * 0.9 + 0.5) is None
+    scheduler.map_changed('robot_2', 5.8)
+    assert scheduler.due(6.0) == ['robot_2']
+
+
+def test_finished_goals_need_a_new_one():
+    scheduler = make_scheduler()
+    scheduler.goal_finished('robot_2', 4.0)
+    assert scheduler.due(5.0) == ['robot_2']
+    scheduler.goal_sent('robot_2', 5.0)
+    assert scheduler.due(7.0) is None
+
+
+def test_feedback_reports_robots_that_stop_making_progress():
+    scheduler = ExplorationScheduler(['robot_1'], progress_timeout=10.0, min_progress=0.1)
+    scheduler.goal_sent('robot_1', 0.0)
+    assert not scheduler.feedback('robot_1', 5.0, 1.0)
+    assert not scheduler.feedback('robot_1', 4.0, 2.0)
+    assert not scheduler.feedback('robot_1', 3.95, 11.0)
+    assert scheduler.feedback('robot_1', 3.95, 12.5)
@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from map_merge_py.feature_cache import FeatureCache, map_fingerprint
+from map_merge_py.grid_conversion import image_to_grid, occupancy_grid_to_image
+from map_merge_py.synthetic import make_world
+
+
+def make_msg(grid):
+    height, width = grid.shape
+    origin = SimpleNamespace(position=SimpleNamespace(x=0.0, y=0.0))
+    info = SimpleNamespace(width=width, height=height, resolution=0.05, origin=origin)
+    return SimpleNamespace(info=info, data=grid.tobytes())
+
+
+def test_features_are_detected_once_per_map_content():
+    grid = image_to_grid(make_world(200, np.random.default_rng(0)))
+    msg = make_msg(grid)
+    cache = FeatureCache()
+
+    first = cache.get('robot_1', map_fingerprint(msg), occupancy_grid_to_image(msg))
+    again = cache.get('robot_1', map_fingerprint(make_msg(grid.copy())), occupancy_grid_to_image(msg))
+    assert again is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(first.keypoints) > 0
+
+    # Same cells for another robot, then one changed cell, both miss.
+    cache.get('robot_2', map_fingerprint(msg), occupancy_grid_to_image(msg))
+    changed = grid.copy()
+    changed[100, 100] = 100 if changed[100, 100] != 100 else 0
+    changed_msg = make_msg(changed)
+    updated = cache.get('robot_1', map_fingerprint(changed_msg), occupancy_grid_to_image(changed_msg))
+    assert updated is not first
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_fingerprint_covers_geometry():
+    grid = np.zeros((10, 10), dtype=np.int8)
+    msg = make_msg(grid)
+    moved = make_msg(grid)
+    moved.info.origin = SimpleNamespace(position=SimpleNamespace(x=1.0, y=0.0))
+    assert map_fingerprint(msg) == map_fingerprint(make_msg(grid))
+    assert map_fingerprint(msg) != map_fingerprint(moved)
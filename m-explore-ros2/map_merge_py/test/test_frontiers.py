@@ -0,0 +1,93 @@
+import numpy as np
+
+from map_merge_py.frontiers import find_frontiers, frontier_clusters, frontier_mask, near_clusters
+
+
+def reference_frontiers(data, min_unknown_cells, reachable_mask=None):
+    """The original per-cell loop from MultiRobotExplorer.find_frontiers."""
+    height, width = data.shape
+    frontiers = []
+    for y in range(2, height - 2):
+        for x in range(2, width - 2):
+            if data[y, x] != 0:
+                continue
+            if reachable_mask is not None and not reachable_mask[y, x]:
+                continue
+            neighborhood = data[y-1:y+2, x-1:x+2].flatten()
+            if -1 not in neighborhood:
+                continue
+            unknown_area = data[y-2:y+3, x-2:x+3]
+            if np.sum(unknown_area == -1) < min_unknown_cells:
+                continue
+            if np.sum(unknown_area == 100) > 2:
+                continue
+            frontiers.append((y, x))
+    return frontiers
+
+
+def random_grid(rng, shape):
+    values = np.array([-1, 0, 100, 50, -5], dtype=np.int8)
+    return rng.choice(values, size=shape, p=[0.35, 0.5, 0.1, 0.03, 0.02])
+
+
+def test_matches_reference_loop():
+    rng = np.random.default_rng(0)
+    for shape in [(60, 80), (5, 5), (4, 30), (33, 7)]:
+        grid = random_grid(rng, shape)
+        for min_unknown_cells in (0, 5, 15, 25):
+            assert find_frontiers(grid, min_unknown_cells) == reference_frontiers(grid, min_unknown_cells)
+
+
+def test_matches_reference_loop_with_reachability():
+    rng = np.random.default_rng(1)
+    grid = random_grid(rng, (70, 50))
+    reachable = rng.random(grid.shape) < 0.6
+    assert find_frontiers(grid, 8, reachable) == reference_frontiers(grid, 8, reachable)
+
+
+def test_clusters_summarise_connected_frontier_cells():
+    grid = np.full((40, 40), -1, dtype=np.int8)
+    grid[5:35, 5:20] = 0
+    grid[5:35, 30:35] = 0
+    clusters = frontier_clusters(grid, 5, gain_radius=3)
+
+    mask = frontier_mask(grid, 5)
+    assert sum(c.size for c in clusters) == mask.sum()
+    assert [c.size for c in clusters] == sorted((c.size for c in clusters), reverse=True)
+    for cluster in clusters:
+        x, y, w, h = cluster.bbox
+        assert mask[cluster.goal]
+        assert x <= cluster.goal[1] < x + w and y <= cluster.goal[0] < y + h
+        assert y <= cluster.centroid[0] <= y + h - 1 and x <= cluster.centroid[1] <= x + w - 1
+        assert cluster.gain > 0
+    assert sum(c.gain for c in clusters) <= (grid == -1).sum()
+
+
+def test_clusters_respect_min_size_and_reachability():
+    rng = np.random.default_rng(2)
+    grid = random_grid(rng, (60, 60))
+    clusters = frontier_clusters(grid, 5)
+    assert sum(c.size for c in clusters) == frontier_mask(grid, 5).sum()
+    assert all(c.size >= 4 for c in frontier_clusters(grid, 5, min_size=4))
+    assert frontier_clusters(grid, 5, np.zeros(grid.shape, dtype=bool)) == []
+
+
+def test_goals_stay_near_a_receding_frontier():
+    # A walled corridor explored from the left.
+    grid = np.full((40, 60), -1, dtype=np.int8)
+    grid[14, :] = grid[25, :] = 100
+    grid[15:25, :20] = 0
+    [cluster] = frontier_clusters(grid, 5)
+    goal = cluster.goal
+
+    # Uncovering the corridor moves the frontier on; the old goal is left behind it.
+    grid[15:25, 20:26] = 0
+    [cluster] = frontier_clusters(grid, 5)
+    assert not near_clusters([cluster], goal)[0]
+    assert near_clusters([cluster], goal, margin=20)[0]
+    assert near_clusters([cluster], [goal, (2, 2)], margin=20).tolist() == [True, False]
+
+    # Once the corridor ends there is no frontier left to keep the goal for.
+    grid[15:25, 26:59] = 0
+    grid[15:25, 59] = 100
+    assert near_clusters(frontier_clusters(grid, 5), goal, margin=20).tolist() == [False]
@@ -0,0 +1,55 @@
+import array
+from types import SimpleNamespace
+
+import numpy as np
+
+from map_merge_py.grid_conversion import (
+    fill_occupancy_grid, fill_occupancy_grid_update, grid_view, image_to_grid, occupancy_grid_to_image,
+    update_view)
+
+
+def make_msg(grid, as_list=False):
+    height, width = grid.shape
+    data = grid.flatten().tolist() if as_list else array.array('b', grid.tobytes())
+    return SimpleNamespace(info=SimpleNamespace(width=width, height=height), data=data)
+
+
+def reference_image(grid):
+    img = np.zeros(grid.shape, dtype=np.uint8)
+    img[grid == -1] = 127
+    img[grid == 0] = 255
+    img[grid > 0] = 0
+    return img
+
+
+def test_to_image_matches_mask_conversion():
+    rng = np.random.default_rng(1)
+    grid = rng.integers(-128, 128, size=(37, 53)).astype(np.int8)
+    grid[::3] = -1
+    assert np.array_equal(occupancy_grid_to_image(make_msg(grid)), reference_image(grid))
+    assert np.array_equal(occupancy_grid_to_image(make_msg(grid, as_list=True)), reference_image(grid))
+
+
+def test_grid_view_does_not_copy():
+    grid = np.zeros((4, 6), dtype=np.int8)
+    msg = make_msg(grid)
+    view = grid_view(msg)
+    msg.data[7] = 100
+    assert view[1, 1] == 100
+
+
+def test_round_trip_through_message():
+    grid = np.array([[-1, 0, 100], [0, 100, -1]], dtype=np.int8)
+    img = occupancy_grid_to_image(make_msg(grid))
+    out = fill_occupancy_grid(SimpleNamespace(info=SimpleNamespace(width=0, height=0), data=None), img)
+    assert (out.info.width, out.info.height) == (3, 2)
+    assert isinstance(out.data, array.array) and out.data.typecode == 'b'
+    assert list(out.data) == grid.flatten().tolist()
+    assert np.array_equal(image_to_grid(img), grid)
+
+
+def test_update_view_reads_filled_update():
+    rng = np.random.default_rng(4)
+    img = rng.choice(np.array([0, 127, 255], dtype=np.uint8), size=(20, 30))
+    msg = fill_occupancy_grid_update(SimpleNamespace(), img, 2, 3, 7, 5)
+    np.testing.assert_array_equal(update_view(msg), image_to_grid(img[3:8, 2:9]))
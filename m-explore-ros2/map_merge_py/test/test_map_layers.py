@@ -0,0 +1,140 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from map_merge_py.frontiers import frontier_clusters, frontier_mask
+from map_merge_py.map_layers import MapLayers
+
+
+def make_msg(grid, resolution=0.05):
+    height, width = grid.shape
+    origin = SimpleNamespace(position=SimpleNamespace(x=0.0, y=0.0))
+    info = SimpleNamespace(width=width, height=height, resolution=resolution, origin=origin)
+    return SimpleNamespace(info=info, data=grid.tobytes())
+
+
+def make_grid():
+    grid = np.full((40, 40), -1, dtype=np.int8)
+    grid[5:20, 5:20] = 0
+    grid[25:35, 5:35] = 0
+    return grid
+
+
+def test_layers_are_memoized_until_the_content_changes():
+    grid = make_grid()
+    layers = MapLayers()
+    assert layers.update(make_msg(grid))
+    masks = layers.masks
+    frontiers = layers.frontiers(5)
+    assert layers.masks is masks
+    assert layers.frontiers(5) is frontiers
+    assert layers.frontiers(6) is not frontiers
+
+    # A new message with the same cells keeps every layer but the grid view.
+    assert not layers.update(make_msg(grid))
+    assert layers.masks is masks
+    assert layers.frontiers(5) is frontiers
+
+    grid[20:25, 10] = 0
+    assert layers.update(make_msg(grid))
+    np.testing.assert_array_equal(layers.masks[0], grid == 0)
+    assert layers.frontiers(5) == frontier_clusters(grid, 5)
+
+
+def test_reachable_frontiers_follow_components():
+    grid = make_grid()
+    layers = MapLayers()
+    layers.update(make_msg(grid))
+    upper, lower = layers.component(10, 10), layers.component(30, 30)
+    assert upper and lower and upper != lower
+    assert layers.component(0, 0) == 0
+
+    both = layers.reachable_mask([upper, lower])
+    assert both.sum() == (grid == 0).sum()
+    assert layers.reachable_mask([lower, upper]) is both
+    np.testing.assert_array_equal(layers.reachable_mask([upper]), _upper_room(grid))
+    only_upper = layers.frontiers(5, [upper])
+    assert only_upper == frontier_clusters(grid, 5, _upper_room(grid))
+
+
+def test_cached_arrays_are_read_only_and_still_patched():
+    grid = make_grid()
+    layers = MapLayers()
+    layers.update(make_msg(grid))
+    cached = [*layers.masks, layers.frontier_mask(5), layers.reachable_mask([layers.component(10, 10)]),
+              layers.path_costs(10, 10)]
+    for array in cached:
+        with pytest.raises(ValueError):
+            array[0, 0] = 0
+
+    grid[20:25, 10] = 0
+    assert layers.update(make_msg(grid))
+    np.testing.assert_array_equal(layers.frontier_mask(5), frontier_mask(grid, 5))
+    assert not layers.masks[0].flags.writeable and not layers.frontier_mask(5).flags.writeable
+
+
+def test_path_costs_use_metres_for_inflation():
+    grid = make_grid()
+    grid[4, 5:20] = 100
+    layers = MapLayers(inflation_radius=0.25, inflation_cost=2.0)
+    layers.update(make_msg(grid, resolution=0.05))
+    costs = layers.path_costs(10, 10)
+    assert costs[10, 10] == 0 and np.isinf(costs[30, 30])
+    assert layers.path_costs(10, 10) is costs
+
+    plain = MapLayers()
+    plain.update(make_msg(grid, resolution=0.05))
+    # 0.25 m is 5 cells: row 5 is inflated, row 10 is not.
+    assert costs[5, 15] > plain.path_costs(10, 10)[5, 15]
+    assert costs[10, 15] == plain.path_costs(10, 10)[10, 15]
+
+
+def test_patches_match_recomputing_from_scratch():
+    rng = np.random.default_rng(3)
+    values = np.array([-1, 0, 100], dtype=np.int8)
+    grid = rng.choice(values, size=(50, 70), p=[0.4, 0.5, 0.1])
+    layers = MapLayers()
+    layers.update(make_msg(grid))
+    layers.frontier_mask(5)
+    layers.frontiers(5, [layers.component(25, 35)])
+    for _ in range(30):
+        h, w = rng.integers(1, 12, size=2)
+        # Some patches hang over the map edge.
+        y, x = rng.integers(-5, 50), rng.integers(-5, 70)
+        patch = rng.choice(values, size=(h, w), p=[0.2, 0.7, 0.1])
+        layers.apply_update(int(x), int(y), patch)
+        y0, x0, y1, x1 = max(y, 0), max(x, 0), min(y + h, 50), min(x + w, 70)
+        if y0 < y1 and x0 < x1:
+            grid[y0:y1, x0:x1] = patch[y0 - y:y1 - y, x0 - x:x1 - x]
+
+        np.testing.assert_array_equal(layers.grid, grid)
+        np.testing.assert_array_equal(layers.frontier_mask(5), frontier_mask(grid, 5))
+        component = layers.component(25, 35)
+        reachable = layers.reachable_mask([component])
+        assert layers.frontiers(5, [component]) == frontier_clusters(grid, 5, reachable)
+
+
+def test_full_maps_with_few_changes_become_patches():
+    grid = make_grid()
+    layers = MapLayers()
+    layers.update(make_msg(grid))
+    component = layers.component(10, 10)
+    free_version, cost_version = layers.free_version, layers.cost_version
+
+    # Unknown turning occupied changes neither the free cells nor their components.
+    grid[0, 0] = 100
+    assert layers.update(make_msg(grid))
+    assert layers.free_version == free_version and layers.cost_version == cost_version + 1
+    assert layers.component(10, 10) == component
+
+    grid[10, 20] = 0
+    assert layers.update(make_msg(grid))
+    assert layers.free_version == free_version + 1
+    assert not layers.apply_update(100, 100, np.zeros((3, 3), dtype=np.int8))
+
+
+def _upper_room(grid):
+    mask = np.zeros(grid.shape, dtype=bool)
+    mask[5:20, 5:20] = True
+    return mask
@@ -0,0 +1,35 @@
+import numpy as np
+
+from map_merge_py.map_updates import MapDeltaTracker, MapGeometry
+
+
+def geometry(img, origin_x=0.0):
+    return MapGeometry(img.shape[1], img.shape[0], 0.05, origin_x, 0.0)
+
+
+def test_patches_reproduce_the_new_map():
+    rng = np.random.default_rng(0)
+    old = rng.choice(np.array([0, 127, 255], dtype=np.uint8), size=(300, 250))
+    tracker = MapDeltaTracker(tile_size=32)
+    assert tracker.diff(old, geometry(old)) is None
+
+    new = old.copy()
+    new[10:20, 10:15] = 0
+    new[200:290, 240:250] = 255
+    boxes = tracker.diff(new, geometry(new))
+    assert len(boxes) == 2
+
+    patched = old.copy()
+    for x, y, w, h in boxes:
+        patched[y:y + h, x:x + w] = new[y:y + h, x:x + w]
+    assert np.array_equal(patched, new)
+    assert sum(w * h for _, _, w, h in boxes) < new.size // 10
+    assert tracker.diff(new, geometry(new)) == []
+
+
+def test_geometry_change_or_large_change_needs_full_map():
+    img = np.full((128, 128), 127, dtype=np.uint8)
+    tracker = MapDeltaTracker(tile_size=32)
+    tracker.diff(img, geometry(img))
+    assert tracker.diff(img, geometry(img, origin_x=1.0)) is None
+    assert tracker.diff(np.zeros_like(img), geometry(img, origin_x=1.0)) is None
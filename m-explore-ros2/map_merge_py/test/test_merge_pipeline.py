@@ -0,0 +1,160 @@
+import numpy as np
+
+from map_merge_py.grid_conversion import UNKNOWN, rescale_image
+from map_merge_py.merge_pipeline import MergePipeline
+from map_merge_py.placement import layout_components, spanning_tree_placement, to_homogeneous
+from map_merge_py.pyramid import PyramidRegistration
+from map_merge_py.registration import PairEstimate
+from map_merge_py.synthetic import as_robot_map, make_map_pair, make_robot_maps, make_world, robot_view
+from map_merge_py.tracking import TransformTracker
+
+
+def shift(dx, dy):
+    return np.array([[1.0, 0.0, dx], [0.0, 1.0, dy]])
+
+
+def test_spanning_tree_uses_most_confident_pairs():
+    estimates = {
+        ('a', 'b'): PairEstimate(100.0, shift(10, 0), []),
+        ('b', 'c'): PairEstimate(90.0, shift(0, 5), []),
+        ('a', 'c'): PairEstimate(70.0, shift(99, 99), []),
+        ('c', 'd'): PairEstimate(10.0, shift(1, 1), []),
+    }
+    components = spanning_tree_placement(['a', 'b', 'c', 'd'], estimates, threshold=50.0)
+    assert [sorted(component) for component in components] == [['a', 'b', 'c'], ['d']]
+    assert np.allclose(components[0]['c'][:2, 2], (10, 5))
+
+
+def test_unaligned_components_are_stacked():
+    components = [{'a': np.eye(3)}, {'b': np.eye(3)}]
+    placement = layout_components(components, {'a': (100, 80), 'b': (50, 60)}, gap_pixels=20)
+    assert np.allclose(placement['b'][:2, 2], (0, 120))
+
+
+def test_pipeline_recovers_synthetic_placement():
+    _, maps, truth = make_robot_maps(3, np.random.default_rng(3))
+    result = MergePipeline().merge(maps)
+    assert len(result.components) == 1
+
+    world_from_first = np.linalg.inv(to_homogeneous(truth['robot_1']))
+    for robot, robot_map in maps.items():
+        expected = world_from_first @ to_homogeneous(truth[robot])
+        x, y, yaw = result.poses[robot]
+        assert np.allclose((x, y), expected[:2, 2] * robot_map.resolution, atol=0.6)
+        assert abs(np.angle(np.exp(1j * (yaw - np.arctan2(expected[1, 0], expected[0, 0]))))) < 0.05
+
+
+def test_pipeline_only_rematches_changed_maps():
+    _, maps, _ = make_robot_maps(3, np.random.default_rng(4))
+    pipeline = MergePipeline()
+    pipeline.merge(maps)
+    before = {pair: cached[1] for pair, cached in pipeline.pairs.items()}
+
+    img = maps['robot_3'].image.copy()
+    img[:5, :5] = 0
+    maps['robot_3'] = as_robot_map(img)
+    pipeline.merge(maps)
+    assert pipeline.pairs[('robot_1', 'robot_2')][1] is before[('robot_1', 'robot_2')]
+    assert pipeline.pairs[('robot_1', 'robot_3')][1] is not before[('robot_1', 'robot_3')]
+
+
+def test_tracking_follows_maps_that_grow_by_moving_their_origin():
+    _, maps, _ = make_robot_maps(3, np.random.default_rng(4))
+    pipeline = MergePipeline(tracker=TransformTracker())
+    before = pipeline.merge(maps)
+    matches = pipeline.global_matches
+
+    # robot_2's map grows 40 cells to the left; its map frame stays put.
+    grown = np.pad(maps['robot_2'].image, ((0, 0), (40, 0)), constant_values=UNKNOWN)
+    maps['robot_2'] = as_robot_map(grown, origin=(-2.0, 0.0))
+    after = pipeline.merge(maps)
+    assert pipeline.global_matches == matches
+    for robot, pose in before.poses.items():
+        assert np.allclose(after.poses[robot], pose, atol=1e-6)
+
+
+def test_pairs_over_time_budget_are_deferred():
+    _, maps, _ = make_robot_maps(2, np.random.default_rng(5))
+    pipeline = MergePipeline(match_time_budget=1e-9)
+    result = pipeline.merge(maps)
+    assert pipeline.deferred_matches == 1
+    assert result.estimates == {} and len(result.components) == 2
+
+    pipeline.match_time_budget = 0.0
+    result = pipeline.merge(maps)
+    assert len(result.components) == 1
+    assert result.estimates[('robot_1', 'robot_2')].complete
+
+
+def test_partial_estimates_are_completed_by_global_matching():
+    _, maps, _ = make_robot_maps(2, np.random.default_rng(5))
+    pipeline = MergePipeline(tracker=TransformTracker())
+    pipeline.merge(maps)
+    pair = ('robot_1', 'robot_2')
+    _, estimate, score = pipeline.pairs[pair]
+    # As a merge leaves an acceptable estimate found before its time budget ran out.
+    pipeline.pairs[pair] = (None, estimate._replace(complete=False), score)
+    assert pipeline.accepted_pairs() == {}
+
+    matches = pipeline.global_matches
+    result = pipeline.merge(maps)
+    assert pipeline.global_matches == matches + 1
+    assert result.estimates[pair].complete and pair in pipeline.accepted_pairs()
+
+
+def test_pyramid_registration_merges_mixed_resolutions():
+    world = make_world(1200, np.random.default_rng(2))
+    img_a, truth_a = robot_view(world, (500, 600), 800, 10)
+    img_b, truth_b = robot_view(world, (700, 600), 800, -35)
+    # The second robot maps at half the resolution.
+    maps = {'a': as_robot_map(img_a), 'b': as_robot_map(rescale_image(img_b, 0.5), resolution=0.1)}
+    result = MergePipeline(registration=PyramidRegistration(levels=1)).merge(maps)
+    assert len(result.components) == 1 and result.resolution == 0.05
+
+    expected = np.linalg.inv(to_homogeneous(truth_a)) @ to_homogeneous(truth_b)
+    x, y, yaw = result.poses['b']
+    assert np.allclose((x, y), expected[:2, 2] * 0.05, atol=0.3)
+    assert abs(yaw - np.arctan2(expected[1, 0], expected[0, 0])) < 0.02
+
+
+def test_generated_pair_truth_is_recovered_under_noise():
+    pair = make_map_pair(np.random.default_rng(0), size=400, rotation=45.0, overlap=0.8, noise=0.02)
+    result = MergePipeline().merge({'a': as_robot_map(pair.a), 'b': as_robot_map(pair.b)})
+    assert len(result.components) == 1
+    x, y, yaw = result.poses['b']
+    assert np.allclose((x, y), pair.truth[:, 2] * 0.05, atol=0.1)
+    assert abs(yaw - np.arctan2(pair.truth[1, 0], pair.truth[0, 0])) < 0.01
+
+
+def test_default_threshold_accepts_registered_pairs_and_rejects_unrelated_ones():
+    # Runs at the threshold the node uses unless match_confidence_threshold is set.
+    corners = np.array([[0, 0, 1], [400, 0, 1], [0, 400, 1], [400, 400, 1]], dtype=np.float64).T
+    for seed in range(8):
+        pair = make_map_pair(np.random.default_rng(seed))
+        result = MergePipeline().merge({'a': as_robot_map(pair.a), 'b': as_robot_map(pair.b)})
+        assert len(result.components) == 1, seed
+        error = np.abs((result.estimates[('a', 'b')].transform - pair.truth) @ corners).max()
+        assert error < 4.0, seed
+
+        other = make_map_pair(np.random.default_rng(100 + seed))
+        result = MergePipeline().merge({'a': as_robot_map(pair.a), 'b': as_robot_map(other.b)})
+        assert len(result.components) == 2, seed
+
+
+def test_world_frame_stays_on_its_robot_when_robots_join_later():
+    _, maps, truth = make_robot_maps(3, np.random.default_rng(3))
+    # The world frame is robot_2's map frame, not its pixel frame.
+    maps['robot_2'] = as_robot_map(maps['robot_2'].image, origin=(-3.0, 2.0))
+    pipeline = MergePipeline()
+    first = pipeline.merge({robot: maps[robot] for robot in ('robot_2', 'robot_3')})
+    assert np.allclose(first.poses['robot_2'], (0.0, 0.0, 0.0))
+
+    # robot_1 sorts first but joins last; nothing already placed moves.
+    result = pipeline.merge(maps)
+    assert len(result.components) == 1
+    for robot in ('robot_2', 'robot_3'):
+        assert np.allclose(result.poses[robot], first.poses[robot], atol=0.05)
+    expected = np.linalg.inv(to_homogeneous(truth['robot_2'])) @ to_homogeneous(truth['robot_1'])
+    x, y, yaw = result.poses['robot_1']
+    assert np.allclose((x, y), expected[:2, 2] * 0.05 + (-3.0, 2.0), atol=0.6)
+    assert abs(np.angle(np.exp(1j * (yaw - np.arctan2(expected[1, 0], expected[0, 0]))))) < 0.05
@@ -0,0 +1,82 @@
+import threading
+
+from map_merge_py.merge_worker import MergeWorker
+
+TIMEOUT = 5.0
+
+
+class BlockingPipeline:
+    """Merges to the submitted value; the first merge waits for release."""
+
+    def __init__(self, fail_on=()):
+        self.fail_on = fail_on
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def merge(self, maps):
+        self.started.set()
+        assert self.release.wait(TIMEOUT)
+        if maps in self.fail_on:
+            raise ValueError(maps)
+        return maps
+
+
+class Collector:
+    def __init__(self, expected, fail_on=()):
+        self.fail_on = fail_on
+        self.items = []
+        self.done = threading.Event()
+        self.expected = expected
+
+    def __call__(self, item):
+        self.items.append(item)
+        if len(self.items) == self.expected:
+            self.done.set()
+        if item in self.fail_on:
+            raise RuntimeError(item)
+
+
+def test_latest_request_replaces_waiting_ones():
+    pipeline = BlockingPipeline()
+    results = Collector(2)
+    worker = MergeWorker(pipeline, results)
+    worker.submit(1)
+    assert pipeline.started.wait(TIMEOUT)
+    for maps in (2, 3, 4):
+        worker.submit(maps)
+    pipeline.release.set()
+
+    assert results.done.wait(TIMEOUT)
+    worker.stop(TIMEOUT)
+    assert results.items == [1, 4]
+    assert worker.dropped == 2
+
+
+def test_merge_errors_go_to_on_error():
+    pipeline = BlockingPipeline(fail_on=(1,))
+    pipeline.release.set()
+    results, errors = Collector(1), Collector(1)
+    worker = MergeWorker(pipeline, results, errors)
+    worker.submit(1)
+    assert errors.done.wait(TIMEOUT)
+    worker.submit(2)
+
+    assert results.done.wait(TIMEOUT)
+    worker.stop(TIMEOUT)
+    assert [type(e) for e in errors.items] == [ValueError]
+    assert results.items == [2]
+
+
+def test_thread_survives_a_raising_result_callback():
+    pipeline = BlockingPipeline()
+    pipeline.release.set()
+    results, errors = Collector(2, fail_on=(1,)), Collector(1)
+    worker = MergeWorker(pipeline, results, errors)
+    worker.submit(1)
+    assert errors.done.wait(TIMEOUT)
+    worker.submit(2)
+
+    assert results.done.wait(TIMEOUT)
+    worker.stop(TIMEOUT)
+    assert results.items == [1, 2]
+    assert [type(e) for e in errors.items] == [RuntimeError]
@@ -0,0 +1,115 @@
+import heapq
+
+import numpy as np
+
+from map_merge_py.grid_conversion import image_to_grid
+from map_merge_py.path_cost import PathCostFields, inflation_penalty
+from map_merge_py.synthetic import make_world
+
+
+def reference_costs(grid, start, penalty):
+    """Plain heap Dijkstra over 8-connected free cells."""
+    h, w = grid.shape
+    costs = np.full(grid.shape, np.inf)
+    costs[start] = 0.0
+    heap = [(0.0, start)]
+    while heap:
+        cost, (y, x) = heapq.heappop(heap)
+        if cost > costs[y, x]:
+            continue
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                ny, nx = y + dy, x + dx
+                if (dy or dx) and 0 <= ny < h and 0 <= nx < w and grid[ny, nx] == 0:
+                    step = np.hypot(dy, dx) * 0.5 * (penalty[y, x] + penalty[ny, nx])
+                    if cost + step < costs[ny, nx]:
+                        costs[ny, nx] = cost + step
+                        heapq.heappush(heap, (cost + step, (ny, nx)))
+    return costs
+
+
+def test_matches_reference_dijkstra():
+    rng = np.random.default_rng(0)
+    grid = rng.choice(np.array([-1, 0, 100], dtype=np.int8), size=(30, 40), p=[0.1, 0.7, 0.2])
+    grid[10, 10] = 0
+    for radius, cost in [(0, 0.0), (3, 2.0)]:
+        fields = PathCostFields(inflation_radius=radius, inflation_cost=cost)
+        fields.update(grid, 1)
+        expected = reference_costs(grid, (10, 10), inflation_penalty(grid, radius, cost))
+        np.testing.assert_allclose(fields.cost_from(10, 10), expected, rtol=1e-5)
+
+
+def test_walls_make_paths_longer_than_straight_lines():
+    grid = np.zeros((20, 20), dtype=np.int8)
+    grid[:15, 10] = 100
+    fields = PathCostFields()
+    fields.update(grid, 1)
+    costs = fields.cost_from(0, 5)
+    assert costs[0, 15] > 20
+    assert np.isinf(costs[0, 10])
+
+    # A start on an obstacle snaps to the nearest free cell; no free cell in reach gives no path.
+    np.testing.assert_allclose(fields.cost_from(0, 10)[0, 9], 0.0)
+    grid[:] = 100
+    fields.update(grid, 2)
+    assert np.isinf(fields.cost_from(5, 5)).all()
+
+
+def test_fields_are_cached_per_version_and_start():
+    grid = np.zeros((10, 10), dtype=np.int8)
+    fields = PathCostFields(max_fields=2)
+    fields.update(grid, 1)
+    first = fields.cost_from(1, 1)
+    assert fields.cost_from(1, 1) is first
+    fields.cost_from(2, 2)
+    fields.cost_from(3, 3)
+    assert fields.cost_from(1, 1) is not first
+    fields.update(grid, 1)
+    assert fields.cost_from(1, 1) is fields.cost_from(1, 1)
+
+
+def test_large_maps_are_planned_on_blocks():
+    grid = image_to_grid(make_world(300, np.random.default_rng(1)))
+    exact = PathCostFields()
+    exact.update(grid, 1)
+    blocks = PathCostFields(max_nodes=np.count_nonzero(grid == 0) // 8)
+    blocks.update(grid, 1)
+    assert exact.block == 1 and blocks.block == 3
+
+    y, x = np.argwhere(grid == 0)[len(np.argwhere(grid == 0)) // 2]
+    expected, costs = exact.cost_from(y, x), blocks.cost_from(y, x)
+    assert np.mean(np.isfinite(expected) == np.isfinite(costs)) > 0.999
+    both = np.isfinite(expected) & np.isfinite(costs)
+    assert np.mean(np.abs(costs[both] - expected[both]) / np.maximum(expected[both], 1.0)) < 0.05
+
+    # Walls keep blocking paths on blocks too.
+    walled = np.zeros((40, 40), dtype=np.int8)
+    walled[:30, 20] = 100
+    fields = PathCostFields(max_nodes=400)
+    fields.update(walled, 1)
+    assert fields.block == 2
+    assert fields.cost_from(0, 10)[0, 30] > 40
+
+
+def test_block_graphs_are_patched_like_a_rebuild():
+    truth = image_to_grid(make_world(300, np.random.default_rng(2)))
+    rng = np.random.default_rng(5)
+    grid = truth.copy()
+    for y, x in rng.integers(0, 260, size=(6, 2)):
+        grid[y:y + 40, x:x + 40] = -1
+    options = dict(inflation_radius=4, inflation_cost=2.0, max_nodes=np.count_nonzero(truth == 0) // 8)
+    fields = PathCostFields(**options)
+    fields.update(grid, 0)
+    start = tuple(np.argwhere(grid == 0)[0])
+    for version in range(1, 8):
+        y, x = rng.integers(0, 260, size=2)
+        grid[y:y + 40, x:x + 40] = truth[y:y + 40, x:x + 40]
+        # A wall across free space splits regions within blocks.
+        grid[y + 20, x:x + 30] = 100
+        fields.update(grid, version)
+        rebuilt = PathCostFields(**options)
+        rebuilt.update(grid, version)
+        assert fields.block == rebuilt.block == 3
+        np.testing.assert_allclose(fields.cost_from(*start), rebuilt.cost_from(*start), rtol=1e-9)
+    # Replaced regions stay in the graph without edges.
+    assert fields.graph.shape[0] > rebuilt.graph.shape[0]
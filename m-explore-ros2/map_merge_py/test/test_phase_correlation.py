@@ -0,0 +1,28 @@
+import numpy as np
+
+from map_merge_py.merge_pipeline import MergePipeline
+from map_merge_py.phase_correlation import PhaseCorrelationRegistration
+from map_merge_py.synthetic import as_robot_map, make_map_pair
+
+
+def test_recovers_rotation_and_translation():
+    pair = make_map_pair(np.random.default_rng(1), size=400, rotation=45.0, overlap=0.8)
+    estimate = PhaseCorrelationRegistration().estimate('a', as_robot_map(pair.a), 'b', as_robot_map(pair.b))
+    assert estimate.confidence > PhaseCorrelationRegistration.confidence_threshold
+    assert np.allclose(estimate.transform[:, :2], pair.truth[:, :2], atol=0.01)
+    assert np.allclose(estimate.transform[:, 2], pair.truth[:, 2], atol=1.0)
+
+
+def test_unrelated_maps_have_low_confidence():
+    first = make_map_pair(np.random.default_rng(1), size=400, rotation=45.0, overlap=0.8)
+    other = make_map_pair(np.random.default_rng(2), size=400, rotation=45.0, overlap=0.8)
+    estimate = PhaseCorrelationRegistration().estimate('a', as_robot_map(first.a), 'b', as_robot_map(other.b))
+    assert estimate.confidence < PhaseCorrelationRegistration.confidence_threshold
+
+
+def test_pipeline_accepts_phase_correlation_at_its_default_threshold():
+    for seed in range(4):
+        pair = make_map_pair(np.random.default_rng(seed), size=400, rotation=30.0, overlap=0.7)
+        pipeline = MergePipeline(registration=PhaseCorrelationRegistration())
+        result = pipeline.merge({'a': as_robot_map(pair.a), 'b': as_robot_map(pair.b)})
+        assert len(result.components) == 1, seed
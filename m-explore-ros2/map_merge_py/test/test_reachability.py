@@ -0,0 +1,56 @@
+import numpy as np
+
+from map_merge_py.reachability import ReachabilityLabels
+
+
+def reference_reachable(data, sy, sx):
+    """The original stack flood fill from MultiRobotExplorer.compute_reachability_mask."""
+    height, width = data.shape
+    reachable = np.zeros((height, width), dtype=bool)
+    visited = np.zeros((height, width), dtype=bool)
+    if not (0 <= sx < width and 0 <= sy < height):
+        return reachable
+    queue = [(sy, sx)]
+    while queue:
+        y, x = queue.pop()
+        if visited[y, x]:
+            continue
+        visited[y, x] = True
+        if data[y, x] != 0:
+            continue
+        reachable[y, x] = True
+        for dy in [-1, 0, 1]:
+            for dx in [-1, 0, 1]:
+                ny, nx = y + dy, x + dx
+                if 0 <= ny < height and 0 <= nx < width and not visited[ny, nx]:
+                    queue.append((ny, nx))
+    return reachable
+
+
+def test_matches_reference_flood_fill():
+    rng = np.random.default_rng(0)
+    grid = rng.choice(np.array([-1, 0, 100], dtype=np.int8), size=(40, 60), p=[0.2, 0.55, 0.25])
+    labels = ReachabilityLabels()
+    labels.update(grid, 1)
+    for sy, sx in [(0, 0), (20, 30), (39, 59), (-1, 5), (5, 60), *rng.integers(0, 40, size=(20, 2)).tolist()]:
+        np.testing.assert_array_equal(labels.reachable_from(sy, sx), reference_reachable(grid, sy, sx))
+
+
+def test_masks_are_reused_until_the_version_changes():
+    grid = np.full((10, 10), -1, dtype=np.int8)
+    grid[2:5, 2:5] = 0
+    grid[7:9, 7:9] = 0
+    labels = ReachabilityLabels()
+    labels.update(grid, 1)
+    first = labels.reachable_from(3, 3)
+    assert labels.reachable_from(2, 4) is first
+    assert labels.reachable_from(8, 8) is not first
+
+    # Same version: the grid is not relabelled.
+    labels.update(np.zeros_like(grid), 1)
+    assert labels.reachable_from(4, 2) is first
+
+    grid[5:7, 5:7] = 0
+    labels.update(grid, 2)
+    joined = labels.reachable_from(3, 3)
+    assert joined[8, 8] and joined.sum() == 9 + 4 + 4
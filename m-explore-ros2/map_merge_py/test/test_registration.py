@@ -0,0 +1,21 @@
+import time
+
+import numpy as np
+
+from map_merge_py.registration import FeatureRegistration, MatchingEngine
+from map_merge_py.synthetic import make_robot_maps
+
+
+def test_matching_stops_at_the_deadline_before_any_match():
+    _, maps, _ = make_robot_maps(2, np.random.default_rng(5))
+    engine = MatchingEngine(chunk_size=32)
+    registration = FeatureRegistration(matcher=engine)
+    features_a = registration.features('robot_1', maps['robot_1'])
+    features_b = registration.features('robot_2', maps['robot_2'])
+
+    assert engine.match('robot_2', features_a, features_b, deadline=time.perf_counter()) == ([], False)
+    estimate = engine.estimate('robot_2', features_a, features_b, deadline=time.perf_counter())
+    assert estimate.transform is None and not estimate.complete
+
+    estimate = engine.estimate('robot_2', features_a, features_b)
+    assert estimate.transform is not None and estimate.complete
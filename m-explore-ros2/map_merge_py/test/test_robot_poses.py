@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from map_merge_py.robot_poses import (
+    RobotPose, Transform2D, cell_centres, distances_from, inverse_transform_points, transform_points,
+    yaw_from_quaternion)
+
+
+def test_cell_centres_follow_origin_and_resolution():
+    points = cell_centres([(0, 0), (2, 5)], 0.5, -1.0, 3.0)
+    np.testing.assert_allclose(points, [[-0.75, 3.25], [1.75, 4.25]])
+    assert cell_centres([], 0.05, 0.0, 0.0).shape == (0, 2)
+
+
+def test_distances_from_pose():
+    points = np.array([[3.0, 4.0], [0.0, 0.0], [-3.0, 0.0]])
+    np.testing.assert_allclose(distances_from(RobotPose(0.0, 0.0), points), [5.0, 0.0, 3.0])
+    assert np.isinf(distances_from(None, points)).all()
+
+
+def test_planar_transform_round_trip():
+    transform = Transform2D(1.0, -2.0, np.pi / 2)
+    points = np.array([[1.0, 0.0], [0.0, 3.0]])
+    np.testing.assert_allclose(transform_points(transform, points), [[1.0, -1.0], [-2.0, -2.0]], atol=1e-12)
+    np.testing.assert_allclose(inverse_transform_points(transform, transform_points(transform, points)), points, atol=1e-12)
+
+
+def test_yaw_from_quaternion():
+    q = SimpleNamespace(x=0.0, y=0.0, z=np.sin(0.3), w=np.cos(0.3))
+    assert np.isclose(yaw_from_quaternion(q), 0.6)
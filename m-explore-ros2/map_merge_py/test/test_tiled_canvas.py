@@ -0,0 +1,49 @@
+import cv2
+import numpy as np
+
+from map_merge_py.tiled_canvas import IDENTITY, TiledMergeCanvas, combine
+
+
+def random_map(rng, shape):
+    return rng.choice(np.array([0, 127, 255], dtype=np.uint8), size=shape, p=[0.1, 0.5, 0.4])
+
+
+def full_merge(base, overlay, transform):
+    warped = cv2.warpAffine(overlay, transform, (base.shape[1], base.shape[0]), borderValue=127)
+    return combine([base, warped])
+
+
+def test_combine_matches_mask_rules():
+    rng = np.random.default_rng(0)
+    a = random_map(rng, (50, 40))
+    b = random_map(rng, (50, 40))
+    expected = np.full_like(a, 127)
+    expected[(a == 0) | (b == 0)] = 0
+    expected[(a == 255) & (b != 0) & (expected != 0)] = 255
+    expected[(b == 255) & (a != 0) & (expected != 0)] = 255
+    assert np.array_equal(combine([a, b]), expected)
+
+
+def test_incremental_update_only_touches_changed_tiles():
+    rng = np.random.default_rng(1)
+    base = random_map(rng, (400, 400))
+    overlay = random_map(rng, (350, 420))
+    transform = cv2.getRotationMatrix2D((175.0, 175.0), 12.5, 1.0)
+    transform[:, 2] += (20.3, -7.9)
+
+    canvas = TiledMergeCanvas(tile_size=64)
+    canvas.update(base.shape, {'a': (base, IDENTITY), 'b': (overlay, transform)})
+    assert canvas.dirty.all()
+
+    base = base.copy()
+    base[10:20, 10:20] = 0
+    overlay = overlay.copy()
+    overlay[200:230, 300:310] = 255
+    merged = canvas.update(base.shape, {'a': (base, IDENTITY), 'b': (overlay, transform)})
+
+    assert 0 < canvas.dirty.sum() < canvas.dirty.size // 4
+    # Per-tile warps may round a handful of interpolated pixels differently.
+    assert np.count_nonzero(merged != full_merge(base, overlay, transform)) <= base.size * 1e-4
+
+    canvas.update(base.shape, {'a': (base, IDENTITY), 'b': (overlay, transform)})
+    assert not canvas.dirty.any()
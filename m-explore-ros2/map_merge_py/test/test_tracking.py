@@ -0,0 +1,62 @@
+import cv2
+import numpy as np
+import pytest
+
+from map_merge_py.grid_conversion import UNKNOWN
+from map_merge_py.synthetic import as_robot_map, make_map_pair
+from map_merge_py.tracking import TransformTracker
+
+CORNERS = np.array([[0, 0, 1], [400, 0, 1], [0, 400, 1], [400, 400, 1]], dtype=np.float64).T
+
+
+def corner_error(transform, truth):
+    return np.abs(transform @ CORNERS - truth @ CORNERS).max()
+
+
+def hide_columns(img, start):
+    hidden = img.copy()
+    hidden[:, start:] = UNKNOWN
+    return hidden
+
+
+def test_unchanged_maps_keep_the_transform_exactly():
+    pair = make_map_pair(np.random.default_rng(2))
+    tracker = TransformTracker()
+    small_a = tracker.downsample('a', as_robot_map(pair.a))
+    small_b = tracker.downsample('b', as_robot_map(pair.b))
+    reference = tracker.score(small_a, small_b, pair.truth)
+
+    transform, score, refined = tracker.track(small_a, small_b, pair.truth, reference)
+    assert transform is pair.truth and not refined
+    assert score == reference
+
+
+def test_small_offset_is_refined_back():
+    pair = make_map_pair(np.random.default_rng(5))
+    tracker = TransformTracker()
+    small_a = tracker.downsample('a', as_robot_map(pair.a))
+    small_b = tracker.downsample('b', as_robot_map(pair.b))
+    reference = tracker.score(small_a, small_b, pair.truth)
+    offset = cv2.getRotationMatrix2D((200.0, 200.0), 1.5, 1.0)
+    offset[:, 2] += (6.0, -4.0)
+    start = offset @ np.vstack([pair.truth, [0.0, 0.0, 1.0]])
+    assert corner_error(start, pair.truth) > 8.0
+
+    transform, _, refined = tracker.track(small_a, small_b, start, reference)
+    assert refined
+    assert corner_error(transform, pair.truth) < 3.0
+
+
+@pytest.mark.parametrize('seed', [1, 3])
+def test_growing_map_is_tracked_without_losing_the_transform(seed):
+    pair = make_map_pair(np.random.default_rng(seed))
+    tracker = TransformTracker()
+    small_a = tracker.downsample('a', as_robot_map(pair.a))
+    transform = pair.truth
+    reference = tracker.score(small_a, tracker.downsample('b', as_robot_map(hide_columns(pair.b, 250))), transform)
+    for start in range(275, 401, 25):
+        small_b = tracker.downsample('b', as_robot_map(hide_columns(pair.b, start)))
+        tracked = tracker.track(small_a, small_b, transform, reference)
+        assert tracked is not None, start
+        transform, reference, _ = tracked
+        assert corner_error(transform, pair.truth) < 3.0
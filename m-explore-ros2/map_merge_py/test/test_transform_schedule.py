@@ -0,0 +1,37 @@
+from map_merge_py.transform_schedule import TransformSchedule
+
+POSES = {'robot_1': (0.0, 0.0, 0.0), 'robot_2': (4.0, -1.0, 0.5)}
+
+
+def test_dynamic_transforms_go_out_every_tick():
+    schedule = TransformSchedule()
+    assert schedule.due({}, 0.0) is None
+    assert schedule.due(POSES, 0.0) == POSES
+    assert schedule.due(POSES, 0.05) == POSES
+
+
+def test_static_transforms_are_resent_only_on_change():
+    schedule = TransformSchedule(static=True)
+    assert schedule.due(POSES, 0.0) == POSES
+    # An equal snapshot, as the merge callback writes a new dict every merge.
+    assert schedule.due(dict(POSES), 100.0) is None
+
+    # Every robot goes out with the one that moved; /tf_static keeps only the last message.
+    moved = {**POSES, 'robot_2': (4.5, -1.0, 0.5)}
+    assert schedule.due(moved, 101.0) == moved
+    assert schedule.due(moved, 102.0) is None
+    joined = {**moved, 'robot_3': (0.0, 7.0, 3.0)}
+    assert schedule.due(joined, 103.0) == joined
+
+
+def test_static_heartbeat():
+    schedule = TransformSchedule(static=True, heartbeat_period=5.0)
+    assert schedule.due(POSES, 0.0) == POSES
+    assert schedule.due(POSES, 4.9) is None
+    assert schedule.due(POSES, 5.0) == POSES
+    assert schedule.due(POSES, 9.0) is None
+    # A change restarts the heartbeat.
+    moved = {**POSES, 'robot_1': (0.1, 0.0, 0.0)}
+    assert schedule.due(moved, 9.5) == moved
+    assert schedule.due(moved, 10.0) is None
+    assert schedule.due(moved, 14.5) == moved